@@ -1,259 +1,331 @@
-from flask import Flask, render_template, request, redirect, url_for, jsonify
-import joblib
-import numpy as np
-import pandas as pd
+from flask import Flask, render_template, request, redirect, url_for, jsonify, g
 import os
 import sys
 import json
+import time
+# The local modules below import NumPy, pandas, joblib and sklearn inside the functions
+# that use them (or only in their offline helpers), never at module level, so the
+# rule-based scorer (MODEL_PATH=none) starts without them; test_startup.py checks this
+from prediction_cache import PredictionCache, cache_key, model_fingerprint
+from rules import calculate_rule_based_risk, calculate_rule_based_risk_batch
+from model_registry import (GOLDEN_PATIENTS, ModelRegistry, ServedModel, built_from, load_artifact,
+                            model_type_for, validate_model)
+from microbatch import MICROBATCH_ENABLED, MicroBatcher
+from audit_log import AuditLog
+from drift_monitor import DriftMonitor
+from patient_record import PatientRecord, RecordError, records_to_frame
+from metrics import count_error, metrics_registry, observe_request, stage
+from inference import (FEATURE_COLUMNS, CATEGORICAL_COLUMNS, NUMERIC_COLUMNS, SIMPLE_FEATURES,
+                       categorize_risk, predict_proba_batch, predict_patient)
 
 app = Flask(__name__)
 
-def calculate_rule_based_risk(patient_data):
+# Model artifact to serve (.pkl pipeline, .joblib compiled scorer, .npz flat forest or
+# .compact.npz compact forest from compact_model.py).
+# MODEL_PATH=none serves the rule-based scorer without importing NumPy/pandas/sklearn.
+# When MODEL_PATH is unset, MODEL_MANIFEST ({"path": ..., "type": ...}, path relative
+# to the manifest) is read, and only without a manifest are the default files tried.
+MODEL_PATH = os.environ.get('MODEL_PATH', '')
+MODEL_MANIFEST = os.environ.get('MODEL_MANIFEST', os.path.join('models', 'manifest.json'))
+DEFAULT_MODEL_PATHS = [
+    'heart_disease_model.compact.npz',  # Compact export (retrain_model.py --compact)
+    'heart_disease_pipeline.pkl',  # Root directory (for Railway)
+    'simple_heart_model.pkl',  # Simple fallback model
+    'simple_heart_model.npz',  # Flattened simple model (FlatForest)
+    os.path.join('models', 'heart_disease_pipeline.pkl'),
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), 'models', 'heart_disease_pipeline.pkl'),
+]
+
+# Every worker polls the manifest, the model files and this trigger file every
+# MODEL_WATCH_INTERVAL seconds (0 disables) and hot-swaps the model on a change;
+# /reload-model touches the trigger so a reload reaches all workers
+MODEL_RELOAD_TRIGGER = os.environ.get('MODEL_RELOAD_TRIGGER', '.model-reload')
+MODEL_WATCH_INTERVAL = float(os.environ.get('MODEL_WATCH_INTERVAL', 2.0))
+
+# Upper bound on rows accepted by the batch endpoint in a single request
+BATCH_MAX_ROWS = int(os.environ.get('BATCH_MAX_ROWS', 10000))
+
+# Latency mode: 'pipeline' serves the pickled sklearn model as-is, 'compiled' swaps in
+# array-backed scorers (CompiledScorer for the complex pipeline, FlatForest for the
+# simple model). The files exported by retrain_model.py / create_simple_model.py are
+# only used if their .source.json records the loaded pickle; otherwise the scorer is
+# built from the loaded model.
+SCORER_MODE = os.environ.get('SCORER_MODE', 'pipeline').lower()
+COMPILED_MODEL_PATH = os.environ.get('COMPILED_MODEL_PATH', 'heart_disease_compiled.joblib')
+FLAT_SIMPLE_MODEL_PATH = os.environ.get('FLAT_SIMPLE_MODEL_PATH', 'simple_heart_model.npz')
+
+# Load array-backed artifacts memory-mapped so gunicorn workers share their pages
+MODEL_MMAP = os.environ.get('MODEL_MMAP', '0') == '1'
+
+# In-process LRU cache of single-patient predictions (size 0 disables it)
+PREDICTION_CACHE_SIZE = int(os.environ.get('PREDICTION_CACHE_SIZE', 1024))
+PREDICTION_CACHE_TTL = float(os.environ.get('PREDICTION_CACHE_TTL', 0))
+prediction_cache = PredictionCache(max_size=PREDICTION_CACHE_SIZE, ttl=PREDICTION_CACHE_TTL)
+
+# Audit trail of served predictions, appended to AUDIT_LOG_PATH (JSON lines) by a
+# background thread; AUDIT_LOG_PATH= (empty) turns it off. AUDIT_LOG_BUFFER bounds
+# the buffer in patient rows (a batch request weighs its row count). See audit_log.py.
+AUDIT_LOG_PATH = os.environ.get('AUDIT_LOG_PATH', 'predictions.jsonl')
+AUDIT_LOG_BUFFER = int(os.environ.get('AUDIT_LOG_BUFFER', 10000))
+AUDIT_LOG_FLUSH_INTERVAL = float(os.environ.get('AUDIT_LOG_FLUSH_INTERVAL', 1.0))
+AUDIT_LOG_MAX_BYTES = int(os.environ.get('AUDIT_LOG_MAX_BYTES', 64 * 1024 * 1024))
+AUDIT_LOG_BACKUPS = int(os.environ.get('AUDIT_LOG_BACKUPS', 5))
+AUDIT_LOG_DROP = os.environ.get('AUDIT_LOG_DROP', 'oldest').lower()
+audit_log = AuditLog(AUDIT_LOG_PATH, capacity=AUDIT_LOG_BUFFER, flush_interval=AUDIT_LOG_FLUSH_INTERVAL,
+                     max_bytes=AUDIT_LOG_MAX_BYTES, backups=AUDIT_LOG_BACKUPS, drop=AUDIT_LOG_DROP)
+
+# Live inputs vs. the training distribution saved by retrain_model.py (see drift_monitor.py)
+drift_monitor = DriftMonitor()
+
+# MICROBATCH=1 scores concurrent /predict requests of a worker together (see microbatch.py)
+microbatcher = MicroBatcher() if MICROBATCH_ENABLED else None
+
+# Precomputed simple-model lookup table from `python risk_grid.py materialize`.
+# 'exact' only answers inputs that sit on grid points, 'nearest' rounds to the grid.
+RISK_GRID_PATH = os.environ.get('RISK_GRID_PATH', 'simple_heart_grid.npy')
+RISK_GRID_MODE = os.environ.get('RISK_GRID_MODE', 'exact').lower()
+
+def read_manifest():
+    if not os.path.exists(MODEL_MANIFEST):
+        return None
+    with open(MODEL_MANIFEST) as f:
+        return json.load(f)
+
+def model_candidates():
     """
-    Calculate heart disease risk using evidence-based clinical rules
-    Returns risk score between 0.0 and 1.0
+    Return the [(path, model_type)] to try, in order: MODEL_PATH alone if set,
+    else the manifest entry, else the default files that exist.
     """
-    risk_score = 0.0
-    
-    # Age factor (major risk factor)
-    age = patient_data['Age']
-    if age >= 65:
-        risk_score += 0.25
-    elif age >= 55:
-        risk_score += 0.15
-    elif age >= 45:
-        risk_score += 0.10
-    elif age >= 35:
-        risk_score += 0.05
-    
-    # Major medical conditions
-    if patient_data['Diabetes']:
-        risk_score += 0.20  # Diabetes is a major risk factor
-    if patient_data['Hypertension']:
-        risk_score += 0.15  # High blood pressure
-    if patient_data['Obesity']:
-        risk_score += 0.10  # Obesity
-    
-    # Lifestyle factors
-    if patient_data['Smoking']:
-        risk_score += 0.20  # Smoking is a major risk factor
-    if patient_data['Physical_Activity'] <= 1:
-        risk_score += 0.10  # Sedentary lifestyle
-    
-    # Blood pressure values
-    systolic = patient_data['Systolic_BP']
-    diastolic = patient_data['Diastolic_BP']
-    if systolic >= 140 or diastolic >= 90:
-        risk_score += 0.15  # Stage 1 hypertension or higher
-    elif systolic >= 130 or diastolic >= 80:
-        risk_score += 0.08  # Elevated blood pressure
-    
-    # Cholesterol levels
-    cholesterol = patient_data['Cholesterol_Level']
-    if cholesterol >= 240:
-        risk_score += 0.15  # High cholesterol
-    elif cholesterol >= 200:
-        risk_score += 0.08  # Borderline high
-    
-    # Family history
-    if patient_data['Family_History']:
-        risk_score += 0.12  # Genetic predisposition
-    
-    # Stress level
-    stress = patient_data['Stress_Level']
-    if stress >= 8:
-        risk_score += 0.08  # High stress
-    elif stress >= 6:
-        risk_score += 0.04  # Moderate stress
-    
-    # Diet score (lower is worse)
-    diet = patient_data['Diet_Score']
-    if diet <= 3:
-        risk_score += 0.08  # Poor diet
-    elif diet <= 5:
-        risk_score += 0.04  # Fair diet
-    
-    # Cap the risk score at 1.0 (100%)
-    risk_score = min(risk_score, 1.0)
-    
-    # Add some variance based on triglycerides and other factors
-    if patient_data.get('Triglyceride_Level', 150) >= 200:
-        risk_score += 0.05
-    
-    if patient_data.get('HDL_Level', 50) < 40:  # Low HDL (good cholesterol)
-        risk_score += 0.05
-    
-    # Ensure minimum risk for very young, healthy individuals
-    if age < 30 and risk_score < 0.05:
-        risk_score = max(risk_score, 0.05)
-    
-    # Final cap
-    return min(risk_score, 0.95)  # Max 95% risk
-
-# Add debug info for hosting platforms
-print(f"Python version: {sys.version}")
-print(f"Current working directory: {os.getcwd()}")
-print(f"Files in current directory: {os.listdir('.')}")
-
-# Check if models directory exists
-if os.path.exists('models'):
-    print(f"Models directory exists. Contents: {os.listdir('models')}")
-else:
-    print("❌ Models directory does not exist!")
-
-# Production-ready model loading with extensive error handling
-model = None
-model_type = "complex"  # Global variable to track model type
-try:
-    # Try multiple possible paths for the model
-    possible_paths = [
-        'heart_disease_pipeline.pkl',  # Root directory (for Railway)
-        'simple_heart_model.pkl',  # Simple fallback model
-        os.path.join(os.path.dirname(__file__), 'models', 'heart_disease_pipeline.pkl'),
-        os.path.join('models', 'heart_disease_pipeline.pkl'),
-        'models/heart_disease_pipeline.pkl',
-        './models/heart_disease_pipeline.pkl'
-    ]
-    
-    print("🔍 Searching for model file...")
-    for i, model_path in enumerate(possible_paths):
-        print(f"  Path {i+1}: {model_path} - {'EXISTS' if os.path.exists(model_path) else 'NOT FOUND'}")
-        if os.path.exists(model_path):
-            try:
-                model = joblib.load(model_path)
-                print(f"✅ Model loaded successfully from: {model_path}")
-                print(f"✅ Model type: {type(model)}")
-                
-                # Determine model type
-                if 'simple' in model_path:
-                    model_type = "simple"
-                    print("📝 Using simple model (12 features)")
-                else:
-                    model_type = "complex"
-                    print("📝 Using complex model (24 features)")
-                break
-            except Exception as load_error:
-                print(f"❌ Failed to load from {model_path}: {load_error}")
-                continue
-    
-    if model is None:
-        print("❌ Model file not found in any expected location")
-        print("Available files in current directory:", os.listdir('.'))
-        if os.path.exists('models'):
-            print("Files in models directory:", os.listdir('models'))
-        
-except Exception as e:
-    print(f"❌ Error during model loading: {e}")
-    import traceback
-    traceback.print_exc()
+    if MODEL_PATH:
+        if MODEL_PATH.lower() == 'none':
+            return []
+        return [(MODEL_PATH, model_type_for(MODEL_PATH))]
+    manifest = read_manifest()
+    if manifest is not None:
+        path = os.path.normpath(os.path.join(os.path.dirname(MODEL_MANIFEST), manifest['path']))
+        return [(path, manifest.get('type') or model_type_for(path))]
+    return [(path, model_type_for(path)) for path in DEFAULT_MODEL_PATHS if os.path.exists(path)]
+
+def load_model_file(path):
+    """Load a model artifact (see model_registry.load_artifact for the formats)"""
+    return load_artifact(path, mmap=MODEL_MMAP)
+
+def compiled_artifact_for(artifact_path, path):
+    """Whether the exported artifact_path was built from the model file at path"""
+    if not os.path.exists(artifact_path):
+        return False
+    if not built_from(artifact_path, path):
+        print(f"⚠️  {artifact_path} was not built from {path}, building the scorer from the loaded model")
+        return False
+    return True
+
+def apply_scorer_mode(loaded_model, loaded_type, path):
+    """Return the model to serve for the configured SCORER_MODE (path: the loaded file)"""
+    if SCORER_MODE != 'compiled':
+        return loaded_model
+    try:
+        if loaded_type == "simple":
+            from flat_forest import FlatForest
+            if isinstance(loaded_model, FlatForest):
+                return loaded_model
+            if compiled_artifact_for(FLAT_SIMPLE_MODEL_PATH, path):
+                scorer = FlatForest.load(FLAT_SIMPLE_MODEL_PATH, mmap=MODEL_MMAP)
+                print(f"⚡ Flat forest loaded from: {FLAT_SIMPLE_MODEL_PATH}")
+            else:
+                scorer = FlatForest.from_estimator(loaded_model)
+                print("⚡ Flat forest built from loaded model")
+            return scorer
+
+        from compiled_scorer import CompiledScorer
+        if isinstance(loaded_model, CompiledScorer):
+            return loaded_model
+        if compiled_artifact_for(COMPILED_MODEL_PATH, path):
+            scorer = CompiledScorer.load(COMPILED_MODEL_PATH, mmap_mode='r' if MODEL_MMAP else None)
+            print(f"⚡ Compiled scorer loaded from: {COMPILED_MODEL_PATH}")
+        else:
+            scorer = CompiledScorer.from_pipeline(loaded_model, flatten_forest=True)
+            print("⚡ Compiled scorer built from loaded pipeline")
+        return scorer
+    except Exception as e:
+        print(f"❌ Compiled scorer unavailable, serving pipeline: {e}")
+        return loaded_model
+
+def attach_risk_grid(loaded_model, loaded_type):
+    """Wrap the simple model with the precomputed risk grid when one is available"""
+    if loaded_type != "simple" or RISK_GRID_MODE == 'off' or not os.path.exists(RISK_GRID_PATH):
+        return loaded_model
+    try:
+        from risk_grid import GridScorer, RiskGrid
+        grid = RiskGrid.load(RISK_GRID_PATH, mode=RISK_GRID_MODE)
+        if not grid.verify(loaded_model):
+            print(f"❌ Risk grid {RISK_GRID_PATH} does not match the loaded model, ignoring it")
+            return loaded_model
+        print(f"📇 Risk grid loaded from: {RISK_GRID_PATH} ({len(grid.table):,} cells, {RISK_GRID_MODE} mode)")
+        return GridScorer(loaded_model, grid)
+    except Exception as e:
+        print(f"❌ Failed to load risk grid: {e}")
+        return loaded_model
+
+def load_serving_model():
+    """
+    Load, validate, wrap and warm the configured model.
+    Returns a ServedModel; raises if no candidate loads.
+    """
+    manifest = None if MODEL_PATH else read_manifest()
+    errors = []
+    for path, loaded_type in model_candidates():
+        started = time.perf_counter()
+        try:
+            loaded = apply_scorer_mode(load_model_file(path), loaded_type, path)
+            # Checked before the risk grid is attached: 'nearest' grid answers are approximate
+            validate_model(loaded, loaded_type, expected=manifest.get('golden') if manifest else None)
+            loaded = attach_risk_grid(loaded, loaded_type)
+            # First prediction pulls in whatever the scoring path imports lazily
+            predict_patient(loaded, loaded_type, GOLDEN_PATIENTS[0])
+        except Exception as load_error:
+            print(f"❌ Failed to load model from {path}: {load_error}")
+            errors.append(f"{path}: {load_error}")
+            continue
+        version = (manifest or {}).get('version') or model_fingerprint(path)
+        print(f"✅ {loaded_type.capitalize()} model {version} loaded from {path} in "
+              f"{(time.perf_counter() - started) * 1000:.0f} ms")
+        return ServedModel(loaded, loaded_type, version=version, path=path)
+    raise RuntimeError('; '.join(errors) or 'no model file configured or found')
+
+def model_watch_paths():
+    paths = [MODEL_RELOAD_TRIGGER]
+    if not MODEL_PATH:
+        paths.append(MODEL_MANIFEST)
+    try:
+        paths.extend(path for path, _ in model_candidates())
+    except (OSError, ValueError, KeyError):
+        pass  # Manifest caught mid-write; the next poll sees the finished file
+    return paths
+
+# The served model; read `model_registry.current` once per request (None = rule-based).
+# A swap empties the prediction cache: entries of the previous model could no longer
+# be hit (the key includes the model version) but would hold LRU slots until evicted.
+model_registry = ModelRegistry(load_serving_model, watch_paths=model_watch_paths,
+                               poll_interval=MODEL_WATCH_INTERVAL, on_swap=prediction_cache.clear)
+model_registry.load_now('startup')
+
+@app.before_request
+def start_model_watcher():
+    # Started lazily so each forked gunicorn worker runs its own watcher
+    model_registry.ensure_watcher()
+
+@app.before_request
+def start_request_timer():
+    metrics_registry.ensure_flusher()
+    drift_monitor.ensure_flusher()
+    g.request_started = time.perf_counter()
+
+@app.after_request
+def record_request_metrics(response):
+    started = g.pop('request_started', None)
+    if started is not None:
+        endpoint = request.url_rule.rule if request.url_rule else 'unmatched'
+        observe_request(endpoint, request.method, response.status_code, time.perf_counter() - started)
+    return response
+
+def health_status():
+    served = model_registry.current
+    return {
+        'status': 'healthy',
+        'model_loaded': served is not None,
+        'python_version': sys.version,
+        'cwd': os.getcwd(),
+        'model_version': served.version if served else None,
+        'model': model_registry.status(),
+        'prediction_cache': prediction_cache.stats(),
+        'microbatch': microbatcher.stats() if microbatcher else None,
+        'audit_log': audit_log.stats(),
+        'drift': drift_monitor.stats()
+    }
 
 # Health check endpoint
 @app.route('/health')
 def health_check():
-    return jsonify({
-        'status': 'healthy',
-        'model_loaded': model is not None,
-        'python_version': sys.version,
-        'cwd': os.getcwd()
-    })
+    return jsonify(health_status())
 
 # Simple test route
 @app.route('/test')
 def test():
-    return "✅ Flask app is running! Model loaded: " + str(model is not None)
+    return "✅ Flask app is running! Model loaded: " + str(model_registry.current is not None)
 
 @app.route('/')
 def home():
     return render_template('index.html')
 
-@app.route('/reload-model')
-def reload_model():
-    """Force reload the model - useful for debugging"""
-    global model
-    
-    print("🔄 Forcing model reload...")
-    
-    model = None
+def request_model_reload():
+    """
+    Reload the model in the background and return immediately. The current
+    model keeps serving until the new one is loaded and validated; touching
+    the trigger file makes every other worker reload as well.
+    """
+    print("🔄 Model reload requested...")
     try:
-        possible_paths = [
-            'heart_disease_pipeline.pkl',
-            'models/heart_disease_pipeline.pkl',
-            './models/heart_disease_pipeline.pkl',
-            os.path.join('models', 'heart_disease_pipeline.pkl'),
-            os.path.join(os.path.dirname(__file__), 'models', 'heart_disease_pipeline.pkl')
-        ]
-        
-        for i, path in enumerate(possible_paths):
-            print(f"  Path {i+1}: {path} - {'EXISTS' if os.path.exists(path) else 'NOT FOUND'}")
-            if os.path.exists(path):
-                try:
-                    model = joblib.load(path)
-                    print(f"✅ Model reloaded successfully from: {path}")
-                    print(f"Model type: {type(model)}")
-                    
-                    # Test prediction
-                    sample_data = {
-                        'State_Name': 'Delhi',
-                        'Age': 45,
-                        'Gender': 'Male',
-                        'Diabetes': 1,
-                        'Hypertension': 1,
-                        'Obesity': 1,
-                        'Smoking': 1,
-                        'Alcohol_Consumption': 0,
-                        'Physical_Activity': 1,
-                        'Diet_Score': 3,
-                        'Cholesterol_Level': 280,
-                        'Triglyceride_Level': 220,
-                        'LDL_Level': 160,
-                        'HDL_Level': 35,
-                        'Systolic_BP': 160,
-                        'Diastolic_BP': 100,
-                        'Air_Pollution_Exposure': 1,
-                        'Family_History': 1,
-                        'Stress_Level': 8,
-                        'Healthcare_Access': 1,
-                        'Heart_Attack_History': 0,
-                        'Emergency_Response_Time': 250,
-                        'Annual_Income': 400000,
-                        'Health_Insurance': 0
-                    }
-                    
-                    test_df = pd.DataFrame([sample_data])
-                    pred_prob = model.predict_proba(test_df)[0][1]
-                    
-                    return f"""
-                    <h2>✅ Model Reload Successful!</h2>
-                    <p><strong>Model Path:</strong> {path}</p>
-                    <p><strong>Model Type:</strong> {type(model)}</p>
-                    <p><strong>Test Prediction:</strong> {pred_prob:.4f} ({pred_prob*100:.1f}%)</p>
-                    <p><strong>Status:</strong> Model is working correctly!</p>
-                    <a href="/predict">Test the prediction form</a>
-                    """
-                except Exception as load_error:
-                    print(f"❌ Failed to reload from {path}: {load_error}")
-        
-        if model is None:
-            return f"""
-            <h2>❌ Model Reload Failed</h2>
-            <p>No model could be loaded from any path.</p>
-            <p><strong>Available files:</strong> {os.listdir('.')}</p>
-            <p><strong>Models directory:</strong> {os.listdir('models') if os.path.exists('models') else 'Not found'}</p>
-            """
-            
-    except Exception as e:
-        return f"""
-        <h2>❌ Model Reload Error</h2>
-        <p><strong>Error:</strong> {e}</p>
-        <p><strong>Type:</strong> {type(e)}</p>
-        """
+        with open(MODEL_RELOAD_TRIGGER, 'a'):
+            os.utime(MODEL_RELOAD_TRIGGER, None)
+    except OSError as e:
+        print(f"❌ Could not touch reload trigger {MODEL_RELOAD_TRIGGER}: {e}")
+    started = model_registry.reload_async('reload-model')
+    return {'reload_started': started, 'model': model_registry.status()}
+
+@app.route('/reload-model', methods=['GET', 'POST'])
+def reload_model():
+    return jsonify(request_model_reload()), 202
+
+# Content type of the Prometheus text exposition format
+METRICS_CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+
+def metrics_text():
+    """Prometheus text exposition: request/stage histograms, errors, model and cache state"""
+    served = model_registry.current
+    status = model_registry.status()
+    cache = prediction_cache.stats()
+    audit = audit_log.stats()
+    gauges = [
+        ('heart_model_info', 'Served model (value is always 1)',
+         {'version': status['version'] or 'none', 'type': status['type'], 'path': status['path'] or ''}, 1),
+        ('heart_model_loaded', 'Whether an ML model (not the rule-based fallback) is served', {},
+         int(served is not None)),
+        ('heart_model_loaded_timestamp_seconds', 'When the served model was loaded', {},
+         status['loaded_at'] or 0),
+        ('heart_model_generation', 'Model swaps since start-up', {}, status['generation']),
+        ('heart_model_last_reload_ok', 'Whether the last model (re)load succeeded', {},
+         int(status['last_reload']['status'] == 'ok')),
+        ('heart_prediction_cache_entries', 'Entries in this worker\'s prediction cache', {}, cache['size']),
+        ('heart_prediction_cache_evictions', 'Evictions from this worker\'s prediction cache', {}, cache['evictions']),
+        ('heart_audit_log_buffered', 'Audited rows waiting in this worker\'s buffer', {}, audit['buffered']),
+        ('heart_audit_log_dropped', 'Audited rows this worker dropped because its buffer was full', {},
+         audit['dropped']),
+    ]
+    return metrics_registry.render(gauges)
+
+@app.route('/metrics')
+def metrics():
+    return metrics_text(), 200, {'Content-Type': METRICS_CONTENT_TYPE}
+
+def drift_report():
+    """/drift body and status: per-feature PSI/KS of the live inputs, or 404 without a baseline"""
+    report = drift_monitor.report()
+    if report is None:
+        return {'error': f'No drift baseline at {drift_monitor.baseline_path}; run retrain_model.py'}, 404
+    return report, 200
+
+@app.route('/drift')
+def drift():
+    body, status = drift_report()
+    return jsonify(body), status
 
 @app.route('/debug')
 def debug():
     """Debug route to check model loading status"""
+    served = model_registry.current
     debug_info = {
-        'model_loaded': model is not None,
-        'model_type': str(type(model)) if model else 'None',
+        'model_loaded': served is not None,
+        'model_type': str(type(served.model)) if served else 'None',
         'current_directory': os.getcwd(),
         'files_in_directory': os.listdir('.'),
         'python_version': sys.version
@@ -265,142 +337,236 @@ def debug():
         debug_info['models_directory'] = 'Directory not found'
     
     # Check if model files exist
-    model_files = {}
-    paths_to_check = [
-        'heart_disease_pipeline.pkl',
-        'models/heart_disease_pipeline.pkl',
-        './models/heart_disease_pipeline.pkl'
-    ]
-    
-    for path in paths_to_check:
-        model_files[path] = os.path.exists(path)
-    
-    debug_info['model_file_checks'] = model_files
+    debug_info['model_path'] = MODEL_PATH or None
+    debug_info['model_manifest'] = MODEL_MANIFEST if os.path.exists(MODEL_MANIFEST) else None
+    debug_info['model_file_checks'] = {path: os.path.exists(path) for path in DEFAULT_MODEL_PATHS}
     
     return f"<pre>{json.dumps(debug_info, indent=2)}</pre>"
 
-@app.route('/predict', methods=['GET', 'POST'])
-def predict():
-    if request.method == 'POST':
-        # Extract all form data and convert to proper numeric format
-        state_value = request.form.get('state', 'Delhi')
-        # If Kerala is selected, map it to Tamil Nadu for the model
-        if state_value == 'Kerala':
-            state_value = 'Tamil Nadu'
-            
-        patient_data = {
-            'State_Name': state_value,
-            'Age': int(request.form.get('age', 45)),
-            'Gender': request.form.get('gender', 'Male'),  # Keep as string for proper encoding
-            'Diabetes': 1 if request.form.get('diabetes') else 0,
-            'Hypertension': 1 if request.form.get('hypertension') else 0,
-            'Obesity': 1 if request.form.get('obesity') else 0,
-            'Smoking': 1 if request.form.get('smoking') else 0,
-            'Alcohol_Consumption': 1 if request.form.get('alcohol') else 0,
-            'Physical_Activity': int(request.form.get('physical_activity', 2)),
-            'Diet_Score': int(request.form.get('diet_score', 5)),
-            'Cholesterol_Level': int(request.form.get('cholesterol', 200)),
-            'Triglyceride_Level': int(request.form.get('triglyceride', 150)),
-            'LDL_Level': int(request.form.get('ldl', 100)),
-            'HDL_Level': int(request.form.get('hdl', 50)),
-            'Systolic_BP': int(request.form.get('systolic_bp', 120)),
-            'Diastolic_BP': int(request.form.get('diastolic_bp', 80)),
-            'Air_Pollution_Exposure': int(request.form.get('air_pollution', 1)),
-            'Family_History': 1 if request.form.get('family_history') else 0,
-            'Stress_Level': int(request.form.get('stress_level', 5)),
-            'Healthcare_Access': 1 if request.form.get('healthcare', 'Urban') == 'Urban' else 0,
-            'Heart_Attack_History': 1 if request.form.get('heart_attack_history') else 0,
-            'Emergency_Response_Time': int(request.form.get('emergency_time', 200)),
-            'Annual_Income': int(request.form.get('annual_income', 500000)),
-            'Health_Insurance': 1 if request.form.get('health_insurance') else 0
-        }
+def parse_patient_form(form):
+    """Parse the /predict form into a PatientRecord; raises RecordError on invalid input"""
+    return PatientRecord.from_form(form)
+
+def error_context(message):
+    """result.html context for a request that could not be scored"""
+    return dict(risk_score=50,
+                risk_category='Error',
+                feature_importance=[('Error', message)])
+
+def audit_prediction(endpoint, served, started, **entry):
+    """Queue an audit log entry for a served prediction (latency measured from started)"""
+    if audit_log.enabled:
+        audit_log.record(endpoint=endpoint,
+                         model='rule_based' if served is None else served.model_type,
+                         model_version=None if served is None else served.version,
+                         latency_ms=round((time.perf_counter() - started) * 1000, 3),
+                         **entry)
+
+def predict_context(patient_data, started=None):
+    """
+    result.html context for one patient: the served model's prediction
+    (through the prediction cache), or the rule-based score without a model.
+    started is the request's perf_counter start, for the audit log latency.
+    """
+    if started is None:
+        started = time.perf_counter()
+    drift_monitor.observe(patient_data)
+    # Check if model is loaded; one snapshot serves the whole request
+    served = model_registry.current
+    if served is None:
+        print("⚠️  No ML model available, using rule-based prediction")
+        # Rule-based prediction system
+        with stage('rules'):
+            risk_score = calculate_rule_based_risk(patient_data)
+            risk_category = categorize_risk(risk_score)
+        audit_prediction('/predict', None, started, inputs=patient_data, probability=risk_score,
+                         risk_category=risk_category)
         
-        # Create DataFrame (required for the sklearn pipeline) - NO Patient_ID
-        X = pd.DataFrame([patient_data])
+        # Create feature importance for rule-based system
+        feature_importance = [
+            ('Age', f"{patient_data['Age']} years"),
+            ('High Risk Conditions', f"{'High' if (patient_data['Diabetes'] + patient_data['Hypertension'] + patient_data['Obesity']) >= 2 else 'Low'}"),
+            ('Lifestyle Factors', f"{'Poor' if (patient_data['Smoking'] + patient_data['Physical_Activity']) >= 1 else 'Good'}"),
+            ('Blood Pressure', f"{patient_data['Systolic_BP']}/{patient_data['Diastolic_BP']} mmHg"),
+            ('Cholesterol', f"{patient_data['Cholesterol_Level']} mg/dL"),
+            ('Family History', 'Yes' if patient_data['Family_History'] else 'No'),
+            ('Stress Level', f"{patient_data['Stress_Level']}/10")
+        ]
         
-        # Check if model is loaded
-        if model is None:
-            print("⚠️  No ML model available, using rule-based prediction")
-            # Rule-based prediction system
-            risk_score = calculate_rule_based_risk(patient_data)
-            risk_category = 'Low' if risk_score < 0.33 else ('Medium' if risk_score < 0.66 else 'High')
-            
-            # Create feature importance for rule-based system
-            feature_importance = [
-                ('Age', f"{patient_data['Age']} years"),
-                ('High Risk Conditions', f"{'High' if (patient_data['Diabetes'] + patient_data['Hypertension'] + patient_data['Obesity']) >= 2 else 'Low'}"),
-                ('Lifestyle Factors', f"{'Poor' if (patient_data['Smoking'] + patient_data['Physical_Activity']) >= 1 else 'Good'}"),
-                ('Blood Pressure', f"{patient_data['Systolic_BP']}/{patient_data['Diastolic_BP']} mmHg"),
-                ('Cholesterol', f"{patient_data['Cholesterol_Level']} mg/dL"),
-                ('Family History', 'Yes' if patient_data['Family_History'] else 'No'),
-                ('Stress Level', f"{patient_data['Stress_Level']}/10")
-            ]
-            
-            return render_template('result.html',
-                                 risk_score=int(risk_score * 100),
-                                 risk_category=risk_category,
-                                 feature_importance=feature_importance)
+        return dict(risk_score=int(risk_score * 100),
+                    risk_category=risk_category,
+                    feature_importance=feature_importance)
+    
+    try:
+        # Single predict_proba pass; class and category are derived from it
+        key = cache_key(patient_data, f"{served.version}:{id(served.model)}")
+        cached = prediction_cache.get(key)
+        if cached is None:
+            metrics_registry.inc('heart_prediction_cache_requests_total', result='miss')
+            score = microbatcher.predict_patient if microbatcher else predict_patient
+            cached = score(served.model, served.model_type, patient_data)
+            prediction_cache.put(key, cached)
+        else:
+            metrics_registry.inc('heart_prediction_cache_requests_total', result='hit')
+        pred_prob, pred_class, risk_category = cached
+        audit_prediction('/predict', served, started, inputs=patient_data, probability=pred_prob,
+                         risk_category=risk_category)
+        print(f"🔮 {served.model_type.capitalize()} model prediction: {pred_prob:.4f}")
+        
+        # Create simple feature importance without SHAP
+        feature_importance = [
+            ('Age', patient_data['Age']),
+            ('Cholesterol Level', patient_data['Cholesterol_Level']),
+            ('Blood Pressure', f"{patient_data['Systolic_BP']}/{patient_data['Diastolic_BP']}"),
+            ('Family History', 'Yes' if patient_data['Family_History'] else 'No'),
+            ('Smoking', 'Yes' if patient_data['Smoking'] else 'No'),
+            ('Physical Activity', patient_data['Physical_Activity']),
+            ('Stress Level', patient_data['Stress_Level'])
+        ]
+        
+        return dict(risk_score=int(pred_prob*100),
+                    risk_category=risk_category,
+                    feature_importance=feature_importance)
         
+    except Exception as e:
+        print(f"Prediction error: {e}")
+        count_error('prediction')
+        return error_context(str(e))
+
+@app.route('/predict', methods=['GET', 'POST'])
+def predict():
+    if request.method == 'POST':
         try:
-            # Handle different model types
-            global model_type
-            if model_type == "simple":
-                # Simple model expects only 12 features in specific order
-                simple_features = [
-                    patient_data['Age'],
-                    patient_data['Diabetes'], 
-                    patient_data['Hypertension'],
-                    patient_data['Obesity'],
-                    patient_data['Smoking'],
-                    patient_data['Physical_Activity'],
-                    patient_data['Diet_Score'],
-                    patient_data['Cholesterol_Level'],
-                    patient_data['Systolic_BP'],
-                    patient_data['Diastolic_BP'],
-                    patient_data['Family_History'],
-                    patient_data['Stress_Level']
-                ]
-                
-                # Convert to numpy array for simple model
-                X_simple = np.array([simple_features])
-                pred_prob = model.predict_proba(X_simple)[0][1]
-                pred_class = model.predict(X_simple)[0]
-                print(f"🔮 Simple model prediction: {pred_prob:.4f}")
-                
-            else:
-                # Complex model expects DataFrame with all features
-                X = pd.DataFrame([patient_data])
-                pred_prob = model.predict_proba(X)[0][1]
-                pred_class = model.predict(X)[0]
-                print(f"🔮 Complex model prediction: {pred_prob:.4f}")
-            
-            risk_category = 'Low' if pred_prob < 0.33 else ('Medium' if pred_prob < 0.66 else 'High')
-            
-            # Create simple feature importance without SHAP
-            feature_importance = [
-                ('Age', patient_data['Age']),
-                ('Cholesterol Level', patient_data['Cholesterol_Level']),
-                ('Blood Pressure', f"{patient_data['Systolic_BP']}/{patient_data['Diastolic_BP']}"),
-                ('Family History', 'Yes' if patient_data['Family_History'] else 'No'),
-                ('Smoking', 'Yes' if patient_data['Smoking'] else 'No'),
-                ('Physical Activity', patient_data['Physical_Activity']),
-                ('Stress Level', patient_data['Stress_Level'])
-            ]
-            
-            return render_template('result.html',
-                                   risk_score=int(pred_prob*100),
-                                   risk_category=risk_category,
-                                   feature_importance=feature_importance)
-            
-        except Exception as e:
-            print(f"Prediction error: {e}")
-            return render_template('result.html',
-                                 risk_score=50,
-                                 risk_category='Error',
-                                 feature_importance=[('Error', str(e))])
+            with stage('parse_form'):
+                patient_data = parse_patient_form(request.form)
+        except RecordError as e:
+            count_error('invalid_form')
+            return render_template('result.html', **error_context(str(e))), 400
+        context = predict_context(patient_data, g.get('request_started'))
+        with stage('render'):
+            return render_template('result.html', **context)
     
     return render_template('predict.html')
 
+# Content types read as newline-delimited JSON by the batch endpoint
+NDJSON_TYPES = ('application/x-ndjson', 'application/jsonl', 'application/ndjson')
+
+def decode_batch_body(data, mimetype):
+    """
+    Decode a batch request body (bytes) as a list of records.
+    Accepts a JSON array or newline-delimited JSON (one object per line).
+    """
+    if (mimetype or '').lower() in NDJSON_TYPES:
+        records = []
+        for line in data.decode('utf-8').splitlines():
+            line = line.strip()
+            if line:
+                records.append(json.loads(line))
+        return records
+
+    payload = json.loads(data)
+    if not isinstance(payload, list):
+        raise ValueError('Request body must be a JSON array of patient records')
+    return payload
+
+def parse_batch_body():
+    """Read the current Flask request's body as a list of records"""
+    return decode_batch_body(request.get_data(), request.mimetype)
+
+def validate_patient_batch(records):
+    """
+    Parse a list of JSON patient records with PatientRecord.from_json.
+    Returns the parsed records (None for an invalid row) and a list with one
+    error message (or None) per row.
+    """
+    parsed = [None] * len(records)
+    errors = [None] * len(records)
+    for i, record in enumerate(records):
+        if not isinstance(record, dict):
+            errors[i] = 'Record must be a JSON object'
+            continue
+        try:
+            parsed[i] = PatientRecord.from_json(record)
+        except RecordError as e:
+            errors[i] = f"Missing or invalid fields: {', '.join(e.errors)}"
+    return parsed, errors
+
+def batch_response(records, started=None):
+    """
+    Score a parsed batch request; returns (JSON body, HTTP status).
+    Invalid rows get a per-row error instead of failing the whole batch.
+    """
+    import numpy as np
+
+    if started is None:
+        started = time.perf_counter()
+
+    if len(records) > BATCH_MAX_ROWS:
+        count_error('batch_too_large')
+        return {'error': f'Batch too large: {len(records)} rows (max {BATCH_MAX_ROWS})'}, 413
+
+    served = model_registry.current
+    with stage('validate'):
+        parsed, errors = validate_patient_batch(records)
+    valid_idx = np.array([i for i, err in enumerate(errors) if err is None], dtype=int)
+    if len(valid_idx) < len(records):
+        count_error('invalid_batch_row', len(records) - len(valid_idx))
+    probabilities = np.full(len(records), np.nan)
+
+    if len(valid_idx):
+        X_valid = records_to_frame([parsed[i] for i in valid_idx], FEATURE_COLUMNS)
+        drift_monitor.observe_frame(X_valid)
+        try:
+            if served is None:
+                with stage('rules'):
+                    probabilities[valid_idx] = calculate_rule_based_risk_batch(X_valid)
+            else:
+                probabilities[valid_idx] = predict_proba_batch(served.model, served.model_type, X_valid)[:, 1]
+        except Exception as e:
+            print(f"Batch prediction error: {e}")
+            count_error('batch_prediction')
+            return {'error': f'Prediction failed: {e}'}, 500
+
+    results = []
+    for i, err in enumerate(errors):
+        if err is None:
+            prob = float(probabilities[i])
+            results.append({
+                'index': i,
+                'probability': prob,
+                'risk_category': categorize_risk(prob),
+                'error': None
+            })
+        else:
+            results.append({'index': i, 'probability': None, 'risk_category': None, 'error': err})
+    audit_prediction('/api/v1/predict/batch', served, started, rows=max(1, len(records)), inputs=records,
+                     results=results)
+
+    return {
+        'model': 'rule_based' if served is None else served.model_type,
+        'count': len(results),
+        'errors': len(records) - len(valid_idx),
+        'results': results
+    }, 200
+
+@app.route('/api/v1/predict/batch', methods=['POST'])
+def predict_batch():
+    """Score a JSON array (or NDJSON body) of patient records in one model call"""
+    try:
+        with stage('parse_body'):
+            records = parse_batch_body()
+    except Exception as e:
+        count_error('invalid_request')
+        return jsonify({'error': f'Invalid request body: {e}'}), 400
+
+    body, status = batch_response(records, g.get('request_started'))
+    with stage('serialize'):
+        return jsonify(body), status
+
 if __name__ == '__main__':
+    if '--profile-startup' in sys.argv:
+        from startup_profile import profile_startup
+        profile_startup()
+        sys.exit(0)
     port = int(os.environ.get('PORT', 5000))
     app.run(host='0.0.0.0', port=port, debug=False)
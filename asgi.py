@@ -0,0 +1,255 @@
+"""
+ASGI entry point serving the same pages and JSON API as app.py.
+
+    uvicorn asgi:app --workers 4
+    gunicorn -c gunicorn.conf.py -k uvicorn.workers.UvicornWorker asgi:app
+
+The event loop only reads requests and writes responses, so a worker can
+hold thousands of idle keep-alive connections and a slow client costs no
+thread. Form and JSON parsing, model scoring, the rule-based fallback,
+template rendering and serialization run in a bounded thread pool of
+ASGI_EXECUTOR_THREADS; requests beyond that wait on the loop instead of
+piling up threads. Threads rather than processes: the served model, the
+prediction cache and hot reloading live in app.py's module state, and
+NumPy/scikit-learn release the GIL for most of predict_proba.
+
+Routes: / and /predict (the same templates), /health, /metrics, /drift,
+/reload-model, /api/v1/predict/batch and /static/. /debug and /test stay
+Flask-only.
+"""
+import asyncio
+import json
+import mimetypes
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import parse_qsl
+
+from flask import render_template
+
+from app import (METRICS_CONTENT_TYPE, app as flask_app, audit_log, batch_response, decode_batch_body, drift_monitor,
+                 drift_report, error_context, health_status, metrics_text, model_registry, parse_patient_form,
+                 predict_context, request_model_reload)
+from metrics import count_error, metrics_registry, observe_request, stage
+from patient_record import RecordError
+
+# Threads running parsing, inference and rendering per worker process
+ASGI_EXECUTOR_THREADS = int(os.environ.get('ASGI_EXECUTOR_THREADS', 4))
+# Largest request body accepted, in bytes
+ASGI_MAX_BODY = int(os.environ.get('ASGI_MAX_BODY', 16 * 1024 * 1024))
+
+HTML = 'text/html; charset=utf-8'
+JSON = 'application/json'
+
+
+class RequestError(Exception):
+    def __init__(self, status, message):
+        super().__init__(message)
+        self.status = status
+
+
+class ClientDisconnected(Exception):
+    pass
+
+
+def render_page(template, path, **context):
+    """render_template outside a Flask request (url_for needs a request context)"""
+    with flask_app.test_request_context(path):
+        return render_template(template, **context).encode('utf-8')
+
+
+def json_body(payload):
+    return json.dumps(payload).encode('utf-8')
+
+
+def predict_page(data, started):
+    """POST /predict: urlencoded form body -> (result.html, status)"""
+    form = {}
+    for name, value in parse_qsl(data.decode('utf-8'), keep_blank_values=True):
+        form.setdefault(name, value)  # First value wins, as with Flask's request.form.get
+    try:
+        with stage('parse_form'):
+            patient_data = parse_patient_form(form)
+    except RecordError as e:
+        count_error('invalid_form')
+        return render_page('result.html', '/predict', **error_context(str(e))), 400
+    context = predict_context(patient_data, started)
+    with stage('render'):
+        return render_page('result.html', '/predict', **context), 200
+
+
+def batch_page(data, mimetype, started):
+    """POST /api/v1/predict/batch: JSON array or NDJSON body -> (JSON bytes, status)"""
+    try:
+        with stage('parse_body'):
+            records = decode_batch_body(data, mimetype)
+    except Exception as e:
+        count_error('invalid_request')
+        return json_body({'error': f'Invalid request body: {e}'}), 400
+    body, status = batch_response(records, started)
+    with stage('serialize'):
+        return json_body(body), status
+
+
+def read_static(filename):
+    root = os.path.realpath(flask_app.static_folder)
+    path = os.path.realpath(os.path.join(root, filename))
+    if not path.startswith(root + os.sep) or not os.path.isfile(path):
+        return None
+    with open(path, 'rb') as f:
+        return f.read()
+
+
+def _header(scope, name):
+    for key, value in scope.get('headers', ()):
+        if key == name:
+            return value.decode('latin-1')
+    return ''
+
+
+async def read_body(receive):
+    chunks, size = [], 0
+    while True:
+        message = await receive()
+        if message['type'] == 'http.disconnect':
+            raise ClientDisconnected()
+        chunk = message.get('body', b'')
+        size += len(chunk)
+        if size > ASGI_MAX_BODY:
+            raise RequestError(413, f'Request body larger than {ASGI_MAX_BODY} bytes')
+        chunks.append(chunk)
+        if not message.get('more_body'):
+            return b''.join(chunks)
+
+
+class HeartASGI:
+    """ASGI application; see the module docstring"""
+
+    def __init__(self, executor_threads=ASGI_EXECUTOR_THREADS):
+        self.executor_threads = executor_threads
+        self._executor = None
+        self._executor_pid = None
+        self._pages = {}
+        self._static = {}
+        self.routes = {
+            '/': ({'GET'}, self.home),
+            '/predict': ({'GET', 'POST'}, self.predict),
+            '/health': ({'GET'}, self.health),
+            '/metrics': ({'GET'}, self.metrics),
+            '/drift': ({'GET'}, self.drift),
+            '/reload-model': ({'GET', 'POST'}, self.reload_model),
+            '/api/v1/predict/batch': ({'POST'}, self.predict_batch),
+        }
+
+    @property
+    def executor(self):
+        # A pool created before a fork has no threads in the child
+        if self._executor_pid != os.getpid():
+            self._executor = ThreadPoolExecutor(max_workers=self.executor_threads,
+                                                thread_name_prefix='asgi-inference')
+            self._executor_pid = os.getpid()
+        return self._executor
+
+    async def run(self, func, *args):
+        return await asyncio.get_running_loop().run_in_executor(self.executor, func, *args)
+
+    async def __call__(self, scope, receive, send):
+        if scope['type'] == 'lifespan':
+            await self.lifespan(receive, send)
+            return
+        if scope['type'] != 'http':
+            return
+
+        started = time.perf_counter()
+        method, path = scope['method'], scope['path']
+        endpoint = path
+        model_registry.ensure_watcher()
+        metrics_registry.ensure_flusher()
+        drift_monitor.ensure_flusher()
+        try:
+            if path.startswith('/static/'):
+                endpoint = '/static/<path:filename>'
+                status, content_type, body = await self.static(path[len('/static/'):])
+            elif path in self.routes:
+                methods, handler = self.routes[path]
+                if method not in methods:
+                    raise RequestError(405, 'Method Not Allowed')
+                status, content_type, body = await handler(scope, receive, started)
+            else:
+                endpoint = 'unmatched'
+                raise RequestError(404, 'Not Found')
+        except ClientDisconnected:
+            return
+        except RequestError as e:
+            status, content_type, body = e.status, 'text/plain; charset=utf-8', str(e).encode('utf-8')
+        except Exception as e:
+            print(f"❌ Unhandled error on {method} {path}: {e}")
+            status, content_type, body = 500, 'text/plain; charset=utf-8', b'Internal Server Error'
+
+        await send({'type': 'http.response.start', 'status': status,
+                    'headers': [(b'content-type', content_type.encode('latin-1')),
+                                (b'content-length', str(len(body)).encode('latin-1'))]})
+        await send({'type': 'http.response.body', 'body': body})
+        observe_request(endpoint, method, status, time.perf_counter() - started)
+
+    async def lifespan(self, receive, send):
+        while True:
+            message = await receive()
+            if message['type'] == 'lifespan.startup':
+                model_registry.ensure_watcher()
+                metrics_registry.ensure_flusher()
+                drift_monitor.ensure_flusher()
+                await send({'type': 'lifespan.startup.complete'})
+            elif message['type'] == 'lifespan.shutdown':
+                if self._executor is not None and self._executor_pid == os.getpid():
+                    self._executor.shutdown(wait=False)
+                audit_log.close()
+                await send({'type': 'lifespan.shutdown.complete'})
+                return
+
+    async def page(self, template, path):
+        # index.html and predict.html do not depend on the request
+        if template not in self._pages:
+            self._pages[template] = await self.run(render_page, template, path)
+        return 200, HTML, self._pages[template]
+
+    async def home(self, scope, receive, started):
+        return await self.page('index.html', '/')
+
+    async def predict(self, scope, receive, started):
+        if scope['method'] == 'GET':
+            return await self.page('predict.html', '/predict')
+        data = await read_body(receive)
+        body, status = await self.run(predict_page, data, started)
+        return status, HTML, body
+
+    async def predict_batch(self, scope, receive, started):
+        data = await read_body(receive)
+        mimetype = _header(scope, b'content-type').split(';')[0].strip()
+        body, status = await self.run(batch_page, data, mimetype, started)
+        return status, JSON, body
+
+    async def health(self, scope, receive, started):
+        return 200, JSON, json_body(health_status())
+
+    async def metrics(self, scope, receive, started):
+        return 200, METRICS_CONTENT_TYPE, (await self.run(metrics_text)).encode('utf-8')
+
+    async def drift(self, scope, receive, started):
+        body, status = await self.run(drift_report)
+        return status, JSON, json_body(body)
+
+    async def reload_model(self, scope, receive, started):
+        return 202, JSON, json_body(await self.run(request_model_reload))
+
+    async def static(self, filename):
+        if filename not in self._static:
+            content = await self.run(read_static, filename)
+            if content is None:
+                raise RequestError(404, 'Not Found')
+            self._static[filename] = content
+        content_type = mimetypes.guess_type(filename)[0] or 'application/octet-stream'
+        return 200, content_type, self._static[filename]
+
+
+app = HeartASGI()
@@ -0,0 +1,187 @@
+"""
+Buffered, non-blocking audit log of served predictions.
+
+The request path only appends an entry (references to the already parsed
+inputs and the result, no serialisation) to an in-memory ring buffer. A
+background thread drains the buffer every AUDIT_LOG_FLUSH_INTERVAL seconds,
+or as soon as AUDIT_LOG_BATCH rows are waiting, and appends them to a
+JSON-lines file in one write. When the file would grow past
+AUDIT_LOG_MAX_BYTES it is rotated to <path>.1 ... <path>.<backups>.
+
+The buffer is bounded by patient rows, not entries: a batch request is
+one entry that weighs as many rows as it scored, so AUDIT_LOG_BUFFER rows
+bound the memory held however requests are sized. If the writer falls
+behind and the buffer is full, entries are dropped (the oldest by default,
+or the newest) and their rows counted rather than blocking a request; a
+batch larger than the whole buffer is always dropped. The buffer is flushed on interpreter exit, on gunicorn worker
+exit and on ASGI shutdown.
+
+Several gunicorn workers share one file: each flush and rotation happens
+under an exclusive lock on <path>.lock, and each flush is a single write.
+"""
+import atexit
+import json
+import os
+import threading
+import time
+from collections import deque
+
+try:
+    import fcntl
+except ImportError:  # Windows: single-process development server only
+    fcntl = None
+
+
+def _jsonable(value):
+    """Fallback for json.dumps: PatientRecords, NumPy scalars and arrays"""
+    if hasattr(value, 'to_dict'):
+        return value.to_dict()
+    if hasattr(value, 'tolist'):
+        return value.tolist()
+    return str(value)
+
+
+class AuditLog:
+    """Row-bounded buffer of prediction entries plus the thread that appends them to path"""
+
+    def __init__(self, path, capacity=10000, flush_interval=1.0, batch_size=500,
+                 max_bytes=64 * 1024 * 1024, backups=5, drop='oldest'):
+        if drop not in ('oldest', 'newest'):
+            raise ValueError(f"drop must be 'oldest' or 'newest', not {drop!r}")
+        self.path = path
+        self.capacity = max(1, capacity)
+        self.flush_interval = flush_interval
+        self.batch_size = max(1, batch_size)
+        self.max_bytes = max_bytes
+        self.backups = backups
+        self.drop = drop
+        self.written = 0
+        self.dropped = 0
+        self.rotations = 0
+        self._buffer = deque()  # (rows, entry)
+        self._buffered_rows = 0
+        self._cond = threading.Condition()
+        self._write_lock = threading.Lock()
+        self._writer_pid = None
+        self._closed = False
+
+    @property
+    def enabled(self):
+        return bool(self.path)
+
+    def record(self, rows=1, **entry):
+        """
+        Queue one entry covering rows patients; never blocks on I/O.
+        Returns False if the entry was dropped.
+        """
+        if not self.path or self._closed:
+            return False
+        entry.setdefault('ts', time.time())
+        entry['rows'] = rows
+        self._ensure_writer()
+        with self._cond:
+            if rows > self.capacity:
+                self.dropped += rows
+                return False
+            if self._buffered_rows + rows > self.capacity:
+                if self.drop == 'newest':
+                    self.dropped += rows
+                    return False
+                while self._buffered_rows + rows > self.capacity:
+                    old_rows, _ = self._buffer.popleft()
+                    self._buffered_rows -= old_rows
+                    self.dropped += old_rows
+            self._buffer.append((rows, entry))
+            self._buffered_rows += rows
+            if self._buffered_rows >= self.batch_size:
+                self._cond.notify()
+        return True
+
+    def _ensure_writer(self):
+        # Threads do not survive a fork, so each gunicorn worker starts its own
+        if self._writer_pid == os.getpid():
+            return
+        with self._cond:
+            if self._writer_pid == os.getpid():
+                return
+            self._writer_pid = os.getpid()
+            # Entries copied from the parent before the fork are the parent's to write
+            self._buffer.clear()
+            self._buffered_rows = 0
+            threading.Thread(target=self._run, name='audit-log', daemon=True).start()
+            atexit.register(self.close)
+
+    def _run(self):
+        while not self._closed:
+            with self._cond:
+                if self._buffered_rows < self.batch_size:
+                    self._cond.wait(self.flush_interval)
+            try:
+                self.flush()
+            except OSError as e:
+                print(f"❌ Audit log flush failed: {e}")
+
+    def flush(self):
+        """Write every buffered entry now (one append); returns how many entries were written"""
+        with self._cond:
+            entries = [entry for _, entry in self._buffer]
+            rows = self._buffered_rows
+            self._buffer.clear()
+            self._buffered_rows = 0
+        if not entries:
+            return 0
+        data = ''.join(json.dumps(entry, default=_jsonable, separators=(',', ':')) + '\n'
+                       for entry in entries).encode('utf-8')
+        with self._write_lock:
+            directory = os.path.dirname(os.path.abspath(self.path))
+            os.makedirs(directory, exist_ok=True)
+            with open(f'{self.path}.lock', 'a') as lock:
+                if fcntl is not None:
+                    fcntl.flock(lock, fcntl.LOCK_EX)
+                try:
+                    if self.max_bytes and os.path.exists(self.path) and \
+                            os.path.getsize(self.path) + len(data) > self.max_bytes:
+                        self._rotate()
+                    with open(self.path, 'ab') as f:
+                        f.write(data)
+                finally:
+                    if fcntl is not None:
+                        fcntl.flock(lock, fcntl.LOCK_UN)
+        self.written += rows
+        return len(entries)
+
+    def _rotate(self):
+        """path -> path.1 -> ... -> path.<backups>; the oldest backup is removed"""
+        if self.backups <= 0:
+            os.remove(self.path)
+        else:
+            for i in range(self.backups - 1, 0, -1):
+                if os.path.exists(f'{self.path}.{i}'):
+                    os.replace(f'{self.path}.{i}', f'{self.path}.{i + 1}')
+            os.replace(self.path, f'{self.path}.1')
+        self.rotations += 1
+
+    def close(self):
+        """Stop accepting entries and flush what is buffered (safe to call twice)"""
+        if self._closed:
+            return
+        self._closed = True
+        with self._cond:
+            self._cond.notify_all()
+        try:
+            self.flush()
+        except OSError as e:
+            print(f"❌ Audit log flush failed: {e}")
+
+    def stats(self):
+        with self._cond:
+            buffered = self._buffered_rows
+        return {
+            'path': self.path or None,
+            'buffered': buffered,  # Counts are in rows
+            'capacity': self.capacity,
+            'written': self.written,
+            'dropped': self.dropped,
+            'rotations': self.rotations,
+            'drop_policy': self.drop,
+        }
@@ -0,0 +1,138 @@
+#!/usr/bin/env python3
+"""
+Side-by-side concurrency benchmark of the sync and the ASGI deployment
+
+Starts each target with the repo's gunicorn.conf.py and a trained pipeline:
+
+  sync  gunicorn app:app                                   (the Procfile deployment)
+  asgi  gunicorn -k uvicorn.workers.UvicornWorker asgi:app
+
+and, for each --idle level, first opens that many client connections that
+send a partial request and then go quiet (slow or idle clients), then
+drives POST /predict forms sampled from heart.csv at each --concurrency
+level and reports p50/p95/p99 latency, requests per second and failed or
+timed-out requests. The prediction cache is off so every request reaches
+the model.
+
+Needs uvicorn for the asgi target (`pip install uvicorn`).
+
+Usage: python benchmarks/bench_asgi.py [--targets sync asgi] [--workers 1]
+       [--concurrency 1 8 32] [--idle 0 100 1000] [--json out.json]
+"""
+import argparse
+import json
+import os
+import shutil
+import socket
+import sys
+import tempfile
+import time
+import urllib.error
+import urllib.parse
+import urllib.request
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from bench_serving import build_requests, drive, git_commit, gunicorn_server
+from bench_worker_memory import build_artifacts
+
+TARGETS = {
+    'sync': ('app:app', []),
+    'asgi': ('asgi:app', ['-k', 'uvicorn.workers.UvicornWorker']),
+}
+
+
+def open_idle_connections(base, count):
+    """Connections that send half a request line and then nothing"""
+    host, port = urllib.parse.urlsplit(base).netloc.split(':')
+    sockets = []
+    for _ in range(count):
+        sock = socket.create_connection((host, int(port)), timeout=5)
+        sock.sendall(b'GET /health HTTP/1.1\r\nHost: bench\r\n')
+        sockets.append(sock)
+    return sockets
+
+
+def post_form(url, body, timeout):
+    request = urllib.request.Request(url, data=body, headers={'Content-Type': 'application/x-www-form-urlencoded'})
+    try:
+        with urllib.request.urlopen(request, timeout=timeout) as response:
+            response.read()
+            return response.status == 200
+    except (urllib.error.URLError, OSError):
+        return False
+
+
+def report(row):
+    latency = row['latency_ms']
+    print(f"{row['target']:<6} {row['workers']:>7} {row['idle']:>6} {row['concurrency']:>5} "
+          f"{latency['p50']:>8.2f} {latency['p95']:>8.2f} {latency['p99']:>8.2f} {row['rps']:>8.1f} {row['errors']:>6}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--targets', nargs='+', choices=list(TARGETS), default=list(TARGETS))
+    parser.add_argument('--workers', type=int, default=1)
+    parser.add_argument('--concurrency', type=int, nargs='+', default=[1, 8, 32], help='active client threads')
+    parser.add_argument('--idle', type=int, nargs='+', default=[0, 100, 1000], help='idle connections held open')
+    parser.add_argument('--requests', type=int, default=300, help='measured requests per row')
+    parser.add_argument('--idle-requests', type=int, default=40,
+                        help='measured requests per row while idle connections are open')
+    parser.add_argument('--timeout', type=float, default=5.0, help='client timeout per request (seconds)')
+    parser.add_argument('--warmup', type=int, default=10)
+    parser.add_argument('--model', help='pipeline artifact to serve (default: train one)')
+    parser.add_argument('--trees', type=int, default=100, help='trees of the trained default model')
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--json', help='write results to this JSON file')
+    args = parser.parse_args()
+    # gunicorn_server settings: plain pipeline scoring, prediction cache off
+    args.scorer_mode, args.cache = 'pipeline', False
+
+    workdir = tempfile.mkdtemp(prefix='heart-asgi-')
+    results = []
+    try:
+        model_path = os.path.abspath(args.model) if args.model else None
+        if model_path is None:
+            print(f"🔧 Training {args.trees}-tree pipeline into {workdir}...")
+            build_artifacts(workdir, args.trees)
+            model_path = os.path.join(workdir, 'heart_disease_pipeline.pkl')
+        forms, _ = build_requests(args.requests + args.warmup, 1, args.seed)
+        bodies = [urllib.parse.urlencode(form).encode() for form in forms]
+
+        print(f"\n{'target':<6} {'workers':>7} {'idle':>6} {'conc.':>5} {'p50 ms':>8} {'p95 ms':>8} "
+              f"{'p99 ms':>8} {'req/s':>8} {'failed':>6}")
+        for target in args.targets:
+            app_spec, extra_args = TARGETS[target]
+            for idle in args.idle:
+                # A fresh server per idle level: a blocked sync worker may have been restarted
+                with gunicorn_server(workdir, model_path, args.workers, args, app_spec, extra_args) as base:
+                    sockets = open_idle_connections(base, idle)
+                    try:
+                        # Blocked requests each cost a full --timeout, so idle rows send fewer
+                        n_requests = args.idle_requests if idle else args.requests
+                        for concurrency in args.concurrency:
+                            def send(body):
+                                return post_form(f'{base}/predict', body, args.timeout)
+
+                            row = drive(send, bodies[:n_requests + args.warmup], concurrency, args.warmup)
+                            row.update(target=target, workers=args.workers, idle=idle)
+                            results.append(row)
+                            report(row)
+                    finally:
+                        for sock in sockets:
+                            sock.close()
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+    if args.json:
+        meta = {'commit': git_commit(), 'timestamp': time.time(), 'cpu_count': os.cpu_count(),
+                'workers': args.workers, 'timeout': args.timeout,
+                'model': args.model or f'trained {args.trees}-tree pipeline'}
+        with open(args.json, 'w') as f:
+            json.dump({'meta': meta, 'results': results}, f, indent=2)
+        print(f"\n💾 Results written to {args.json}")
+
+
+if __name__ == '__main__':
+    main()
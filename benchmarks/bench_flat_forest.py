@@ -0,0 +1,101 @@
+#!/usr/bin/env python3
+"""
+Benchmark FlatForest against RandomForestClassifier.predict_proba
+
+Fits the same forests as retrain_model.py (200 trees on the preprocessed
+24 features) and create_simple_model.py (100 trees on 12 features) and
+reports p50/p99 latency per call for batch sizes 1, 32 and 1024.
+
+Usage: python benchmarks/bench_flat_forest.py [--repeats 200] [--json out.json]
+"""
+import argparse
+import json
+import os
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+import numpy as np
+import pandas as pd
+from sklearn.compose import ColumnTransformer
+from sklearn.ensemble import RandomForestClassifier
+from sklearn.impute import SimpleImputer
+from sklearn.pipeline import Pipeline
+from sklearn.preprocessing import OneHotEncoder, StandardScaler
+
+from flat_forest import FlatForest
+from inference import CATEGORICAL_COLUMNS, FEATURE_COLUMNS, NUMERIC_COLUMNS, SIMPLE_FEATURES
+
+BATCH_SIZES = (1, 32, 1024)
+
+
+def latency_percentiles(fn, X, repeats):
+    """Return (p50, p99) wall-clock latency in milliseconds"""
+    fn(X)  # warm-up
+    timings = np.empty(repeats)
+    for i in range(repeats):
+        start = time.perf_counter()
+        fn(X)
+        timings[i] = time.perf_counter() - start
+    return float(np.percentile(timings, 50) * 1e3), float(np.percentile(timings, 99) * 1e3)
+
+
+def build_forests(df):
+    """Fit the complex-model forest (on preprocessed features) and the simple-model forest"""
+    y = df['Heart_Attack_Risk']
+    preprocessor = ColumnTransformer(transformers=[
+        ('num', Pipeline([('imputer', SimpleImputer(strategy='median')),
+                          ('scaler', StandardScaler())]), NUMERIC_COLUMNS),
+        ('cat', Pipeline([('imputer', SimpleImputer(strategy='most_frequent')),
+                          ('onehot', OneHotEncoder(handle_unknown='ignore'))]), CATEGORICAL_COLUMNS)
+    ])
+    X_complex = preprocessor.fit_transform(df[FEATURE_COLUMNS])
+    if hasattr(X_complex, 'toarray'):
+        X_complex = X_complex.toarray()
+    X_simple = df[SIMPLE_FEATURES].to_numpy(dtype=np.float64)
+
+    complex_rf = RandomForestClassifier(n_estimators=200, class_weight='balanced', random_state=42)
+    simple_rf = RandomForestClassifier(n_estimators=100, class_weight='balanced', random_state=42)
+    return {
+        'complex_200_trees': (complex_rf.fit(X_complex, y), X_complex),
+        'simple_100_trees': (simple_rf.fit(X_simple, y), X_simple),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--repeats', type=int, default=200, help='timed calls per batch size')
+    parser.add_argument('--json', help='write results to this JSON file')
+    args = parser.parse_args()
+
+    df = pd.read_csv(os.path.join(ROOT, 'heart.csv'))
+    rng = np.random.default_rng(0)
+    results = []
+
+    for name, (forest, X) in build_forests(df).items():
+        flat = FlatForest.from_estimator(forest)
+        print(f"\n🌲 {name}: {flat.n_estimators} trees, {len(flat.feature)} nodes, max depth {flat.max_depth}")
+        print(f"{'batch':>6} {'sklearn p50':>12} {'sklearn p99':>12} {'flat p50':>10} {'flat p99':>10} {'speedup':>8}")
+        for batch_size in BATCH_SIZES:
+            batch = X[rng.integers(0, len(X), batch_size)]
+            repeats = max(5, args.repeats // (1 + batch_size // 64))
+            sk_p50, sk_p99 = latency_percentiles(forest.predict_proba, batch, repeats)
+            flat_p50, flat_p99 = latency_percentiles(flat.predict_proba, batch, repeats)
+            print(f"{batch_size:>6} {sk_p50:>10.3f}ms {sk_p99:>10.3f}ms {flat_p50:>8.3f}ms {flat_p99:>8.3f}ms "
+                  f"{sk_p50 / flat_p50:>7.1f}x")
+            results.append({
+                'model': name, 'batch_size': batch_size, 'repeats': repeats,
+                'sklearn_p50_ms': sk_p50, 'sklearn_p99_ms': sk_p99,
+                'flat_p50_ms': flat_p50, 'flat_p99_ms': flat_p99,
+            })
+
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump(results, f, indent=2)
+        print(f"\n💾 Results written to {args.json}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,111 @@
+#!/usr/bin/env python3
+"""
+Compare an incremental model update with a full retrain
+
+Holds out the last --holdout rows of heart.csv as a common test set,
+trains the default retrain_model.py model on the first --base rows, then
+appends --new rows at a time. After each append it runs both
+`retrain_model.py --incremental` (on a copy of the previous model) and a
+full retrain on all rows so far, and reports the training time and the
+ROC AUC of both models on the common test set.
+
+Usage: python benchmarks/bench_incremental.py [--base 6000] [--new 500] [--steps 3]
+       [--model RandomForest|LogisticRegression] [--json out.json]
+"""
+import argparse
+import contextlib
+import io
+import json
+import os
+import shutil
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+import joblib
+import pandas as pd
+from sklearn.metrics import roc_auc_score
+
+import retrain_model
+from inference import FEATURE_COLUMNS
+
+
+def retrain(argv):
+    """Run retrain_model.main quietly; returns (wall seconds, its report)"""
+    started = time.perf_counter()
+    with contextlib.redirect_stdout(io.StringIO()):
+        report = retrain_model.main(argv)
+    return time.perf_counter() - started, report
+
+
+def holdout_auc(model_dir, test):
+    model = joblib.load(os.path.join(model_dir, 'heart_disease_pipeline.pkl'))
+    return roc_auc_score(test['Heart_Attack_Risk'], model.predict_proba(test[FEATURE_COLUMNS])[:, 1])
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--base', type=int, default=6000, help='rows in the initial training file')
+    parser.add_argument('--new', type=int, default=500, help='rows appended per step')
+    parser.add_argument('--steps', type=int, default=3)
+    parser.add_argument('--holdout', type=int, default=2000, help='rows kept out of training for the AUC')
+    parser.add_argument('--model', choices=['LogisticRegression', 'RandomForest'], default='RandomForest',
+                        help='model family trained by both paths')
+    parser.add_argument('--json', help='write results to this JSON file')
+    args = parser.parse_args()
+
+    df = pd.read_csv(os.path.join(ROOT, 'heart.csv'))
+    test = df.tail(args.holdout)
+    pool = df.iloc[:len(df) - args.holdout]
+    if args.base + args.new * args.steps > len(pool):
+        raise SystemExit(f"❌ Only {len(pool):,} training rows available")
+
+    workdir = tempfile.mkdtemp(prefix='heart-incremental-')
+    data = os.path.join(workdir, 'heart.csv')
+    inc_dir, full_dir = os.path.join(workdir, 'incremental'), os.path.join(workdir, 'full')
+    os.makedirs(inc_dir)
+    os.makedirs(full_dir)
+    results = []
+    try:
+        pool.head(args.base).to_csv(data, index=False)
+        seconds, base = retrain(['--data', data, '--output-dir', full_dir, '--model', args.model])
+        for name in ('heart_disease_pipeline.pkl', retrain_model.STATE_FILE):
+            shutil.copy(os.path.join(full_dir, name), inc_dir)
+        print(f"🔧 Base {base['model']} on {args.base:,} rows: {seconds:.2f}s, hold-out AUC {holdout_auc(full_dir, test):.4f}")
+
+        print(f"\n{'rows':>7} {'incr. train':>11} {'incr. total':>11} {'incr. AUC':>9} "
+              f"{'full train':>10} {'full total':>10} {'full AUC':>8}")
+        for step in range(1, args.steps + 1):
+            rows = args.base + args.new * step
+            pool.iloc[rows - args.new:rows].to_csv(data, mode='a', header=False, index=False)
+
+            inc_seconds, inc = retrain(['--data', data, '--output-dir', inc_dir, '--incremental'])
+            full_seconds, full = retrain(['--data', data, '--output-dir', full_dir, '--model', args.model])
+            result = {
+                'rows': rows,
+                'model': inc['model'],
+                'incremental_train_seconds': inc['stages']['incremental update'],
+                'incremental_total_seconds': inc_seconds,
+                'incremental_auc': holdout_auc(inc_dir, test),
+                'full_train_seconds': full['stages']['train + evaluate'],
+                'full_total_seconds': full_seconds,
+                'full_auc': holdout_auc(full_dir, test),
+            }
+            results.append(result)
+            print(f"{rows:>7,} {result['incremental_train_seconds']:>10.2f}s {inc_seconds:>10.2f}s "
+                  f"{result['incremental_auc']:>9.4f} {result['full_train_seconds']:>9.2f}s "
+                  f"{full_seconds:>9.2f}s {result['full_auc']:>8.4f}")
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump({'model': args.model, 'base': args.base, 'new': args.new, 'holdout': args.holdout, 'results': results}, f, indent=2)
+        print(f"\n💾 Results written to {args.json}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,145 @@
+#!/usr/bin/env python3
+"""
+Throughput and tail latency of /predict with micro-batching on and off
+
+Serves a trained pipeline with `gunicorn app:app` (one worker with as many
+gthread threads as the highest concurrency level) and, for each
+--concurrency level, drives POST /predict forms sampled from heart.csv
+with MICROBATCH=0 and MICROBATCH=1. The prediction cache is off so every
+request reaches the model. The inprocess target skips HTTP and calls
+predict_patient / MicroBatcher.predict_patient from the client threads,
+which isolates the model cost the batcher amortises.
+
+Usage: python benchmarks/bench_microbatch.py [--targets inprocess gunicorn]
+       [--concurrency 1 4 16 32] [--window-ms 2] [--max-rows 64] [--json out.json]
+"""
+import argparse
+import contextlib
+import json
+import os
+import shutil
+import sys
+import tempfile
+import time
+import urllib.parse
+import urllib.request
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from bench_serving import build_requests, drive, git_commit, gunicorn_server, http_post
+from bench_worker_memory import build_artifacts
+
+
+def report(row):
+    latency = row['latency_ms']
+    print(f"{row['target']:<10} {row['concurrency']:>5} {'on' if row['microbatch'] else 'off':>10} "
+          f"{latency['p50']:>8.2f} {latency['p95']:>8.2f} {latency['p99']:>8.2f} {row['rps']:>9.1f} "
+          f"{row.get('mean_batch', 1.0):>10.1f} {row['errors']:>6}")
+
+
+def run_inprocess(model_path, forms, args):
+    import joblib
+
+    # app.py only supplies the form parser here; it serves no model itself
+    os.environ.update(MODEL_PATH='none', MODEL_WATCH_INTERVAL='0', AUDIT_LOG_PATH='')
+    with open(os.devnull, 'w') as devnull, contextlib.redirect_stdout(devnull):
+        from app import parse_patient_form
+    from inference import predict_patient
+    from microbatch import MicroBatcher
+
+    model = joblib.load(model_path)
+    records = [parse_patient_form(form) for form in forms]
+    results = []
+    for concurrency in args.concurrency:
+        for microbatch in (False, True):
+            batcher = MicroBatcher(window_ms=args.window_ms, max_rows=args.max_rows)
+            score = batcher.predict_patient if microbatch else predict_patient
+
+            def send(record):
+                score(model, "complex", record)
+                return True
+
+            row = drive(send, records, concurrency, args.warmup)
+            row.update(target='inprocess', microbatch=microbatch)
+            if microbatch:
+                row['mean_batch'] = batcher.stats()['mean_rows']
+            results.append(row)
+            report(row)
+    return results
+
+
+def microbatch_stats(base):
+    with urllib.request.urlopen(f'{base}/health', timeout=10) as response:
+        return json.load(response)['microbatch'] or {'batches': 0, 'rows': 0}
+
+
+def run_gunicorn(workdir, model_path, forms, args):
+    bodies = [urllib.parse.urlencode(form).encode() for form in forms]
+    results = []
+    for microbatch in (False, True):
+        os.environ.update(MICROBATCH='1' if microbatch else '0', GUNICORN_THREADS=str(max(args.concurrency)),
+                          MICROBATCH_WINDOW_MS=str(args.window_ms), MICROBATCH_MAX_ROWS=str(args.max_rows))
+        with gunicorn_server(workdir, model_path, 1, args) as base:
+            for concurrency in args.concurrency:
+                def send(body):
+                    return http_post(f'{base}/predict', body, 'application/x-www-form-urlencoded')
+
+                before = microbatch_stats(base)
+                row = drive(send, bodies, concurrency, args.warmup)
+                after = microbatch_stats(base)
+                row.update(target='gunicorn', microbatch=microbatch)
+                if microbatch:
+                    # Includes the warm-up requests of this row
+                    row['mean_batch'] = (after['rows'] - before['rows']) / max(1, after['batches'] - before['batches'])
+                results.append(row)
+                report(row)
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--targets', nargs='+', choices=['inprocess', 'gunicorn'], default=['inprocess', 'gunicorn'])
+    parser.add_argument('--concurrency', type=int, nargs='+', default=[1, 4, 16, 32], help='client threads')
+    parser.add_argument('--window-ms', type=float, default=2.0)
+    parser.add_argument('--max-rows', type=int, default=64)
+    parser.add_argument('--requests', type=int, default=400, help='measured requests per row')
+    parser.add_argument('--warmup', type=int, default=20)
+    parser.add_argument('--model', help='pipeline artifact to serve (default: train one)')
+    parser.add_argument('--trees', type=int, default=200, help='trees of the trained default model')
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--json', help='write results to this JSON file')
+    args = parser.parse_args()
+    # gunicorn_server settings: plain pipeline scoring, prediction cache off
+    args.scorer_mode, args.cache = 'pipeline', False
+
+    workdir = tempfile.mkdtemp(prefix='heart-microbatch-')
+    try:
+        model_path = os.path.abspath(args.model) if args.model else None
+        if model_path is None:
+            print(f"🔧 Training {args.trees}-tree pipeline into {workdir}...")
+            build_artifacts(workdir, args.trees)
+            model_path = os.path.join(workdir, 'heart_disease_pipeline.pkl')
+        forms, _ = build_requests(args.requests + args.warmup, 1, args.seed)
+
+        print(f"\n{'target':<10} {'conc.':>5} {'microbatch':>10} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8} "
+              f"{'req/s':>9} {'mean batch':>10} {'errors':>6}")
+        results = []
+        if 'inprocess' in args.targets:
+            results += run_inprocess(model_path, forms, args)
+        if 'gunicorn' in args.targets:
+            results += run_gunicorn(workdir, model_path, forms, args)
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+    if args.json:
+        meta = {'commit': git_commit(), 'timestamp': time.time(), 'cpu_count': os.cpu_count(),
+                'window_ms': args.window_ms, 'max_rows': args.max_rows, 'requests': args.requests,
+                'model': args.model or f'trained {args.trees}-tree pipeline'}
+        with open(args.json, 'w') as f:
+            json.dump({'meta': meta, 'results': results}, f, indent=2)
+        print(f"\n💾 Results written to {args.json}")
+
+
+if __name__ == '__main__':
+    main()
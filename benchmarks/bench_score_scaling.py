@@ -0,0 +1,96 @@
+#!/usr/bin/env python3
+"""
+Benchmark score.py throughput from 1 to N worker processes
+
+Writes an extract of --rows rows (heart.csv repeated), trains the
+retrain_model.py pipeline (200 trees) into a temp dir unless --model is
+given, then runs `score.py --workers W` for each worker count and reports
+rows/s, speedup and parallel efficiency against one worker.
+
+Usage: python benchmarks/bench_score_scaling.py [--rows 1000000] [--workers 1 2 4 8]
+       [--artifact pipeline|compiled] [--json out.json]
+"""
+import argparse
+import json
+import os
+import shutil
+import sys
+import tempfile
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+import pandas as pd
+
+import score
+from bench_worker_memory import build_artifacts
+
+
+def default_worker_counts():
+    cores = os.cpu_count() or 1
+    counts = [1]
+    while counts[-1] * 2 <= cores:
+        counts.append(counts[-1] * 2)
+    if counts[-1] != cores:
+        counts.append(cores)
+    return counts
+
+
+def write_extract(path, n_rows):
+    df = pd.read_csv(os.path.join(ROOT, 'heart.csv'))
+    written = 0
+    with open(path, 'w', newline='') as f:
+        while written < n_rows:
+            part = df.head(n_rows - written)
+            part.to_csv(f, header=written == 0, index=False)
+            written += len(part)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--rows', type=int, default=1_000_000)
+    parser.add_argument('--workers', type=int, nargs='+', default=default_worker_counts())
+    parser.add_argument('--chunk-size', type=int, default=20000)
+    parser.add_argument('--model', help='existing model artifact (default: train one)')
+    parser.add_argument('--artifact', choices=['pipeline', 'compiled'], default='pipeline',
+                        help='trained artifact to score with: sklearn pipeline .pkl or compiled scorer (mmap)')
+    parser.add_argument('--trees', type=int, default=200)
+    parser.add_argument('--json', help='write results to this JSON file')
+    args = parser.parse_args()
+
+    workdir = tempfile.mkdtemp(prefix='heart-scale-')
+    results = []
+    try:
+        model_path = args.model
+        if model_path is None:
+            print(f"🔧 Training {args.trees}-tree pipeline into {workdir}...")
+            build_artifacts(workdir, args.trees)
+            name = 'heart_disease_pipeline.pkl' if args.artifact == 'pipeline' else 'heart_disease_compiled.joblib'
+            model_path = os.path.join(workdir, name)
+        input_path = os.path.join(workdir, 'extract.csv')
+        print(f"📝 Writing {args.rows:,}-row extract...")
+        write_extract(input_path, args.rows)
+
+        print(f"\n{'workers':>7} {'rows/s':>12} {'speedup':>8} {'efficiency':>10}")
+        baseline = None
+        for workers in args.workers:
+            report = score.run(score.build_parser().parse_args([
+                input_path, '-o', os.path.join(workdir, 'scored.csv'), '--model', model_path,
+                '--chunk-size', str(args.chunk_size), '--workers', str(workers)]
+                + (['--mmap'] if args.artifact == 'compiled' else [])))
+            baseline = baseline or report['rows_per_second']
+            speedup = report['rows_per_second'] / baseline
+            results.append({'workers': workers, 'rows_per_second': report['rows_per_second'],
+                            'speedup': speedup, 'efficiency': speedup / workers})
+            print(f"{workers:>7} {report['rows_per_second']:>12,.0f} {speedup:>7.2f}x {speedup / workers:>9.0%}")
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump({'cpu_count': os.cpu_count(), 'rows': args.rows, 'results': results}, f, indent=2)
+        print(f"\n💾 Results written to {args.json}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,382 @@
+#!/usr/bin/env python3
+"""
+Latency and throughput benchmark of the serving path
+
+Drives app.py with a patient mix sampled from heart.csv, either in-process
+through the Flask test client or over HTTP against `gunicorn app:app`
+(the repo's gunicorn.conf.py) at each --workers count, and reports p50,
+p95 and p99 latency and requests per second per scenario:
+
+  predict-form  POST /predict form with the loaded model
+  batch         POST /api/v1/predict/batch JSON array of --batch-size patients
+  rules-form    POST /predict with no model (rule-based fallback)
+  rules-batch   POST /api/v1/predict/batch with no model
+
+In-process runs also break each request down into stages (model or rules,
+template render, body parsing, validation, JSON serialization; the rest is
+Flask/Werkzeug overhead) by timing the helpers app.py calls. The prediction
+cache is off unless --cache is given, so every request reaches the model.
+
+Results go to --json; --compare BASELINE.json prints the change per row
+against an earlier run, e.g. one taken on the previous commit.
+
+Usage: python benchmarks/bench_serving.py [--targets inprocess gunicorn] [--workers 1 4]
+       [--requests 500] [--model heart_disease_pipeline.pkl] [--json out.json] [--compare base.json]
+"""
+import argparse
+import contextlib
+import itertools
+import json
+import os
+import platform
+import shutil
+import signal
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import urllib.error
+import urllib.parse
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+import numpy as np
+import pandas as pd
+
+from bench_worker_memory import build_artifacts, free_port
+from inference import FEATURE_COLUMNS
+
+SCENARIOS = ['predict-form', 'batch', 'rules-form', 'rules-batch']
+
+# app.py helpers timed as stages for in-process runs
+STAGES = {
+    'predict_patient': 'model',
+    'predict_proba_batch': 'model',
+    'calculate_rule_based_risk': 'rules',
+    'calculate_rule_based_risk_batch': 'rules',
+    'render_template': 'render',
+    'parse_batch_body': 'parse',
+    'validate_patient_batch': 'validate',
+    'jsonify': 'serialize',
+}
+
+CHECKBOXES = {
+    'diabetes': 'Diabetes', 'hypertension': 'Hypertension', 'obesity': 'Obesity',
+    'smoking': 'Smoking', 'alcohol': 'Alcohol_Consumption', 'family_history': 'Family_History',
+    'heart_attack_history': 'Heart_Attack_History', 'health_insurance': 'Health_Insurance',
+}
+NUMBER_FIELDS = {
+    'age': 'Age', 'physical_activity': 'Physical_Activity', 'diet_score': 'Diet_Score',
+    'cholesterol': 'Cholesterol_Level', 'triglyceride': 'Triglyceride_Level', 'ldl': 'LDL_Level',
+    'hdl': 'HDL_Level', 'systolic_bp': 'Systolic_BP', 'diastolic_bp': 'Diastolic_BP',
+    'air_pollution': 'Air_Pollution_Exposure', 'stress_level': 'Stress_Level',
+    'emergency_time': 'Emergency_Response_Time', 'annual_income': 'Annual_Income',
+}
+
+
+def patient_form(row):
+    """The /predict form a browser would post for one heart.csv row (unchecked boxes are omitted)"""
+    form = {'state': row['State_Name'], 'gender': row['Gender'],
+            'healthcare': 'Urban' if row['Healthcare_Access'] else 'Rural'}
+    form.update({field: str(int(row[col])) for field, col in NUMBER_FIELDS.items()})
+    form.update({field: 'on' for field, col in CHECKBOXES.items() if row[col]})
+    return form
+
+
+def build_requests(n_requests, batch_size, seed):
+    """One request body per scenario request: (form dicts, JSON batch bodies)"""
+    df = pd.read_csv(os.path.join(ROOT, 'heart.csv'))
+    rng = np.random.default_rng(seed)
+    forms = [patient_form(row) for _, row in df.iloc[rng.integers(0, len(df), n_requests)].iterrows()]
+    records = df[FEATURE_COLUMNS].to_dict(orient='records')
+    batches = [json.dumps([records[i] for i in rng.integers(0, len(records), batch_size)]).encode()
+               for _ in range(n_requests)]
+    return forms, batches
+
+
+def percentiles(values):
+    values = np.asarray(values) * 1000
+    return {'p50': float(np.percentile(values, 50)), 'p95': float(np.percentile(values, 95)),
+            'p99': float(np.percentile(values, 99)), 'mean': float(values.mean()), 'max': float(values.max())}
+
+
+class StageRecorder:
+    """Times the STAGES helpers of app.py per request (per thread)"""
+
+    def __init__(self, app_module):
+        self._local = threading.local()
+        self._app = app_module
+        self._originals = {}
+
+    def install(self):
+        for name, stage in STAGES.items():
+            original = getattr(self._app, name)
+            self._originals[name] = original
+            setattr(self._app, name, self._wrap(original, stage))
+
+    def uninstall(self):
+        for name, original in self._originals.items():
+            setattr(self._app, name, original)
+
+    def _wrap(self, func, stage):
+        def timed(*args, **kwargs):
+            started = time.perf_counter()
+            try:
+                return func(*args, **kwargs)
+            finally:
+                stages = getattr(self._local, 'stages', None)
+                if stages is not None:
+                    stages[stage] = stages.get(stage, 0.0) + time.perf_counter() - started
+        return timed
+
+    def start(self):
+        self._local.stages = {}
+
+    def finish(self):
+        stages, self._local.stages = self._local.stages, None
+        return stages
+
+
+def drive(send, bodies, concurrency, warmup, recorder=None):
+    """Send every body with `concurrency` client threads; returns the result row"""
+    for body in bodies[:warmup]:
+        send(body)
+    bodies = bodies[warmup:]
+    latencies = [None] * len(bodies)
+    stage_samples = [None] * len(bodies)
+    errors = []
+    counter = itertools.count()
+
+    def client():
+        while True:
+            i = next(counter)
+            if i >= len(bodies):
+                return
+            if recorder:
+                recorder.start()
+            started = time.perf_counter()
+            ok = send(bodies[i])
+            latencies[i] = time.perf_counter() - started
+            if recorder:
+                stage_samples[i] = recorder.finish()
+            if not ok:
+                errors.append(i)
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        for future in [pool.submit(client) for _ in range(concurrency)]:
+            future.result()
+    wall = time.perf_counter() - started
+
+    row = {'requests': len(bodies), 'errors': len(errors), 'concurrency': concurrency,
+           'rps': len(bodies) / wall, 'latency_ms': percentiles(latencies), 'stages_ms': None}
+    if recorder:
+        names = sorted({stage for sample in stage_samples for stage in sample})
+        stages = {name: percentiles([sample.get(name, 0.0) for sample in stage_samples]) for name in names}
+        stages['framework'] = percentiles([total - sum(sample.values())
+                                           for total, sample in zip(latencies, stage_samples)])
+        row['stages_ms'] = {name: {'p50': s['p50'], 'mean': s['mean']} for name, s in stages.items()}
+    return row
+
+
+def run_inprocess(model_path, scenarios, forms, batches, args):
+    # AUDIT_LOG_PATH='': no patient records written to the working directory
+    os.environ.update(MODEL_PATH=model_path, MODEL_WATCH_INTERVAL='0', SCORER_MODE=args.scorer_mode,
+                      AUDIT_LOG_PATH='')
+    if not args.cache:
+        os.environ['PREDICTION_CACHE_SIZE'] = '0'
+    with open(os.devnull, 'w') as devnull, contextlib.redirect_stdout(devnull):
+        import app as app_module
+    served = app_module.model_registry.current
+    if served is None:
+        raise SystemExit(f"❌ app.py could not load {model_path}")
+    recorder = StageRecorder(app_module)
+    clients = threading.local()
+
+    def client():
+        if not hasattr(clients, 'client'):
+            clients.client = app_module.app.test_client()
+        return clients.client
+
+    def send_form(form):
+        return client().post('/predict', data=form).status_code == 200
+
+    def send_batch(body):
+        return client().post('/api/v1/predict/batch', data=body, content_type='application/json').status_code == 200
+
+    results = []
+    recorder.install()
+    try:
+        for scenario in scenarios:
+            app_module.model_registry.swap(None if scenario.startswith('rules') else served)
+            send, bodies = (send_form, forms) if scenario.endswith('form') else (send_batch, batches)
+            with open(os.devnull, 'w') as devnull, contextlib.redirect_stdout(devnull):
+                row = drive(send, bodies, args.inprocess_concurrency, args.warmup, recorder)
+            results.append(dict(target='inprocess', workers=1, scenario=scenario, **row))
+            report(results[-1])
+    finally:
+        recorder.uninstall()
+        app_module.model_registry.swap(served)
+    return results
+
+
+@contextlib.contextmanager
+def gunicorn_server(workdir, model_path, n_workers, args, app_spec='app:app', extra_args=()):
+    port = free_port()
+    env = dict(os.environ, WEB_CONCURRENCY=str(n_workers), MODEL_PATH=model_path, MODEL_WATCH_INTERVAL='0',
+               SCORER_MODE=args.scorer_mode, AUDIT_LOG_PATH='')
+    if not args.cache:
+        env['PREDICTION_CACHE_SIZE'] = '0'
+    cmd = [sys.executable, '-m', 'gunicorn', '-c', os.path.join(ROOT, 'gunicorn.conf.py'),
+           '--chdir', workdir, '--pythonpath', ROOT, '-b', f'127.0.0.1:{port}']
+    cmd += list(extra_args) + [app_spec]
+    proc = subprocess.Popen(cmd, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    base = f'http://127.0.0.1:{port}'
+    try:
+        deadline = time.time() + 300
+        while True:
+            if proc.poll() is not None:
+                raise RuntimeError(f"gunicorn exited with status {proc.returncode}")
+            try:
+                with urllib.request.urlopen(f'{base}/health', timeout=5) as response:
+                    if json.load(response)['model_loaded'] == (model_path != 'none'):
+                        break
+            except OSError:
+                pass
+            if time.time() > deadline:
+                raise RuntimeError("gunicorn did not become ready in time")
+            time.sleep(0.2)
+        yield base
+    finally:
+        proc.send_signal(signal.SIGTERM)
+        try:
+            proc.wait(timeout=30)
+        except subprocess.TimeoutExpired:
+            proc.kill()
+
+
+def http_post(url, body, content_type):
+    request = urllib.request.Request(url, data=body, headers={'Content-Type': content_type})
+    try:
+        with urllib.request.urlopen(request, timeout=60) as response:
+            response.read()
+            return response.status == 200
+    except (urllib.error.URLError, OSError):
+        return False
+
+
+def run_gunicorn(workdir, model_path, scenarios, forms, batches, args):
+    encoded_forms = [urllib.parse.urlencode(form).encode() for form in forms]
+    results = []
+    for n_workers in args.workers:
+        concurrency = args.concurrency or 2 * n_workers
+        for rules in (False, True):
+            wanted = [s for s in scenarios if s.startswith('rules') == rules]
+            if not wanted:
+                continue
+            with gunicorn_server(workdir, 'none' if rules else model_path, n_workers, args) as base:
+                for scenario in wanted:
+                    if scenario.endswith('form'):
+                        def send(body):
+                            return http_post(f'{base}/predict', body, 'application/x-www-form-urlencoded')
+                        bodies = encoded_forms
+                    else:
+                        def send(body):
+                            return http_post(f'{base}/api/v1/predict/batch', body, 'application/json')
+                        bodies = batches
+                    row = drive(send, bodies, concurrency, args.warmup)
+                    results.append(dict(target='gunicorn', workers=n_workers, scenario=scenario, **row))
+                    report(results[-1])
+    return results
+
+
+def report(row):
+    latency = row['latency_ms']
+    print(f"{row['target']:<10} {row['workers']:>7} {row['concurrency']:>5} {row['scenario']:<13} "
+          f"{latency['p50']:>8.2f} {latency['p95']:>8.2f} {latency['p99']:>8.2f} {row['rps']:>9.1f} {row['errors']:>6}")
+    if row['stages_ms']:
+        print('    stages p50 ms: ' + ', '.join(f"{name} {s['p50']:.2f}" for name, s in row['stages_ms'].items()))
+
+
+def compare(results, baseline_path):
+    with open(baseline_path) as f:
+        baseline = {(r['target'], r['workers'], r['concurrency'], r['scenario']): r for r in json.load(f)['results']}
+    print(f"\n📈 Change vs {baseline_path} (negative latency / positive rps is better)")
+    print(f"{'target':<10} {'workers':>7} {'scenario':<13} {'p50':>8} {'p99':>8} {'rps':>8}")
+    for row in results:
+        old = baseline.get((row['target'], row['workers'], row['concurrency'], row['scenario']))
+        if old is None:
+            continue
+
+        def change(new, before):
+            return f"{(new / before - 1) * 100:+7.1f}%" if before else '     n/a'
+        print(f"{row['target']:<10} {row['workers']:>7} {row['scenario']:<13} "
+              f"{change(row['latency_ms']['p50'], old['latency_ms']['p50'])} "
+              f"{change(row['latency_ms']['p99'], old['latency_ms']['p99'])} {change(row['rps'], old['rps'])}")
+
+
+def git_commit():
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], cwd=ROOT, capture_output=True,
+                              text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--targets', nargs='+', choices=['inprocess', 'gunicorn'], default=['inprocess', 'gunicorn'])
+    parser.add_argument('--scenarios', nargs='+', choices=SCENARIOS, default=SCENARIOS)
+    parser.add_argument('--workers', type=int, nargs='+', default=sorted({1, os.cpu_count() or 1}),
+                        help='gunicorn worker counts')
+    parser.add_argument('--concurrency', type=int, help='gunicorn client threads (default: 2 per worker)')
+    parser.add_argument('--inprocess-concurrency', type=int, default=1, help='test-client threads')
+    parser.add_argument('--requests', type=int, default=500, help='measured requests per scenario')
+    parser.add_argument('--warmup', type=int, default=20)
+    parser.add_argument('--batch-size', type=int, default=100, help='patients per batch request')
+    parser.add_argument('--model', help='model artifact to serve (default: train a pipeline)')
+    parser.add_argument('--trees', type=int, default=200, help='trees of the trained default model')
+    parser.add_argument('--scorer-mode', choices=['pipeline', 'compiled'], default='pipeline')
+    parser.add_argument('--cache', action='store_true', help='leave the prediction cache on')
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--json', help='write results to this JSON file')
+    parser.add_argument('--compare', help='earlier --json output to compare against')
+    args = parser.parse_args()
+
+    workdir = tempfile.mkdtemp(prefix='heart-serving-')
+    try:
+        model_path = os.path.abspath(args.model) if args.model else None
+        if model_path is None:
+            print(f"🔧 Training {args.trees}-tree pipeline into {workdir}...")
+            build_artifacts(workdir, args.trees)
+            model_path = os.path.join(workdir, 'heart_disease_pipeline.pkl')
+        forms, batches = build_requests(args.requests + args.warmup, args.batch_size, args.seed)
+
+        print(f"\n{'target':<10} {'workers':>7} {'conc.':>5} {'scenario':<13} {'p50 ms':>8} {'p95 ms':>8} "
+              f"{'p99 ms':>8} {'req/s':>9} {'errors':>6}")
+        results = []
+        if 'inprocess' in args.targets:
+            results += run_inprocess(model_path, args.scenarios, forms, batches, args)
+        if 'gunicorn' in args.targets:
+            results += run_gunicorn(workdir, model_path, args.scenarios, forms, batches, args)
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+    if args.json:
+        meta = {'commit': git_commit(), 'timestamp': time.time(), 'python': platform.python_version(),
+                'cpu_count': os.cpu_count(), 'model': args.model or f'trained {args.trees}-tree pipeline',
+                'scorer_mode': args.scorer_mode, 'cache': args.cache, 'batch_size': args.batch_size,
+                'requests': args.requests}
+        with open(args.json, 'w') as f:
+            json.dump({'meta': meta, 'results': results}, f, indent=2)
+        print(f"\n💾 Results written to {args.json}")
+    if args.compare:
+        compare(results, args.compare)
+
+
+if __name__ == '__main__':
+    main()
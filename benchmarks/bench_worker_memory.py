@@ -0,0 +1,191 @@
+#!/usr/bin/env python3
+"""
+Measure per-worker memory of the gunicorn deployment
+
+Starts `gunicorn app:app` (with the repo's gunicorn.conf.py) at 1, 4 and 16
+workers in each loading mode, warms every worker with /predict requests,
+then reads RSS, PSS and USS for each worker from /proc/<pid>/smaps_rollup.
+RSS counts shared pages in full, so PSS (shared pages split between the
+processes using them) is the number that shows copy-on-write sharing.
+
+Modes:
+  per-worker    GUNICORN_PRELOAD=0, each worker joblib.loads the pickle
+  preload       GUNICORN_PRELOAD=1, model loaded once in the master
+  mmap          GUNICORN_PRELOAD=0, MODEL_MMAP=1 + SCORER_MODE=compiled
+  preload+mmap  both
+
+Linux only. Usage: python benchmarks/bench_worker_memory.py [--workers 1 4 16] [--json out.json]
+"""
+import argparse
+import json
+import os
+import shutil
+import signal
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+import urllib.request
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+MODES = {
+    'per-worker': {'GUNICORN_PRELOAD': '0'},
+    'preload': {'GUNICORN_PRELOAD': '1'},
+    'mmap': {'GUNICORN_PRELOAD': '0', 'MODEL_MMAP': '1', 'SCORER_MODE': 'compiled'},
+    'preload+mmap': {'GUNICORN_PRELOAD': '1', 'MODEL_MMAP': '1', 'SCORER_MODE': 'compiled'},
+}
+
+
+def build_artifacts(workdir, n_estimators):
+    """Train the retrain_model.py pipeline and export the compiled scorer into workdir"""
+    import joblib
+    import pandas as pd
+    from sklearn.compose import ColumnTransformer
+    from sklearn.ensemble import RandomForestClassifier
+    from sklearn.impute import SimpleImputer
+    from sklearn.pipeline import Pipeline
+    from sklearn.preprocessing import OneHotEncoder, StandardScaler
+
+    from compiled_scorer import CompiledScorer
+    from inference import CATEGORICAL_COLUMNS, FEATURE_COLUMNS, NUMERIC_COLUMNS
+    from model_registry import record_source
+
+    df = pd.read_csv(os.path.join(ROOT, 'heart.csv'))
+    preprocessor = ColumnTransformer(transformers=[
+        ('num', Pipeline([('imputer', SimpleImputer(strategy='median')),
+                          ('scaler', StandardScaler())]), NUMERIC_COLUMNS),
+        ('cat', Pipeline([('imputer', SimpleImputer(strategy='most_frequent')),
+                          ('onehot', OneHotEncoder(handle_unknown='ignore'))]), CATEGORICAL_COLUMNS)
+    ])
+    pipeline = Pipeline([('preprocessor', preprocessor),
+                         ('clf', RandomForestClassifier(n_estimators=n_estimators, class_weight='balanced',
+                                                        random_state=42))])
+    pipeline.fit(df[FEATURE_COLUMNS], df['Heart_Attack_Risk'])
+    pipeline_path = os.path.join(workdir, 'heart_disease_pipeline.pkl')
+    compiled_path = os.path.join(workdir, 'heart_disease_compiled.joblib')
+    joblib.dump(pipeline, pipeline_path)
+    CompiledScorer.from_pipeline(pipeline, flatten_forest=True).save(compiled_path)
+    record_source(compiled_path, pipeline_path)  # Otherwise app.py compiles in every worker
+
+
+def free_port():
+    with socket.socket() as s:
+        s.bind(('127.0.0.1', 0))
+        return s.getsockname()[1]
+
+
+def child_pids(pid):
+    children = []
+    for entry in os.listdir('/proc'):
+        if not entry.isdigit():
+            continue
+        try:
+            with open(f'/proc/{entry}/stat') as f:
+                fields = f.read().rsplit(')', 1)[1].split()
+            if int(fields[1]) == pid:
+                children.append(int(entry))
+        except (FileNotFoundError, ProcessLookupError, IndexError):
+            continue
+    return children
+
+
+def memory_kb(pid):
+    """Rss, Pss and Uss (private clean + dirty) in kB from smaps_rollup"""
+    values = {}
+    with open(f'/proc/{pid}/smaps_rollup') as f:
+        for line in f:
+            parts = line.split()
+            if len(parts) >= 2 and parts[0].endswith(':'):
+                values[parts[0][:-1]] = int(parts[1])
+    return {
+        'rss': values.get('Rss', 0),
+        'pss': values.get('Pss', 0),
+        'uss': values.get('Private_Clean', 0) + values.get('Private_Dirty', 0),
+    }
+
+
+def run_gunicorn(workdir, n_workers, mode_env, requests_per_worker):
+    port = free_port()
+    env = dict(os.environ, WEB_CONCURRENCY=str(n_workers), PREDICTION_CACHE_SIZE='0', **mode_env)
+    cmd = [sys.executable, '-m', 'gunicorn', '-c', os.path.join(ROOT, 'gunicorn.conf.py'),
+           '--chdir', workdir, '--pythonpath', ROOT, '-b', f'127.0.0.1:{port}', 'app:app']
+    proc = subprocess.Popen(cmd, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    try:
+        deadline = time.time() + 300
+        while time.time() < deadline:
+            if proc.poll() is not None:
+                raise RuntimeError(f"gunicorn exited with status {proc.returncode}")
+            if len(child_pids(proc.pid)) == n_workers:
+                try:
+                    with urllib.request.urlopen(f'http://127.0.0.1:{port}/health', timeout=5) as response:
+                        if json.load(response)['model_loaded']:
+                            break
+                except OSError:
+                    pass
+            time.sleep(0.5)
+        else:
+            raise RuntimeError("gunicorn did not become ready in time")
+
+        # Spread enough requests that every worker has scored at least once
+        form = b'age=58&smoking=on&cholesterol=260&systolic_bp=150&diastolic_bp=95'
+        for _ in range(n_workers * requests_per_worker):
+            urllib.request.urlopen(f'http://127.0.0.1:{port}/predict', data=form, timeout=30).read()
+        time.sleep(1.0)
+
+        workers = [memory_kb(pid) for pid in child_pids(proc.pid)]
+        master = memory_kb(proc.pid)
+    finally:
+        proc.send_signal(signal.SIGTERM)
+        try:
+            proc.wait(timeout=30)
+        except subprocess.TimeoutExpired:
+            proc.kill()
+
+    def mean(key):
+        return sum(w[key] for w in workers) / len(workers) / 1024
+
+    return {
+        'workers': n_workers,
+        'rss_per_worker_mb': round(mean('rss'), 1),
+        'pss_per_worker_mb': round(mean('pss'), 1),
+        'uss_per_worker_mb': round(mean('uss'), 1),
+        'total_pss_mb': round((sum(w['pss'] for w in workers) + master['pss']) / 1024, 1),
+        'master_rss_mb': round(master['rss'] / 1024, 1),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--workers', type=int, nargs='+', default=[1, 4, 16])
+    parser.add_argument('--modes', nargs='+', default=list(MODES), choices=list(MODES))
+    parser.add_argument('--trees', type=int, default=200, help='RandomForest size (retrain_model.py uses 200)')
+    parser.add_argument('--requests-per-worker', type=int, default=4)
+    parser.add_argument('--json', help='write results to this JSON file')
+    args = parser.parse_args()
+
+    workdir = tempfile.mkdtemp(prefix='heart-mem-')
+    results = []
+    try:
+        print(f"🔧 Training {args.trees}-tree pipeline into {workdir}...")
+        build_artifacts(workdir, args.trees)
+        print(f"{'mode':<14} {'workers':>7} {'RSS/worker':>11} {'PSS/worker':>11} {'USS/worker':>11} {'total PSS':>10}")
+        for mode in args.modes:
+            for n_workers in args.workers:
+                row = dict(mode=mode, **run_gunicorn(workdir, n_workers, MODES[mode], args.requests_per_worker))
+                results.append(row)
+                print(f"{mode:<14} {n_workers:>7} {row['rss_per_worker_mb']:>9.1f}MB {row['pss_per_worker_mb']:>9.1f}MB "
+                      f"{row['uss_per_worker_mb']:>9.1f}MB {row['total_pss_mb']:>8.1f}MB")
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump(results, f, indent=2)
+        print(f"\n💾 Results written to {args.json}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,289 @@
+#!/usr/bin/env python3
+"""
+Compact, pickle-free artifact for the forest models.
+
+A FlatForest (optionally inside a CompiledScorer, for the full pipeline)
+is packed into a compressed .npz holding only what prediction reads:
+
+  - split feature (uint8), threshold (float32) and right child (uint16
+    tree-local index) for internal nodes only; the left child is always
+    the next node in sklearn's depth-first layout, so it is not stored
+  - the positive-class probability of each leaf (float32, binary forests)
+  - a bit-packed leaf mask and the node count of every tree
+
+Thresholds are rounded down to the nearest float32, which keeps every
+split decision identical: sklearn compares float32 features, and a
+float32 x satisfies x <= t exactly when x <= round_down_f32(t). Only the
+float32 leaf probabilities change results, by less than 1e-7.
+
+The arrays are rebuilt into FlatForest layout on load, so the artifact is
+not memory-mapped (MODEL_MMAP has no effect); preload it in the gunicorn
+master instead. Files must be named *.compact.npz for load_artifact().
+
+Export from a pickled pipeline or forest and compare with the pickle:
+    python compact_model.py heart_disease_pipeline.pkl -o heart_disease_model.compact.npz
+    python compact_model.py heart_disease_pipeline.pkl -o heart_disease_model.compact.npz --auc-budget 0.005
+"""
+import argparse
+import os
+import sys
+
+import numpy as np
+
+from compiled_scorer import CompiledScorer
+from flat_forest import FlatForest
+
+COMPACT_SUFFIX = '.compact.npz'
+COMPACT_FORMAT = 1
+
+
+def _round_down_float32(values):
+    rounded = values.astype(np.float32)
+    above = rounded.astype(np.float64) > values
+    rounded[above] = np.nextafter(rounded[above], np.float32(-np.inf))
+    return rounded
+
+
+def _index_dtype(max_value):
+    for dtype in (np.uint8, np.uint16, np.uint32):
+        if max_value <= np.iinfo(dtype).max:
+            return dtype
+    return np.uint64
+
+
+def pack_forest(forest, n_trees=None, value_dtype=np.float32):
+    """Pack the first n_trees trees (default: all) of a FlatForest into compact arrays"""
+    n_trees = forest.n_estimators if n_trees is None else int(n_trees)
+    if not 1 <= n_trees <= forest.n_estimators:
+        raise ValueError(f"n_trees must be between 1 and {forest.n_estimators}")
+    bounds = np.append(forest.roots, len(forest.left)).astype(np.int64)
+    n_nodes = int(bounds[n_trees])
+    sizes = np.diff(bounds[:n_trees + 1])
+
+    is_leaf = np.asarray(forest.is_leaf[:n_nodes])
+    internal = ~is_leaf
+    node_ids = np.arange(n_nodes)
+    tree_root = np.repeat(bounds[:n_trees], sizes)
+
+    arrays = {
+        'tree_sizes': sizes.astype(_index_dtype(sizes.max())),
+        'leaf_mask': np.packbits(is_leaf),
+        'feature': forest.feature[:n_nodes][internal].astype(_index_dtype(forest.n_features_in_ - 1)),
+        'threshold': _round_down_float32(forest.threshold[:n_nodes][internal]),
+        'right': (forest.right[:n_nodes][internal] - tree_root[internal]).astype(_index_dtype(sizes.max())),
+        'max_depth': np.array(forest.max_depth),
+        'classes': forest.classes_,
+        'n_features_in': np.array(forest.n_features_in_),
+    }
+    # Trees not built depth-first (e.g. max_leaf_nodes) need their left children stored
+    if not np.array_equal(forest.left[:n_nodes][internal], node_ids[internal] + 1):
+        arrays['left'] = (forest.left[:n_nodes][internal] - tree_root[internal]).astype(arrays['right'].dtype)
+    leaf_values = forest.value[:n_nodes][is_leaf]
+    # Binary forests store P(positive class) only; the other column is 1 - p
+    arrays['leaf_value'] = (leaf_values[:, 1] if leaf_values.shape[1] == 2 else leaf_values).astype(value_dtype)
+    return arrays
+
+
+def unpack_forest(data):
+    """Rebuild a FlatForest from pack_forest() arrays"""
+    sizes = data['tree_sizes'].astype(np.int64)
+    roots = np.concatenate([[0], np.cumsum(sizes)[:-1]])
+    n_nodes = int(sizes.sum())
+    is_leaf = np.unpackbits(data['leaf_mask'], count=n_nodes).view(bool)
+    # Integer scatter indices are several times faster than boolean masks here
+    internal = np.flatnonzero(~is_leaf)
+    leaves = np.flatnonzero(is_leaf)
+    tree_root = np.repeat(roots, sizes)[internal]
+
+    feature = np.zeros(n_nodes, dtype=np.int32)
+    feature[internal] = data['feature']
+    # float32 thresholds and leaf values stay float32 in the FlatForest (exact splits, see above)
+    threshold = np.zeros(n_nodes, dtype=np.float32)
+    threshold[internal] = data['threshold']
+    left = np.arange(n_nodes, dtype=np.int32)
+    right = left.copy()
+    left[internal] = data['left'] + tree_root if 'left' in data else internal + 1
+    right[internal] = data['right'] + tree_root
+
+    leaf_value = data['leaf_value'].astype(np.float32)
+    value = np.zeros((n_nodes, len(data['classes'])), dtype=np.float32)
+    if leaf_value.ndim == 1:
+        value[leaves, 1] = leaf_value
+        value[leaves, 0] = 1.0 - leaf_value
+    else:
+        value[leaves] = leaf_value
+    return FlatForest(feature, threshold, left, right, value, roots, data['max_depth'],
+                      data['classes'], data['n_features_in'])
+
+
+def _forest_of(model):
+    forest = model.classifier if isinstance(model, CompiledScorer) else model
+    if not isinstance(forest, FlatForest):
+        raise ValueError(f"Compact export needs a forest model, got {type(forest).__name__}")
+    return forest
+
+
+def save_compact(model, path, n_trees=None, value_dtype=np.float32, compress=True):
+    """
+    Write a CompiledScorer holding a FlatForest, or a bare FlatForest, to a
+    compact artifact. compress=False skips zlib: about 2.5x larger, faster to load.
+    """
+    arrays = {'format': np.array(COMPACT_FORMAT)}
+    arrays.update(pack_forest(_forest_of(model), n_trees=n_trees, value_dtype=value_dtype))
+    if isinstance(model, CompiledScorer):
+        arrays.update({
+            'numeric_columns': np.array(model.numeric_columns, dtype=str),
+            'medians': model.medians,
+            'means': model.means,
+            'scales': model.scales,
+            'categorical_columns': np.array(model.categorical_columns, dtype=str),
+            'category_fill': np.array(['' if fill is None else fill for fill in model.category_fill], dtype=str),
+            'category_fill_missing': np.array([fill is None for fill in model.category_fill]),
+            'category_counts': np.array([len(lookup) for lookup in model.category_index]),
+            'categories': np.array([cat for lookup in model.category_index for cat in lookup], dtype=str),
+            'category_columns': np.array([idx for lookup in model.category_index for idx in lookup.values()]),
+        })
+    # A file object keeps np.savez from appending a second .npz to the name
+    with open(path, 'wb') as f:
+        (np.savez_compressed if compress else np.savez)(f, **arrays)
+
+
+def load_compact(path):
+    """Load a compact artifact as a CompiledScorer (pipeline) or FlatForest (bare forest)"""
+    with np.load(path, allow_pickle=False) as npz:
+        data = {name: npz[name] for name in npz.files}
+    if int(data['format']) != COMPACT_FORMAT:
+        raise ValueError(f"{path} has unsupported compact format {int(data['format'])}")
+    forest = unpack_forest(data)
+    if 'numeric_columns' not in data:
+        return forest
+
+    category_index = []
+    categories = data['categories'].tolist()
+    columns = data['category_columns'].tolist()
+    start = 0
+    for count in data['category_counts'].tolist():
+        category_index.append(dict(zip(categories[start:start + count], columns[start:start + count])))
+        start += count
+    category_fill = [None if missing else fill for fill, missing in
+                     zip(data['category_fill'].tolist(), data['category_fill_missing'].tolist())]
+    return CompiledScorer(data['numeric_columns'].tolist(), data['medians'], data['means'], data['scales'],
+                          data['categorical_columns'].tolist(), category_fill, category_index, forest)
+
+
+def select_tree_count(model, X_val, y_val, auc_budget, min_trees=10):
+    """
+    Smallest number of leading trees (at least min_trees, whose averaged
+    probabilities are not dominated by single-tree noise) whose validation
+    ROC AUC is within auc_budget of the full forest's. model is a FlatForest
+    (X_val is its feature matrix) or a CompiledScorer (X_val is a patient
+    DataFrame). Returns (n_trees, AUC with n_trees, AUC with all trees).
+    """
+    from sklearn.metrics import roc_auc_score
+
+    forest = _forest_of(model)
+    Xt = model.transform(X_val) if isinstance(model, CompiledScorer) else X_val
+    per_tree = forest.value[forest.apply(Xt), 1]
+    running = np.cumsum(per_tree, axis=1)
+    full_auc = roc_auc_score(y_val, running[:, -1])
+    for k in range(min(min_trees, forest.n_estimators), forest.n_estimators + 1):
+        auc = roc_auc_score(y_val, running[:, k - 1])
+        if auc >= full_auc - auc_budget:
+            return k, auc, full_auc
+    return forest.n_estimators, full_auc, full_auc
+
+
+# Run in a fresh interpreter per artifact: sklearn allocates tree arrays outside
+# tracemalloc's view, so memory is measured as RSS growth (Linux /proc)
+_LOAD_PROBE = """
+import os, sys, time
+sys.path.insert(0, {root!r})
+import joblib, sklearn.ensemble, sklearn.pipeline
+import compact_model
+load = (lambda: joblib.load({path!r})) if {kind!r} == 'pickle' else (lambda: compact_model.load_compact({path!r}))
+def rss_mb():
+    with open('/proc/self/statm') as f:
+        return int(f.read().split()[1]) * os.sysconf('SC_PAGE_SIZE') / 1e6
+before = rss_mb()
+model = load()
+grown = rss_mb() - before
+timings = []
+for _ in range({runs}):
+    started = time.perf_counter()
+    load()
+    timings.append(time.perf_counter() - started)
+print(sorted(timings)[len(timings) // 2] * 1000, grown)
+"""
+
+
+def measure_load(kind, path, runs=5):
+    """Median load time (ms) and RSS growth (MB) of loading a 'pickle' or 'compact' artifact"""
+    import subprocess
+    code = _LOAD_PROBE.format(root=os.path.dirname(os.path.abspath(__file__)), path=os.path.abspath(path),
+                              kind=kind, runs=runs)
+    result = subprocess.run([sys.executable, '-c', code], capture_output=True, text=True, check=True)
+    load_ms, rss_mb = map(float, result.stdout.split())
+    return load_ms, rss_mb
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Export a compact forest artifact and compare it with the pickle")
+    parser.add_argument('model', help='pickled pipeline (heart_disease_pipeline.pkl) or RandomForest')
+    parser.add_argument('-o', '--output', required=True, help=f'output path ending in {COMPACT_SUFFIX}')
+    parser.add_argument('--data', default='heart.csv',
+                        help='rows for the parity check and --auc-budget (use rows held out from training)')
+    parser.add_argument('--n-trees', type=int, help='keep only the first N trees')
+    parser.add_argument('--auc-budget', type=float,
+                        help='keep the fewest trees whose ROC AUC on --data is within this of the full forest')
+    parser.add_argument('--value-dtype', choices=['float32', 'float16'], default='float32')
+    parser.add_argument('--no-compress', action='store_true', help='store the arrays without zlib (faster load)')
+    parser.add_argument('--runs', type=int, default=5, help='load-time repetitions')
+    args = parser.parse_args(argv)
+    if not args.output.endswith(COMPACT_SUFFIX):
+        parser.error(f"output must end in {COMPACT_SUFFIX}")
+
+    import joblib
+    import pandas as pd
+    from inference import FEATURE_COLUMNS, SIMPLE_FEATURES
+    from sklearn.pipeline import Pipeline
+
+    source = joblib.load(args.model)
+    if isinstance(source, Pipeline):
+        model = CompiledScorer.from_pipeline(source, flatten_forest=True)
+        X = pd.read_csv(args.data)
+        y = X['Heart_Attack_Risk']
+        X = X[FEATURE_COLUMNS]
+    else:
+        model = FlatForest.from_estimator(source)
+        df = pd.read_csv(args.data)
+        X, y = df[SIMPLE_FEATURES].to_numpy(), df['Heart_Attack_Risk']
+
+    n_trees = args.n_trees
+    if args.auc_budget is not None:
+        n_trees, auc, full_auc = select_tree_count(model, X, y, args.auc_budget)
+        print(f"🌲 Keeping {n_trees}/{_forest_of(model).n_estimators} trees: "
+              f"ROC AUC {auc:.4f} vs {full_auc:.4f} with all trees (budget {args.auc_budget})")
+    save_compact(model, args.output, n_trees=n_trees, value_dtype=np.dtype(args.value_dtype),
+                 compress=not args.no_compress)
+
+    pickle_ms, pickle_mb = measure_load('pickle', args.model, args.runs)
+    compact_ms, compact_mb = measure_load('compact', args.output, args.runs)
+    expected = source.predict_proba(X)[:, 1]
+    got = load_compact(args.output).predict_proba(X)[:, 1]
+    diff = np.abs(expected - got)
+    same_class = (expected > 0.5) == (got > 0.5)
+
+    pickle_size = os.path.getsize(args.model) / 1e6
+    compact_size = os.path.getsize(args.output) / 1e6
+    print(f"\n{'artifact':<10} {'size MB':>9} {'load ms':>9} {'RSS growth MB':>14}")
+    print(f"{'pickle':<10} {pickle_size:>9.2f} {pickle_ms:>9.1f} {pickle_mb:>14.1f}")
+    print(f"{'compact':<10} {compact_size:>9.2f} {compact_ms:>9.1f} {compact_mb:>14.1f}")
+    print(f"\nSize {pickle_size / compact_size:.1f}x smaller, load {pickle_ms / compact_ms:.1f}x faster, "
+          f"RSS {pickle_mb / compact_mb:.1f}x smaller")
+    print(f"Parity on {len(y):,} rows: max |Δp| {diff.max():.2e}, mean {diff.mean():.2e}, "
+          f"same class at 0.5 for {same_class.mean():.2%}")
+    print(f"✅ Compact artifact written to {args.output}")
+
+
+if __name__ == '__main__':
+    sys.exit(main())
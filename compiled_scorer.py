@@ -0,0 +1,200 @@
+"""
+Compiled fast-path scorer for the heart disease pipeline.
+
+The fitted ColumnTransformer from retrain_model.py is flattened into plain
+NumPy arrays (imputation medians, scaler means and scales, and a one-hot
+lookup table for State_Name / Gender). A single patient is then written
+straight into a preallocated float vector and handed to the classifier,
+skipping the pandas DataFrame and sklearn's per-call column validation.
+"""
+import sys
+import threading
+
+import numpy as np
+
+from flat_forest import FlatForest
+
+
+class CompiledScorer:
+    """Array-backed replacement for the fitted preprocessing + classifier pipeline"""
+
+    def __init__(self, numeric_columns, medians, means, scales,
+                 categorical_columns, category_fill, category_index, classifier):
+        self.numeric_columns = list(numeric_columns)
+        self.medians = np.asarray(medians, dtype=np.float64)
+        self.means = np.asarray(means, dtype=np.float64)
+        self.scales = np.asarray(scales, dtype=np.float64)
+        self.categorical_columns = list(categorical_columns)
+        self.category_fill = list(category_fill)
+        # One dict per categorical column mapping category -> output column index
+        self.category_index = [dict(lookup) for lookup in category_index]
+        self.classifier = classifier
+        self.classes_ = classifier.classes_
+        self.n_numeric = len(self.numeric_columns)
+        self.n_output = self.n_numeric + sum(len(lookup) for lookup in self.category_index)
+        self._init_runtime()
+
+    def _init_runtime(self):
+        """Set up per-thread row buffers and the classifier fast path"""
+        self._local = threading.local()
+        # sklearn is only imported when a pickled sklearn classifier is loaded, so a
+        # scorer holding a FlatForest serves without importing it at all
+        linear_model = sys.modules.get('sklearn.linear_model')
+        if (linear_model is not None and isinstance(self.classifier, linear_model.LogisticRegression)
+                and self.classifier.coef_.shape[0] == 1):
+            from scipy.special import expit
+            self._expit = expit
+            self._coef = self.classifier.coef_[0].astype(np.float64)
+            self._intercept = float(self.classifier.intercept_[0])
+        else:
+            self._expit = None
+            self._coef = None
+            self._intercept = None
+
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        for key in ('_local', '_expit', '_coef', '_intercept'):
+            state.pop(key, None)
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self._init_runtime()
+
+    @classmethod
+    def from_pipeline(cls, pipeline, flatten_forest=False):
+        """
+        Compile a fitted Pipeline(preprocessor=ColumnTransformer, clf=...).
+        With flatten_forest=True a RandomForestClassifier is replaced by a FlatForest.
+        """
+        from sklearn.ensemble import RandomForestClassifier
+        from sklearn.preprocessing import OneHotEncoder, StandardScaler
+
+        preprocessor = pipeline.named_steps['preprocessor']
+        classifier = pipeline.named_steps['clf']
+        if flatten_forest and isinstance(classifier, RandomForestClassifier):
+            classifier = FlatForest.from_estimator(classifier)
+
+        numeric_columns, medians, means, scales = [], [], [], []
+        categorical_columns, category_fill, category_index = [], [], []
+        offset = 0
+        numeric_done = False
+        for name, transformer, columns in preprocessor.transformers_:
+            if transformer == 'drop' or len(columns) == 0:
+                continue
+            if transformer == 'passthrough':
+                raise ValueError(f"Unsupported passthrough transformer '{name}'")
+            steps = dict(transformer.steps)
+            imputer = steps.get('imputer')
+            scaler = next((s for s in steps.values() if isinstance(s, StandardScaler)), None)
+            encoder = next((s for s in steps.values() if isinstance(s, OneHotEncoder)), None)
+
+            if scaler is not None and encoder is None:
+                if numeric_done:
+                    raise ValueError("Only one numeric transformer block is supported")
+                if offset != 0:
+                    raise ValueError("The numeric transformer block must come first")
+                n = len(columns)
+                numeric_columns.extend(columns)
+                medians.extend(imputer.statistics_ if imputer is not None else np.full(n, np.nan))
+                means.extend(scaler.mean_ if scaler.with_mean else np.zeros(n))
+                scales.extend(scaler.scale_ if scaler.with_std else np.ones(n))
+                offset += n
+                numeric_done = True
+            elif encoder is not None and scaler is None:
+                if encoder.drop is not None:
+                    raise ValueError("OneHotEncoder with drop is not supported")
+                if encoder.handle_unknown != 'ignore':
+                    raise ValueError("OneHotEncoder must use handle_unknown='ignore'")
+                for j, col in enumerate(columns):
+                    categories = encoder.categories_[j]
+                    categorical_columns.append(col)
+                    category_fill.append(imputer.statistics_[j] if imputer is not None else None)
+                    category_index.append({cat: offset + k for k, cat in enumerate(categories)})
+                    offset += len(categories)
+            else:
+                raise ValueError(f"Unsupported transformer '{name}': {transformer}")
+
+        return cls(numeric_columns, medians, means, scales,
+                   categorical_columns, category_fill, category_index, classifier)
+
+    def save(self, path):
+        import joblib
+        joblib.dump(self, path)
+
+    @staticmethod
+    def load(path, mmap_mode=None):
+        """Load a saved scorer; mmap_mode='r' keeps FlatForest arrays memory-mapped"""
+        import joblib
+        scorer = joblib.load(path, mmap_mode=mmap_mode)
+        if not isinstance(scorer, CompiledScorer):
+            raise TypeError(f"{path} does not contain a CompiledScorer")
+        return scorer
+
+    def _row_buffer(self):
+        row = getattr(self._local, 'row', None)
+        if row is None:
+            row = np.zeros((1, self.n_output), dtype=np.float64)
+            self._local.row = row
+        return row
+
+    def transform_record(self, patient_data):
+        """Write one patient_data dict into the preallocated row buffer"""
+        row = self._row_buffer()
+        num = row[0, :self.n_numeric]
+        num[:] = [np.nan if patient_data.get(col) is None else patient_data[col]
+                  for col in self.numeric_columns]
+        missing = np.isnan(num)
+        if missing.any():
+            num[missing] = self.medians[missing]
+        num -= self.means
+        num /= self.scales
+
+        row[0, self.n_numeric:] = 0.0
+        for col, fill, lookup in zip(self.categorical_columns, self.category_fill, self.category_index):
+            value = patient_data.get(col)
+            if value is None:
+                value = fill
+            idx = lookup.get(value)
+            if idx is not None:
+                row[0, idx] = 1.0
+        return row
+
+    def transform(self, X):
+        """Transform a DataFrame into the dense model matrix"""
+        n = len(X)
+        out = np.zeros((n, self.n_output), dtype=np.float64)
+        num = X[self.numeric_columns].to_numpy(dtype=np.float64, copy=True)
+        missing = np.isnan(num)
+        if missing.any():
+            num[missing] = np.broadcast_to(self.medians, num.shape)[missing]
+        num -= self.means
+        num /= self.scales
+        out[:, :self.n_numeric] = num
+
+        rows = np.arange(n)
+        for col, fill, lookup in zip(self.categorical_columns, self.category_fill, self.category_index):
+            values = X[col]
+            if fill is not None:
+                values = values.where(values.notna(), fill)
+            idx = values.map(lookup).to_numpy(dtype=np.float64)
+            known = ~np.isnan(idx)
+            out[rows[known], idx[known].astype(np.intp)] = 1.0
+        return out
+
+    def predict_proba_matrix(self, Xt):
+        """Evaluate the classifier on an already-transformed matrix"""
+        if self._coef is not None:
+            prob = self._expit(Xt @ self._coef + self._intercept)
+            return np.vstack([1 - prob, prob]).T
+        return self.classifier.predict_proba(Xt)
+
+    def predict_proba(self, X):
+        return self.predict_proba_matrix(self.transform(X))
+
+    def predict(self, X):
+        return self.classes_[np.argmax(self.predict_proba(X), axis=1)]
+
+    def predict_proba_record(self, patient_data):
+        """Score one patient_data dict; returns the probability row for that patient"""
+        return self.predict_proba_matrix(self.transform_record(patient_data))[0]
@@ -2,7 +2,6 @@
 """
 Create a simple, Railway-compatible heart disease prediction model
 """
-import pandas as pd
 import numpy as np
 from sklearn.ensemble import RandomForestClassifier
 from sklearn.model_selection import train_test_split
@@ -10,6 +9,8 @@ from sklearn.preprocessing import LabelEncoder
 import joblib
 import sys
 
+from data_cache import load_training_data
+
 print("🔬 Creating Railway-Compatible Heart Disease Model...")
 print(f"Python version: {sys.version}")
 
@@ -21,7 +22,7 @@ except:
 
 # Load dataset
 print("\n📊 Loading dataset...")
-df = pd.read_csv('heart.csv')
+df = load_training_data('heart.csv')
 print(f"Dataset shape: {df.shape}")
 
 # Simple preprocessing - use only numeric features and basic encoding
@@ -75,6 +76,15 @@ print("\n💾 Saving simple model...")
 joblib.dump(simple_model, "simple_heart_model.pkl")
 print("✅ Simple model saved as simple_heart_model.pkl")
 
+# Export the flattened forest (loadable by app.py in place of the pickle)
+from flat_forest import FlatForest
+flat_model = FlatForest.from_estimator(simple_model)
+flat_model.save("simple_heart_model.npz")
+from model_registry import record_source
+record_source("simple_heart_model.npz", "simple_heart_model.pkl")
+max_diff = np.abs(flat_model.predict_proba(X_test)[:, 1] - y_prob).max()
+print(f"✅ Flat forest saved as simple_heart_model.npz (max probability difference: {max_diff:.2e})")
+
 # Save feature list for the web app
 feature_info = {
     'features': important_features,
@@ -0,0 +1,198 @@
+#!/usr/bin/env python3
+"""
+Typed, columnar cache of the training CSV.
+
+The first load parses the CSV, narrows every column to the dtype in SCHEMA
+(0/1 flags to int8, small integers to int16/int32, State_Name/Gender to
+categoricals) and writes one .npy file per column plus meta.json into
+<cache dir>/<csv name>-<sha256 prefix>/. Later loads memory-map those
+arrays instead of parsing text. A changed CSV has a different content
+hash, so it gets a new entry and the stale one is removed.
+
+Report load time and memory for CSV vs cache:
+    python data_cache.py heart.csv
+"""
+import hashlib
+import json
+import os
+import shutil
+import sys
+import tempfile
+import time
+
+import numpy as np
+import pandas as pd
+
+# Narrowest dtype that holds each heart.csv column; values that do not fit fall back to inference
+SCHEMA = {
+    'Patient_ID': 'int32',
+    'State_Name': 'category',
+    'Age': 'int8',
+    'Gender': 'category',
+    'Diabetes': 'int8',
+    'Hypertension': 'int8',
+    'Obesity': 'int8',
+    'Smoking': 'int8',
+    'Alcohol_Consumption': 'int8',
+    'Physical_Activity': 'int8',
+    'Diet_Score': 'int8',
+    'Cholesterol_Level': 'int16',
+    'Triglyceride_Level': 'int16',
+    'LDL_Level': 'int16',
+    'HDL_Level': 'int16',
+    'Systolic_BP': 'int16',
+    'Diastolic_BP': 'int16',
+    'Air_Pollution_Exposure': 'int8',
+    'Family_History': 'int8',
+    'Stress_Level': 'int8',
+    'Healthcare_Access': 'int8',
+    'Heart_Attack_History': 'int8',
+    'Emergency_Response_Time': 'int16',
+    'Annual_Income': 'int32',
+    'Health_Insurance': 'int8',
+    'Heart_Attack_Risk': 'int8',
+}
+
+CACHE_FORMAT = 1
+
+
+def file_hash(path, block_size=1 << 20):
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(block_size), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def _narrow(series, dtype):
+    if dtype == 'category' or (dtype is None and series.dtype == object):
+        return series.astype('category')
+    if dtype is not None and series.notna().all() and np.issubdtype(series.dtype, np.number):
+        info = np.iinfo(dtype) if np.issubdtype(np.dtype(dtype), np.integer) else np.finfo(dtype)
+        if info.min <= series.min() and series.max() <= info.max and (series % 1 == 0).all():
+            return series.astype(dtype)
+    if np.issubdtype(series.dtype, np.integer):
+        return pd.to_numeric(series, downcast='integer')
+    return series
+
+
+def apply_schema(df):
+    """Return df with every column narrowed per SCHEMA (columns not in SCHEMA are downcast if lossless)"""
+    return pd.DataFrame({col: _narrow(df[col], SCHEMA.get(col)) for col in df.columns})
+
+
+def default_cache_dir(csv_path):
+    return os.path.join(os.path.dirname(os.path.abspath(csv_path)), '.data_cache')
+
+
+def _entry_prefix(csv_path):
+    return os.path.splitext(os.path.basename(csv_path))[0] + '-'
+
+
+def build_cache(csv_path, entry_dir, digest):
+    """Parse csv_path once and write its typed columns into entry_dir"""
+    df = apply_schema(pd.read_csv(csv_path))
+    parent = os.path.dirname(entry_dir)
+    os.makedirs(parent, exist_ok=True)
+    tmp_dir = tempfile.mkdtemp(prefix='.building-', dir=parent)
+    columns = []
+    for i, col in enumerate(df.columns):
+        series = df[col]
+        column = {'name': col, 'file': f'{i:03d}.npy'}
+        if isinstance(series.dtype, pd.CategoricalDtype):
+            np.save(os.path.join(tmp_dir, column['file']), series.cat.codes.to_numpy())
+            column['categories'] = series.cat.categories.tolist()
+        else:
+            np.save(os.path.join(tmp_dir, column['file']), series.to_numpy())
+        column['dtype'] = str(series.dtype)
+        columns.append(column)
+    with open(os.path.join(tmp_dir, 'meta.json'), 'w') as f:
+        json.dump({'format': CACHE_FORMAT, 'source': os.path.abspath(csv_path), 'sha256': digest,
+                   'rows': len(df), 'columns': columns}, f, indent=2)
+    try:
+        os.replace(tmp_dir, entry_dir)
+    except OSError:
+        # Another process published the same entry first
+        shutil.rmtree(tmp_dir, ignore_errors=True)
+    # Entries for older contents of the same CSV are stale
+    prefix = _entry_prefix(csv_path)
+    for name in os.listdir(parent):
+        path = os.path.join(parent, name)
+        if name.startswith(prefix) and path != entry_dir:
+            shutil.rmtree(path, ignore_errors=True)
+
+
+def read_cache(entry_dir, mmap=True):
+    """Load a cache entry as a DataFrame; with mmap the numeric columns stay file-backed"""
+    with open(os.path.join(entry_dir, 'meta.json')) as f:
+        meta = json.load(f)
+    if meta.get('format') != CACHE_FORMAT:
+        raise ValueError(f"Unsupported data cache format {meta.get('format')}")
+    data = {}
+    for column in meta['columns']:
+        values = np.load(os.path.join(entry_dir, column['file']), mmap_mode='r' if mmap else None)
+        if 'categories' in column:
+            data[column['name']] = pd.Categorical.from_codes(np.asarray(values), column['categories'])
+        else:
+            data[column['name']] = values
+    return pd.DataFrame(data, copy=False)
+
+
+def load_training_data(csv_path='heart.csv', cache_dir=None, use_cache=True, mmap=True):
+    """
+    Load csv_path as a typed DataFrame, through the cache unless use_cache
+    is False. The cache entry is rebuilt whenever the CSV's contents change.
+    """
+    if not use_cache:
+        return apply_schema(pd.read_csv(csv_path))
+    digest = file_hash(csv_path)
+    entry_dir = os.path.join(cache_dir or default_cache_dir(csv_path), _entry_prefix(csv_path) + digest[:16])
+    if not os.path.exists(os.path.join(entry_dir, 'meta.json')):
+        build_cache(csv_path, entry_dir, digest)
+    return read_cache(entry_dir, mmap=mmap)
+
+
+def main(argv=None):
+    import argparse
+    import gc
+    import tracemalloc
+
+    parser = argparse.ArgumentParser(description="Compare loading the training CSV with the typed cache")
+    parser.add_argument('csv', nargs='?', default='heart.csv')
+    parser.add_argument('--runs', type=int, default=5)
+    parser.add_argument('--cache-dir')
+    args = parser.parse_args(argv)
+
+    def measure(load):
+        timings = []
+        for _ in range(args.runs):
+            started = time.perf_counter()
+            load()
+            timings.append(time.perf_counter() - started)
+        gc.collect()
+        tracemalloc.start()
+        df = load()
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        return min(timings) * 1000, peak / 1e6, df.memory_usage(deep=True).sum() / 1e6, df
+
+    cache_dir = args.cache_dir or default_cache_dir(args.csv)
+    started = time.perf_counter()
+    load_training_data(args.csv, cache_dir=cache_dir)
+    first_ms = (time.perf_counter() - started) * 1000
+
+    rows = [
+        ('pd.read_csv', lambda: pd.read_csv(args.csv)),
+        ('cache (mmap)', lambda: load_training_data(args.csv, cache_dir=cache_dir)),
+        ('cache (in memory)', lambda: load_training_data(args.csv, cache_dir=cache_dir, mmap=False)),
+    ]
+    print(f"📊 {args.csv}: first cached load (parse + write) {first_ms:.1f} ms")
+    print(f"\n{'loader':<18} {'load ms':>8} {'peak alloc MB':>14} {'frame MB':>9}")
+    for name, load in rows:
+        ms, peak_mb, frame_mb, df = measure(load)
+        print(f"{name:<18} {ms:>8.1f} {peak_mb:>14.2f} {frame_mb:>9.2f}")
+    print(f"\nTyped columns: {dict(df.dtypes.astype(str).value_counts())}")
+
+
+if __name__ == '__main__':
+    sys.exit(main())
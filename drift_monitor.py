@@ -0,0 +1,321 @@
+"""
+Streaming input-drift monitor: live /predict inputs vs. the training data.
+
+retrain_model.py saves a baseline next to the model
+(heart_disease_drift_baseline.json): for each numeric model input, up to
+DRIFT_BINS equal-mass bin edges taken from the training rows and the
+training fraction in each bin; for State_Name and Gender, the training
+categories and their fractions. Each worker keeps fixed-size count
+sketches per feature (one slot per bin or category, plus one for
+categories never seen in training), so an observation is a bisect over at
+most nine edges or a dict lookup per feature and no request is stored.
+
+Counts cover a sliding window of DRIFT_WINDOW seconds, kept as a ring of
+DRIFT_WINDOW_SLICES sketches, one per time slice. An observation goes into
+the current slice; a slice older than the window is cleared when the ring
+comes round to it again, and /drift sums the live slices. Memory stays
+constant and a recent shift is not diluted by days of earlier traffic.
+Slices are aligned on wall-clock time, so the slices of different workers
+line up.
+
+With DRIFT_DIR (default: METRICS_DIR) set, every worker writes its slices
+there every DRIFT_FLUSH_INTERVAL seconds and /drift sums the slices of all
+workers, through the same worker_snapshots.py helper as /metrics. /drift reports per feature the population
+stability index (PSI) and, for numeric features, the Kolmogorov-Smirnov
+distance between the binned distributions (a lower bound of the exact
+statistic, since values within a bin are not resolved).
+
+When the baseline file changes (a retrain), the counts start again from zero.
+
+build_baseline (used by retrain_model.py) imports NumPy itself.
+"""
+import bisect
+import hashlib
+import json
+import math
+import os
+import threading
+import time
+
+from patient_record import CATEGORY, FIELD_NAMES, FIELDS, PatientRecord
+from worker_snapshots import WorkerSnapshots
+
+# Baseline written by retrain_model.py; without it the monitor stays off
+DRIFT_BASELINE_PATH = os.environ.get('DRIFT_BASELINE_PATH', 'heart_disease_drift_baseline.json')
+# Shared directory for the per-worker counts (default: next to the metrics snapshots)
+DRIFT_DIR = os.environ.get('DRIFT_DIR', os.environ.get('METRICS_DIR', ''))
+DRIFT_FLUSH_INTERVAL = float(os.environ.get('DRIFT_FLUSH_INTERVAL', 5.0))
+# Sliding window compared with the baseline, in seconds, and the slices it is kept in
+DRIFT_WINDOW = float(os.environ.get('DRIFT_WINDOW', 3600))
+DRIFT_WINDOW_SLICES = int(os.environ.get('DRIFT_WINDOW_SLICES', 12))
+# PSI rule of thumb: below 0.1 stable, 0.1-0.25 a moderate shift, above 0.25 drift
+DRIFT_PSI_WARN = float(os.environ.get('DRIFT_PSI_WARN', 0.1))
+DRIFT_PSI_ALERT = float(os.environ.get('DRIFT_PSI_ALERT', 0.25))
+# Fewer live observations than this are reported as insufficient
+DRIFT_MIN_OBSERVATIONS = int(os.environ.get('DRIFT_MIN_OBSERVATIONS', 100))
+
+BASELINE_FILE = 'heart_disease_drift_baseline.json'
+DRIFT_BINS = 10
+OTHER = '__other__'  # Categories not seen in training
+SNAPSHOT_SUFFIX = '.drift'
+
+# Floor for empty bins, which would make PSI infinite
+_EPSILON = 1e-4
+
+
+def build_baseline(X, bins=DRIFT_BINS):
+    """
+    Baseline of a training DataFrame: equal-mass bin edges and fractions
+    for numeric columns, category fractions for State_Name and Gender
+    """
+    import numpy as np
+
+    features = {}
+    for name in FIELD_NAMES:
+        values = X[name]
+        if FIELDS[name].kind == CATEGORY:
+            counts = values.astype(str).value_counts().sort_index()
+            features[name] = {'kind': 'category', 'categories': counts.index.tolist(),
+                              'fractions': (counts.to_numpy() / len(values)).tolist() + [0.0]}
+            continue
+        values = values.to_numpy(dtype=float)
+        # Edges are observed values (value <= edge falls in that bin); the maximum needs none
+        edges = np.unique(np.quantile(values, np.linspace(0, 1, bins + 1)[1:-1], method='lower'))
+        edges = edges[edges < values.max()]
+        counts = np.bincount(np.searchsorted(edges, values, side='left'), minlength=len(edges) + 1)
+        features[name] = {'kind': 'numeric', 'edges': edges.tolist(),
+                          'fractions': (counts / len(values)).tolist()}
+    fingerprint = hashlib.sha1(json.dumps(features, sort_keys=True).encode('utf-8')).hexdigest()[:12]
+    return {'fingerprint': fingerprint, 'rows': len(X), 'created_at': time.time(), 'features': features}
+
+
+def save_baseline(baseline, path):
+    with open(f'{path}.tmp', 'w') as f:
+        json.dump(baseline, f)
+    os.replace(f'{path}.tmp', path)
+
+
+def psi(expected, actual):
+    """Population stability index of two distributions given as fractions over the same bins"""
+    total = 0.0
+    for e, a in zip(expected, actual):
+        e, a = max(e, _EPSILON), max(a, _EPSILON)
+        total += (a - e) * math.log(a / e)
+    return total
+
+
+def binned_ks(expected, actual):
+    """Largest gap between the cumulative fractions of two binned distributions"""
+    gap = cum_e = cum_a = 0.0
+    for e, a in zip(expected, actual):
+        cum_e += e
+        cum_a += a
+        gap = max(gap, abs(cum_a - cum_e))
+    return gap
+
+
+class DriftMonitor:
+    """Per-feature count sketches of this process over a sliding window, the DRIFT_DIR merge and /drift"""
+
+    def __init__(self, baseline_path=DRIFT_BASELINE_PATH, drift_dir=DRIFT_DIR,
+                 flush_interval=DRIFT_FLUSH_INTERVAL, window=DRIFT_WINDOW, slices=DRIFT_WINDOW_SLICES):
+        self.baseline_path = baseline_path
+        self.drift_dir = drift_dir
+        self.window = window
+        self.n_slices = max(1, slices)
+        self.slice_seconds = window / self.n_slices
+        self.baseline = None
+        self._baseline_mtime = None
+        self._numeric = []      # (index in FIELD_NAMES, name, edges)
+        self._categorical = []  # (index in FIELD_NAMES, name, {category: slot})
+        self._sizes = {}        # Count slots per feature
+        self._slices = []       # Ring of [slice id, observations, {feature: counts}] or None
+        self._lock = threading.Lock()
+        self._snapshots = WorkerSnapshots(self.snapshot, drift_dir, SNAPSHOT_SUFFIX, flush_interval, 'drift',
+                                          flush=self._periodic_flush)
+        self.refresh()
+
+    @property
+    def enabled(self):
+        return self.baseline is not None
+
+    def refresh(self):
+        """(Re)load the baseline if its file changed; the counts restart with a new baseline"""
+        try:
+            mtime = os.path.getmtime(self.baseline_path) if self.baseline_path else None
+        except OSError:
+            mtime = None
+        if mtime == self._baseline_mtime:
+            return
+        baseline = None
+        if mtime is not None:
+            try:
+                with open(self.baseline_path) as f:
+                    baseline = json.load(f)
+                print(f"📐 Drift baseline loaded from: {self.baseline_path} ({baseline['rows']:,} training rows)")
+            except (OSError, ValueError, KeyError) as e:
+                print(f"❌ Drift baseline {self.baseline_path} could not be read: {e}")
+                baseline = None
+        with self._lock:
+            self._baseline_mtime = mtime
+            self.baseline = baseline
+            self._numeric, self._categorical, self._sizes = [], [], {}
+            self._slices = [None] * self.n_slices
+            if baseline is None:
+                return
+            for i, name in enumerate(FIELD_NAMES):
+                feature = baseline['features'][name]
+                if feature['kind'] == 'category':
+                    slots = {category: slot for slot, category in enumerate(feature['categories'])}
+                    self._categorical.append((i, name, slots))
+                else:
+                    self._numeric.append((i, name, feature['edges']))
+                self._sizes[name] = len(feature['fractions'])
+
+    def _slice_id(self, now=None):
+        return int((time.time() if now is None else now) // self.slice_seconds)
+
+    def _current_counts(self):
+        """Counts of the current time slice, clearing the slot it reuses (call under the lock)"""
+        slice_id = self._slice_id()
+        current = self._slices[slice_id % self.n_slices]
+        if current is None or current[0] != slice_id:
+            current = [slice_id, 0, {name: [0] * size for name, size in self._sizes.items()}]
+            self._slices[slice_id % self.n_slices] = current
+        return current
+
+    def observe(self, record):
+        """Count one patient (a PatientRecord or a dict keyed by column name)"""
+        if self.baseline is None:
+            return
+        values = record.values() if isinstance(record, PatientRecord) else [record.get(n) for n in FIELD_NAMES]
+        with self._lock:
+            if self.baseline is None:
+                return
+            current = self._current_counts()
+            counts = current[2]
+            for i, name, edges in self._numeric:
+                counts[name][bisect.bisect_left(edges, values[i])] += 1
+            for i, name, slots in self._categorical:
+                counts[name][slots.get(values[i], -1)] += 1
+            current[1] += 1
+
+    def observe_frame(self, X):
+        """Count every row of a validated batch DataFrame (one vectorised pass per column)"""
+        numeric, categorical = self._numeric, self._categorical
+        if self.baseline is None or not len(X):
+            return
+        import numpy as np
+
+        added = {}
+        for _, name, edges in numeric:
+            bins = np.searchsorted(np.asarray(edges, dtype=float), X[name].to_numpy(dtype=float), side='left')
+            added[name] = np.bincount(bins, minlength=len(edges) + 1).tolist()
+        for _, name, slots in categorical:
+            column = [0] * (len(slots) + 1)
+            for category, count in X[name].value_counts().items():
+                column[slots.get(category, -1)] += int(count)
+            added[name] = column
+        with self._lock:
+            if self._numeric is not numeric:  # The baseline changed under us
+                return
+            current = self._current_counts()
+            for name, column in added.items():
+                target = current[2][name]
+                for slot, count in enumerate(column):
+                    target[slot] += count
+            current[1] += len(X)
+
+    def snapshot(self):
+        """This process's slices inside the window (JSON-serialisable)"""
+        oldest = self._slice_id() - self.n_slices
+        with self._lock:
+            return {'fingerprint': self.baseline['fingerprint'] if self.baseline else None,
+                    'slice_seconds': self.slice_seconds,
+                    'slices': [{'id': slice_id, 'observations': observations,
+                                'counts': {name: list(column) for name, column in counts.items()}}
+                               for slice_id, observations, counts in filter(None, self._slices)
+                               if slice_id > oldest]}
+
+    def flush(self):
+        """Write this process's slices to DRIFT_DIR/<pid>.drift"""
+        if self.baseline is not None:
+            self._snapshots.write()
+
+    def _periodic_flush(self):
+        self.refresh()
+        self.flush()
+
+    def ensure_flusher(self):
+        """Start this process's periodic slices writer (see worker_snapshots.py)"""
+        self._snapshots.ensure_writer()
+
+    def collect(self):
+        """
+        (observations, {feature: counts}, id of the oldest slice counted)
+        summed over the window's slices of every worker that counted
+        against the current baseline
+        """
+        snapshots = self._snapshots.read_all()
+        fingerprint = self.baseline['fingerprint']
+        current = self._slice_id()
+        observations, oldest = 0, None
+        totals = {name: [0] * size for name, size in self._sizes.items()}
+        for snapshot in snapshots:
+            # Counted against an older baseline, or with another slicing
+            if snapshot.get('fingerprint') != fingerprint or snapshot.get('slice_seconds') != self.slice_seconds:
+                continue
+            for entry in snapshot['slices']:
+                if not current - self.n_slices < entry['id'] <= current:
+                    continue
+                observations += entry['observations']
+                oldest = entry['id'] if oldest is None else min(oldest, entry['id'])
+                for name, column in entry['counts'].items():
+                    totals[name] = [a + b for a, b in zip(totals[name], column)]
+        return observations, totals, oldest
+
+    def report(self):
+        """PSI (and binned KS for numeric features) of the live inputs against the baseline"""
+        self.refresh()
+        if self.baseline is None:
+            return None
+        observations, totals, oldest = self.collect()
+        features = {}
+        for name, feature in self.baseline['features'].items():
+            counts = totals[name]
+            n = sum(counts)
+            actual = [count / n for count in counts] if n else [0.0] * len(counts)
+            entry = {'kind': feature['kind'], 'psi': None, 'status': 'insufficient_data'}
+            if feature['kind'] == 'numeric':
+                entry['ks'] = None
+            if n >= max(1, DRIFT_MIN_OBSERVATIONS):
+                entry['psi'] = round(psi(feature['fractions'], actual), 6)
+                if feature['kind'] == 'numeric':
+                    entry['ks'] = round(binned_ks(feature['fractions'], actual), 6)
+                entry['status'] = ('drift' if entry['psi'] >= DRIFT_PSI_ALERT else
+                                   'warn' if entry['psi'] >= DRIFT_PSI_WARN else 'ok')
+            if feature['kind'] == 'category' and counts[-1]:
+                entry['unseen_categories'] = counts[-1]
+            features[name] = entry
+        ranked = sorted((name for name in features if features[name]['psi'] is not None),
+                        key=lambda name: features[name]['psi'], reverse=True)
+        return {
+            'observations': observations,
+            'min_observations': DRIFT_MIN_OBSERVATIONS,
+            # Span of the counts: the window, cut short after a restart or a new baseline
+            'window': {'seconds': self.window, 'slices': self.n_slices,
+                       'start': None if oldest is None else oldest * self.slice_seconds,
+                       'end': time.time()},
+            'baseline': {'path': self.baseline_path, 'fingerprint': self.baseline['fingerprint'],
+                         'rows': self.baseline['rows'], 'created_at': self.baseline['created_at']},
+            'thresholds': {'warn': DRIFT_PSI_WARN, 'drift': DRIFT_PSI_ALERT},
+            'drifted': [name for name in ranked if features[name]['status'] == 'drift'],
+            'warnings': [name for name in ranked if features[name]['status'] == 'warn'],
+            'features': features,
+        }
+
+    def stats(self):
+        snapshot = self.snapshot()
+        return {'baseline': self.baseline_path if self.baseline else None,
+                'window_seconds': self.window,
+                'observations': sum(entry['observations'] for entry in snapshot['slices'])}
@@ -0,0 +1,161 @@
+"""
+Flattened, array-backed RandomForest evaluator.
+
+Every fitted tree of a RandomForestClassifier is packed into one set of
+contiguous NumPy arrays (feature, threshold, left, right, leaf value) and
+all trees are walked together for a batch of rows with vectorized index
+arithmetic. This avoids sklearn's per-call joblib dispatch over the
+estimators, which dominates the cost of scoring a single patient.
+
+The evaluator is tuned for the serving path (one row up to a few dozen);
+for batches in the thousands sklearn's compiled tree walk is faster, see
+benchmarks/bench_flat_forest.py.
+"""
+import struct
+import zipfile
+
+import numpy as np
+
+TREE_LEAF = -1
+
+
+def _mmap_npz(path):
+    """
+    Memory-map every array of an uncompressed .npz archive.
+    np.load ignores mmap_mode for .npz files, but np.savez stores members
+    uncompressed, so each member's .npy payload can be mapped in place.
+    """
+    arrays = {}
+    with zipfile.ZipFile(path) as archive, open(path, 'rb') as f:
+        for info in archive.infolist():
+            name = info.filename[:-4] if info.filename.endswith('.npy') else info.filename
+            if info.compress_type != zipfile.ZIP_STORED:
+                raise ValueError(f"{path} member {info.filename} is compressed and cannot be memory-mapped")
+            f.seek(info.header_offset)
+            local_header = f.read(30)
+            name_len, extra_len = struct.unpack('<HH', local_header[26:30])
+            f.seek(info.header_offset + 30 + name_len + extra_len)
+            version = np.lib.format.read_magic(f)
+            if version == (1, 0):
+                shape, fortran_order, dtype = np.lib.format.read_array_header_1_0(f)
+            else:
+                shape, fortran_order, dtype = np.lib.format.read_array_header_2_0(f)
+            if dtype.hasobject:
+                raise ValueError(f"{path} member {info.filename} holds Python objects")
+            if not shape or 0 in shape:
+                arrays[name] = np.load(archive.open(info.filename), allow_pickle=False)
+            else:
+                arrays[name] = np.memmap(path, dtype=dtype, mode='r', shape=shape, offset=f.tell(),
+                                         order='F' if fortran_order else 'C')
+    return arrays
+
+
+def _float_array(array):
+    """Contiguous float32 or float64 array; any other dtype becomes float64"""
+    array = np.asarray(array)
+    dtype = array.dtype if array.dtype in (np.float32, np.float64) else np.float64
+    return np.ascontiguousarray(array, dtype=dtype)
+
+
+class FlatForest:
+    """RandomForestClassifier stand-in backed by flat node arrays"""
+
+    def __init__(self, feature, threshold, left, right, value, roots, max_depth, classes, n_features_in):
+        self.feature = np.ascontiguousarray(feature, dtype=np.int32)
+        # float32 thresholds and leaf values (compact_model.py) are kept as given
+        self.threshold = _float_array(threshold)
+        self.left = np.ascontiguousarray(left, dtype=np.int32)
+        self.right = np.ascontiguousarray(right, dtype=np.int32)
+        self.value = _float_array(value)
+        self.roots = np.ascontiguousarray(roots, dtype=np.int32)
+        self.max_depth = int(max_depth)
+        self.classes_ = np.asarray(classes)
+        self.n_features_in_ = int(n_features_in)
+        self.n_estimators = len(self.roots)
+        self.is_leaf = self.left == np.arange(len(self.left), dtype=np.int32)
+
+    @classmethod
+    def from_estimator(cls, forest):
+        """Pack a fitted (single-output) RandomForestClassifier into flat arrays"""
+        if getattr(forest, 'n_outputs_', 1) != 1:
+            raise ValueError("Only single-output forests are supported")
+
+        features, thresholds, lefts, rights, values, roots = [], [], [], [], [], []
+        offset = 0
+        max_depth = 0
+        for estimator in forest.estimators_:
+            tree = estimator.tree_
+            n_nodes = tree.node_count
+            node_ids = np.arange(offset, offset + n_nodes, dtype=np.int64)
+            is_leaf = tree.children_left == TREE_LEAF
+
+            # Leaves point at themselves so the batch walk needs no masking
+            features.append(np.where(is_leaf, 0, tree.feature))
+            thresholds.append(np.where(is_leaf, 0.0, tree.threshold))
+            lefts.append(np.where(is_leaf, node_ids, tree.children_left + offset))
+            rights.append(np.where(is_leaf, node_ids, tree.children_right + offset))
+
+            # Normalise leaf counts the same way DecisionTreeClassifier.predict_proba does
+            leaf_value = tree.value[:, 0, :].astype(np.float64)
+            normalizer = leaf_value.sum(axis=1, keepdims=True)
+            normalizer[normalizer == 0.0] = 1.0
+            values.append(leaf_value / normalizer)
+
+            roots.append(offset)
+            max_depth = max(max_depth, tree.max_depth)
+            offset += n_nodes
+
+        return cls(np.concatenate(features), np.concatenate(thresholds),
+                   np.concatenate(lefts), np.concatenate(rights), np.concatenate(values),
+                   np.asarray(roots), max_depth, forest.classes_, forest.n_features_in_)
+
+    def save(self, path):
+        """Write the forest to an uncompressed .npz (loadable with mmap)"""
+        np.savez(path, feature=self.feature, threshold=self.threshold, left=self.left,
+                 right=self.right, value=self.value, roots=self.roots,
+                 max_depth=np.array(self.max_depth), classes=self.classes_,
+                 n_features_in=np.array(self.n_features_in_))
+
+    @classmethod
+    def load(cls, path, mmap=False):
+        """
+        Load a forest written by save(). With mmap=True the node arrays stay
+        memory-mapped, so processes loading the same file share the pages.
+        """
+        if mmap:
+            data = _mmap_npz(path)
+            return cls(data['feature'], data['threshold'], data['left'], data['right'],
+                       data['value'], data['roots'], data['max_depth'], data['classes'],
+                       data['n_features_in'])
+        with np.load(path, allow_pickle=False) as data:
+            return cls(data['feature'], data['threshold'], data['left'], data['right'],
+                       data['value'], data['roots'], data['max_depth'], data['classes'],
+                       data['n_features_in'])
+
+    def apply(self, X):
+        """Return the global leaf index reached by every row in every tree"""
+        # sklearn trees compare float32 features against float64 thresholds
+        X = np.asarray(X, dtype=np.float32)
+        if X.ndim != 2 or X.shape[1] != self.n_features_in_:
+            raise ValueError(f"Expected input of shape (n, {self.n_features_in_}), got {X.shape}")
+
+        n_rows = X.shape[0]
+        X_flat = X.ravel()
+        # One (row, tree) pair per entry; only pairs that are not yet at a leaf are advanced
+        row_offset = np.repeat(np.arange(n_rows, dtype=np.intp) * self.n_features_in_, self.n_estimators)
+        nodes = np.tile(self.roots, n_rows).astype(np.intp)
+        active = np.arange(nodes.size, dtype=np.intp)
+        while active.size:
+            current = nodes[active]
+            go_left = X_flat[row_offset[active] + self.feature[current]] <= self.threshold[current]
+            current = np.where(go_left, self.left[current], self.right[current])
+            nodes[active] = current
+            active = active[~self.is_leaf[current]]
+        return nodes.reshape(n_rows, self.n_estimators)
+
+    def predict_proba(self, X):
+        leaves = self.apply(X)
+        return self.value[leaves].sum(axis=1, dtype=np.float64) / self.n_estimators
+
+    def predict(self, X):
+        return self.classes_[np.argmax(self.predict_proba(X), axis=1)]
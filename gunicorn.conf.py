@@ -0,0 +1,54 @@
+"""
+Gunicorn settings, picked up automatically by `gunicorn app:app`.
+
+With preload_app the master imports app.py (and loads the model) once
+before forking, so every worker shares the model's memory pages
+copy-on-write instead of holding a private copy. The garbage collector
+is frozen before fork so collections in the workers do not write to,
+and thereby un-share, the pages holding the model objects.
+
+Set GUNICORN_PRELOAD=0 to fall back to per-worker loading, and
+MODEL_MMAP=1 to memory-map array-backed artifacts (FlatForest .npz,
+compiled scorer) so even separately loaded copies share page cache.
+
+With METRICS_DIR set, /metrics sums the snapshots every worker writes
+there; the directory is cleared when the server starts so a restart
+begins from zero. The same goes for the drift monitor's per-worker counts
+in DRIFT_DIR (default: METRICS_DIR).
+
+Each worker flushes its buffered prediction audit entries (audit_log.py)
+and its drift counts (drift_monitor.py) when it exits.
+"""
+import gc
+import glob
+import os
+import sys
+
+workers = int(os.environ.get('WEB_CONCURRENCY', 1))
+# More than one thread switches to gthread workers; needed for MICROBATCH=1 to see concurrent requests
+threads = int(os.environ.get('GUNICORN_THREADS', 1))
+preload_app = os.environ.get('GUNICORN_PRELOAD', '1') == '1'
+
+
+def on_starting(server):
+    metrics_dir = os.environ.get('METRICS_DIR')
+    if metrics_dir:
+        for path in glob.glob(os.path.join(metrics_dir, '*.json')):
+            os.remove(path)
+    drift_dir = os.environ.get('DRIFT_DIR', metrics_dir)
+    if drift_dir:
+        for path in glob.glob(os.path.join(drift_dir, '*.drift')):
+            os.remove(path)
+
+
+def pre_fork(server, worker):
+    if preload_app:
+        # Move everything loaded so far into the permanent generation
+        gc.freeze()
+
+
+def worker_exit(server, worker):
+    app_module = sys.modules.get('app')
+    if app_module is not None:
+        app_module.audit_log.close()
+        app_module.drift_monitor.flush()
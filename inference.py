@@ -0,0 +1,122 @@
+"""
+Shared inference helpers for the heart disease models.
+
+Probabilities are computed once per call; the predicted class and the
+risk category are derived from that single predict_proba result instead
+of running the pipeline a second time through predict().
+
+Input construction, preprocessing and model inference are timed as
+separate metrics stages.
+
+Patients arrive as PatientRecords (patient_record.py) or plain dicts with
+the same keys; model inputs are written straight into preallocated arrays
+in model column order.
+"""
+from metrics import stage
+from patient_record import (CATEGORY, FIELD_NAMES, SCHEMA, records_to_frame,
+                            records_to_matrix)
+
+# Feature names expected by the complex pipeline (heart.csv minus Patient_ID and target)
+FEATURE_COLUMNS = list(FIELD_NAMES)
+CATEGORICAL_COLUMNS = [field.name for field in SCHEMA if field.kind == CATEGORY]
+NUMERIC_COLUMNS = [col for col in FEATURE_COLUMNS if col not in CATEGORICAL_COLUMNS]
+
+# Feature order expected by the simple 12-feature model
+SIMPLE_FEATURES = [
+    'Age', 'Diabetes', 'Hypertension', 'Obesity', 'Smoking',
+    'Physical_Activity', 'Diet_Score', 'Cholesterol_Level',
+    'Systolic_BP', 'Diastolic_BP', 'Family_History', 'Stress_Level'
+]
+
+
+def categorize_risk(probability):
+    """Map a probability to the Low / Medium / High bands used by the UI"""
+    return 'Low' if probability < 0.33 else ('Medium' if probability < 0.66 else 'High')
+
+
+def model_input(patient_data, model_type):
+    """Build the single-row model input for one PatientRecord or patient_data dict"""
+    if model_type == "simple":
+        return records_to_matrix([patient_data], SIMPLE_FEATURES)
+    return records_to_frame([patient_data], FEATURE_COLUMNS)
+
+
+def staged_predict_proba(model, X):
+    """
+    model.predict_proba(X), with a Pipeline's (or CompiledScorer's)
+    preprocessing timed apart from the final estimator. The Pipeline steps
+    run exactly as Pipeline.predict_proba would run them.
+    """
+    steps = getattr(model, 'steps', None)
+    if steps:
+        with stage('preprocess'):
+            for _, step in steps[:-1]:
+                if step is not None and step != 'passthrough':
+                    X = step.transform(X)
+        with stage('inference'):
+            return steps[-1][1].predict_proba(X)
+    if hasattr(model, 'predict_proba_matrix'):
+        with stage('preprocess'):
+            X = model.transform(X)
+        with stage('inference'):
+            return model.predict_proba_matrix(X)
+    with stage('inference'):
+        return model.predict_proba(X)
+
+
+def predict_proba_batch(model, model_type, X):
+    """
+    Run one predict_proba call over a DataFrame of patients.
+    Returns the full probability matrix (one column per class).
+    """
+    with stage('build_input'):
+        X = X[SIMPLE_FEATURES].to_numpy() if model_type == "simple" else X[FEATURE_COLUMNS]
+    return staged_predict_proba(model, X)
+
+
+def predict_patient(model, model_type, patient_data):
+    """
+    Score one patient with a single predict_proba call.
+    Returns (probability of the positive class, predicted class, risk category).
+    """
+    if hasattr(model, 'transform_record'):
+        # Compiled scorers take the dict directly and skip the DataFrame
+        with stage('preprocess'):
+            row = model.transform_record(patient_data)
+        with stage('inference'):
+            proba = model.predict_proba_matrix(row)[0]
+    elif hasattr(model, 'predict_proba_record'):
+        with stage('inference'):
+            proba = model.predict_proba_record(patient_data)
+    else:
+        with stage('build_input'):
+            X = model_input(patient_data, model_type)
+        proba = staged_predict_proba(model, X)[0]
+    pred_prob = float(proba[1])
+    pred_class = model.classes_[int(proba[1] > proba[0])]
+    return pred_prob, pred_class, categorize_risk(pred_prob)
+
+
+def predict_patients(model, model_type, records):
+    """
+    Score several PatientRecords / patient_data dicts with one predict_proba call.
+    Returns one (probability, predicted class, risk category) per record,
+    the same values predict_patient gives for each record on its own.
+    """
+    import numpy as np
+    if hasattr(model, 'predict_proba_record') and not hasattr(model, 'transform_record'):
+        # Grid scorers are lookups; there is no per-call cost to share
+        with stage('inference'):
+            proba = np.array([model.predict_proba_record(record) for record in records])
+    else:
+        with stage('build_input'):
+            if model_type == "simple":
+                X = records_to_matrix(records, SIMPLE_FEATURES)
+            else:
+                X = records_to_frame(records, FEATURE_COLUMNS)
+        proba = staged_predict_proba(model, X)
+    results = []
+    for row in proba:
+        pred_prob = float(row[1])
+        results.append((pred_prob, model.classes_[int(row[1] > row[0])], categorize_risk(pred_prob)))
+    return results
@@ -0,0 +1,216 @@
+"""
+Request and stage timing histograms exposed in Prometheus text format.
+
+Every request is timed as a whole (per endpoint, method and status), and
+the hot path is split into stages (form parsing, input construction,
+preprocessing, model inference, rule-based fallback, rendering, ...) with
+`with stage('name'):` blocks. Observations go into fixed-bucket histograms
+(one bisect and one lock per observation), so instrumentation stays on in
+production.
+
+Each gunicorn worker keeps its own histograms. With METRICS_DIR set, each
+process also writes a snapshot there every METRICS_FLUSH_INTERVAL seconds
+and /metrics sums the snapshots of all workers (worker_snapshots.py), so a
+scrape that lands on any one worker reports the whole server.
+"""
+import bisect
+import os
+import threading
+import time
+
+from worker_snapshots import WorkerSnapshots
+
+METRICS_ENABLED = os.environ.get('METRICS_ENABLED', '1') == '1'
+METRICS_DIR = os.environ.get('METRICS_DIR', '')
+METRICS_FLUSH_INTERVAL = float(os.environ.get('METRICS_FLUSH_INTERVAL', 5.0))
+
+# Upper bounds in seconds: 100 µs (a cached or rule-based stage) up to 10 s
+DEFAULT_BUCKETS = (0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025,
+                   0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+REQUEST_SECONDS = 'heart_request_duration_seconds'
+STAGE_SECONDS = 'heart_stage_duration_seconds'
+ERRORS_TOTAL = 'heart_errors_total'
+
+HELP = {
+    REQUEST_SECONDS: 'Request latency by endpoint, method and status',
+    STAGE_SECONDS: 'Time spent in each stage of request handling',
+    ERRORS_TOTAL: 'Errors by kind',
+    'heart_prediction_cache_requests_total': 'Prediction cache lookups by result',
+    'heart_microbatch_batches_total': 'Micro-batches scored',
+    'heart_microbatch_rows_total': 'Single-patient predictions scored through micro-batches',
+}
+
+
+class Histogram:
+    """Fixed-bucket histogram; counts[i] holds observations <= buckets[i], the last slot the rest"""
+
+    def __init__(self, buckets=DEFAULT_BUCKETS):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.sum = 0.0
+        self._lock = threading.Lock()
+
+    def observe(self, value):
+        i = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            self.counts[i] += 1
+            self.sum += value
+
+    def snapshot(self):
+        with self._lock:
+            return list(self.counts), self.sum
+
+
+class _StageTimer:
+    """Context manager recording its duration into a histogram"""
+
+    def __init__(self, histogram):
+        self._histogram = histogram
+
+    def __enter__(self):
+        self._started = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self._histogram.observe(time.perf_counter() - self._started)
+        return False
+
+
+class _NoTimer:
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+
+_NO_TIMER = _NoTimer()
+
+
+def _label_key(labels):
+    return tuple(sorted(labels.items()))
+
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _format_labels(labels, extra=None):
+    items = list(labels) + ([extra] if extra else [])
+    if not items:
+        return ''
+    return '{' + ','.join(f'{name}="{_escape(value)}"' for name, value in items) + '}'
+
+
+class MetricsRegistry:
+    """Histograms and counters of this process, plus the METRICS_DIR snapshot merge"""
+
+    def __init__(self, metrics_dir=METRICS_DIR, flush_interval=METRICS_FLUSH_INTERVAL):
+        self.metrics_dir = metrics_dir
+        self._histograms = {}
+        self._counters = {}
+        self._lock = threading.Lock()
+        self._snapshots = WorkerSnapshots(self.snapshot, metrics_dir, '.json', flush_interval, 'metrics')
+
+    def histogram(self, name, **labels):
+        key = (name, _label_key(labels))
+        histogram = self._histograms.get(key)
+        if histogram is None:
+            with self._lock:
+                histogram = self._histograms.setdefault(key, Histogram())
+        return histogram
+
+    def inc(self, name, amount=1, **labels):
+        key = (name, _label_key(labels))
+        with self._lock:
+            self._counters[key] = self._counters.get(key, 0) + amount
+
+    def stage(self, name):
+        if not METRICS_ENABLED:
+            return _NO_TIMER
+        return _StageTimer(self.histogram(STAGE_SECONDS, stage=name))
+
+    def snapshot(self):
+        """JSON-serialisable copy of every series"""
+        with self._lock:
+            histograms = list(self._histograms.items())
+            counters = list(self._counters.items())
+        return {
+            'histograms': [{'name': name, 'labels': dict(labels), 'counts': counts, 'sum': total}
+                           for (name, labels), histogram in histograms
+                           for counts, total in [histogram.snapshot()]],
+            'counters': [{'name': name, 'labels': dict(labels), 'value': value}
+                         for (name, labels), value in counters],
+        }
+
+    def flush(self):
+        """Write this process's snapshot to METRICS_DIR/<pid>.json"""
+        self._snapshots.write()
+
+    def ensure_flusher(self):
+        """Start this process's periodic snapshot writer (see worker_snapshots.py)"""
+        self._snapshots.ensure_writer()
+
+    def collect(self):
+        """
+        Merged series as ({(name, labels): (counts, sum)}, {(name, labels): value}),
+        summed over the snapshots of all processes with METRICS_DIR set
+        """
+        histograms, counters = {}, {}
+        for snapshot in self._snapshots.read_all():
+            for entry in snapshot['histograms']:
+                key = (entry['name'], _label_key(entry['labels']))
+                counts, total = histograms.get(key, ([0] * len(entry['counts']), 0.0))
+                histograms[key] = ([a + b for a, b in zip(counts, entry['counts'])], total + entry['sum'])
+            for entry in snapshot['counters']:
+                key = (entry['name'], _label_key(entry['labels']))
+                counters[key] = counters.get(key, 0) + entry['value']
+        return histograms, counters
+
+    def render(self, gauges=()):
+        """
+        Prometheus text exposition of all histograms and counters, plus
+        gauges given as (name, help, labels dict, value) for this process.
+        """
+        histograms, counters = self.collect()
+        lines = []
+        seen = set()
+
+        def header(name, kind, help_text=None):
+            if name not in seen:
+                seen.add(name)
+                lines.append(f'# HELP {name} {help_text or HELP.get(name, name)}')
+                lines.append(f'# TYPE {name} {kind}')
+
+        for (name, labels), (counts, total) in sorted(histograms.items()):
+            header(name, 'histogram')
+            cumulative = 0
+            for bound, count in zip(DEFAULT_BUCKETS + ('+Inf',), counts):
+                cumulative += count
+                lines.append(f'{name}_bucket{_format_labels(labels, ("le", bound))} {cumulative}')
+            lines.append(f'{name}_sum{_format_labels(labels)} {total}')
+            lines.append(f'{name}_count{_format_labels(labels)} {cumulative}')
+        for (name, labels), value in sorted(counters.items()):
+            header(name, 'counter')
+            lines.append(f'{name}{_format_labels(labels)} {value}')
+        for name, help_text, labels, value in gauges:
+            header(name, 'gauge', help_text)
+            lines.append(f'{name}{_format_labels(_label_key(labels))} {value}')
+        return '\n'.join(lines) + '\n'
+
+
+metrics_registry = MetricsRegistry()
+
+
+def stage(name):
+    """`with stage('inference'):` times the block into heart_stage_duration_seconds"""
+    return metrics_registry.stage(name)
+
+
+def observe_request(endpoint, method, status, seconds):
+    metrics_registry.histogram(REQUEST_SECONDS, endpoint=endpoint, method=method, status=str(status)).observe(seconds)
+
+
+def count_error(kind, amount=1):
+    metrics_registry.inc(ERRORS_TOTAL, amount, kind=kind)
@@ -0,0 +1,125 @@
+"""
+Opt-in micro-batching of concurrent single-patient predictions.
+
+With threaded gunicorn workers (GUNICORN_THREADS > 1) several /predict
+requests can be in flight in one worker at once, and each would pay the
+pipeline's fixed per-call cost for a single row. The MicroBatcher queues
+them instead: a dispatcher thread waits up to MICROBATCH_WINDOW_MS after
+the first queued request (or until MICROBATCH_MAX_ROWS are waiting),
+scores the whole group with one predict_proba call and hands each caller
+its own result.
+
+A lone request still waits out the window, so this only pays off under
+concurrency; it is off unless MICROBATCH=1.
+"""
+import os
+import threading
+import time
+
+from inference import predict_patients
+from metrics import metrics_registry
+
+MICROBATCH_ENABLED = os.environ.get('MICROBATCH', '0') == '1'
+MICROBATCH_WINDOW_MS = float(os.environ.get('MICROBATCH_WINDOW_MS', 2.0))
+MICROBATCH_MAX_ROWS = int(os.environ.get('MICROBATCH_MAX_ROWS', 64))
+
+
+class _Pending:
+    __slots__ = ('model', 'model_type', 'patient_data', 'done', 'result', 'error')
+
+    def __init__(self, model, model_type, patient_data):
+        self.model = model
+        self.model_type = model_type
+        self.patient_data = patient_data
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+
+
+class MicroBatcher:
+    """Collects concurrent predict_patient calls of one process into vectorized batches"""
+
+    def __init__(self, window_ms=MICROBATCH_WINDOW_MS, max_rows=MICROBATCH_MAX_ROWS):
+        self.window = window_ms / 1000.0
+        self.max_rows = max(1, max_rows)
+        self.batches = 0
+        self.rows = 0
+        self.largest = 0
+        self._queue = []
+        self._cond = threading.Condition()
+        self._pid = None
+
+    def predict_patient(self, model, model_type, patient_data):
+        """Drop-in for inference.predict_patient; blocks until the batch holding this row is scored"""
+        self._ensure_dispatcher()
+        pending = _Pending(model, model_type, patient_data)
+        with self._cond:
+            self._queue.append(pending)
+            self._cond.notify()
+        pending.done.wait()
+        if pending.error is not None:
+            raise pending.error
+        return pending.result
+
+    def _ensure_dispatcher(self):
+        # Threads do not survive a fork, so each gunicorn worker starts its own
+        if self._pid == os.getpid():
+            return
+        with self._cond:
+            if self._pid == os.getpid():
+                return
+            self._pid = os.getpid()
+            self._queue = []
+            threading.Thread(target=self._dispatch, name='microbatch', daemon=True).start()
+
+    def _next_batch(self):
+        with self._cond:
+            while not self._queue:
+                self._cond.wait()
+            deadline = time.monotonic() + self.window
+            while len(self._queue) < self.max_rows:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                self._cond.wait(remaining)
+            batch = self._queue[:self.max_rows]
+            del self._queue[:self.max_rows]
+            return batch
+
+    def _dispatch(self):
+        while True:
+            batch = self._next_batch()
+            # A model swap inside the window splits the batch per model
+            groups = {}
+            for pending in batch:
+                groups.setdefault(id(pending.model), []).append(pending)
+            for group in groups.values():
+                self._score(group)
+
+    def _score(self, group):
+        first = group[0]
+        try:
+            results = predict_patients(first.model, first.model_type, [p.patient_data for p in group])
+        except Exception as e:
+            for pending in group:
+                pending.error = e
+        else:
+            for pending, result in zip(group, results):
+                pending.result = result
+        self.batches += 1
+        self.rows += len(group)
+        self.largest = max(self.largest, len(group))
+        metrics_registry.inc('heart_microbatch_batches_total')
+        metrics_registry.inc('heart_microbatch_rows_total', len(group))
+        for pending in group:
+            pending.done.set()
+
+    def stats(self):
+        return {
+            'window_ms': self.window * 1000.0,
+            'max_rows': self.max_rows,
+            'batches': self.batches,
+            'rows': self.rows,
+            'mean_rows': round(self.rows / self.batches, 2) if self.batches else 0.0,
+            'largest': self.largest,
+        }
@@ -0,0 +1,311 @@
+#!/usr/bin/env python3
+"""
+Versioned model registry with background reload and atomic swap.
+
+The served model lives behind a single ServedModel reference. A reload
+loads and warms the replacement on a background thread, checks it on the
+golden patients, and only then replaces the reference, so requests never
+see a half-loaded model or fall back to the rule-based scorer mid-reload.
+Every process polls the watched files (model manifest, artifacts, reload
+trigger), so a manifest update or a `touch` reaches all gunicorn workers.
+
+Publish a new model version (workers pick it up on their next poll):
+    python model_registry.py publish heart_disease_pipeline.pkl --version 2024-06-01
+"""
+import argparse
+import json
+import os
+import sys
+import threading
+import time
+
+from inference import predict_patient
+
+# Patients scored on every load: a high-risk and a low-risk profile
+GOLDEN_PATIENTS = [
+    {
+        'State_Name': 'Delhi',
+        'Age': 45,
+        'Gender': 'Male',
+        'Diabetes': 1,
+        'Hypertension': 1,
+        'Obesity': 1,
+        'Smoking': 1,
+        'Alcohol_Consumption': 0,
+        'Physical_Activity': 1,
+        'Diet_Score': 3,
+        'Cholesterol_Level': 280,
+        'Triglyceride_Level': 220,
+        'LDL_Level': 160,
+        'HDL_Level': 35,
+        'Systolic_BP': 160,
+        'Diastolic_BP': 100,
+        'Air_Pollution_Exposure': 1,
+        'Family_History': 1,
+        'Stress_Level': 8,
+        'Healthcare_Access': 1,
+        'Heart_Attack_History': 0,
+        'Emergency_Response_Time': 250,
+        'Annual_Income': 400000,
+        'Health_Insurance': 0
+    },
+    {
+        'State_Name': 'Tamil Nadu',
+        'Age': 28,
+        'Gender': 'Female',
+        'Diabetes': 0,
+        'Hypertension': 0,
+        'Obesity': 0,
+        'Smoking': 0,
+        'Alcohol_Consumption': 0,
+        'Physical_Activity': 3,
+        'Diet_Score': 8,
+        'Cholesterol_Level': 170,
+        'Triglyceride_Level': 120,
+        'LDL_Level': 90,
+        'HDL_Level': 60,
+        'Systolic_BP': 115,
+        'Diastolic_BP': 75,
+        'Air_Pollution_Exposure': 0,
+        'Family_History': 0,
+        'Stress_Level': 3,
+        'Healthcare_Access': 1,
+        'Heart_Attack_History': 0,
+        'Emergency_Response_Time': 120,
+        'Annual_Income': 900000,
+        'Health_Insurance': 1
+    },
+]
+
+# Largest accepted difference from the probabilities recorded in the manifest
+GOLDEN_ATOL = 1e-6
+
+# Written next to an artifact derived from a pickled model (compiled scorer, flat
+# forest): the path and SHA-256 of the pickle it was built from
+SOURCE_SUFFIX = '.source.json'
+
+
+def model_type_for(path):
+    return "simple" if 'simple' in os.path.basename(path) else "complex"
+
+
+def load_artifact(path, mmap=False):
+    """
+    Load a model artifact: *.compact.npz is a compact_model.py artifact, other
+    .npz files hold a FlatForest, anything else is a joblib pickle
+    """
+    if path.endswith('.compact.npz'):
+        # Rebuilt in memory on load, so mmap does not apply
+        from compact_model import load_compact
+        return load_compact(path)
+    if path.endswith('.npz'):
+        from flat_forest import FlatForest
+        return FlatForest.load(path, mmap=mmap)
+    import joblib
+    return joblib.load(path, mmap_mode='r' if mmap else None)
+
+
+def record_source(artifact_path, source_path):
+    """Record that artifact_path was built from the model file at source_path"""
+    from data_cache import file_hash
+    with open(artifact_path + SOURCE_SUFFIX, 'w') as f:
+        json.dump({'source': os.path.abspath(source_path), 'sha256': file_hash(source_path)}, f, indent=2)
+
+
+def built_from(artifact_path, source_path):
+    """True if artifact_path is recorded as built from the current contents of source_path"""
+    try:
+        with open(artifact_path + SOURCE_SUFFIX) as f:
+            recorded = json.load(f)
+    except (OSError, ValueError):
+        return False
+    from data_cache import file_hash
+    return recorded.get('sha256') == file_hash(source_path)
+
+
+def validate_model(model, model_type, expected=None):
+    """
+    Score GOLDEN_PATIENTS and return their probabilities.
+    Raises ValueError if a probability is outside [0, 1] or, when expected
+    probabilities are given, differs from them by more than GOLDEN_ATOL.
+    """
+    probabilities = []
+    for patient in GOLDEN_PATIENTS:
+        prob, _, _ = predict_patient(model, model_type, patient)
+        if not 0.0 <= prob <= 1.0:
+            raise ValueError(f"Golden patient scored {prob}, outside [0, 1]")
+        probabilities.append(prob)
+    if expected is not None:
+        if len(expected) != len(probabilities) or any(
+                abs(got - want) > GOLDEN_ATOL for got, want in zip(probabilities, expected)):
+            raise ValueError(f"Golden sample mismatch: expected {expected}, got {probabilities}")
+    return probabilities
+
+
+def file_state(paths):
+    """(path, mtime_ns, size) per path; missing files are recorded as (path, None, None)"""
+    state = []
+    for path in paths:
+        try:
+            stat = os.stat(path)
+            state.append((path, stat.st_mtime_ns, stat.st_size))
+        except OSError:
+            state.append((path, None, None))
+    return tuple(state)
+
+
+class ServedModel:
+    """A loaded, validated model together with the metadata served alongside it"""
+
+    def __init__(self, model, model_type, version=None, path=None):
+        self.model = model
+        self.model_type = model_type
+        self.version = version
+        self.path = path
+        self.loaded_at = time.time()
+
+
+class ModelRegistry:
+    """
+    Holds the current ServedModel and replaces it without blocking readers.
+    loader() returns a ready ServedModel or raises; watch_paths() lists the
+    files whose changes trigger a reload; on_swap() is called after every
+    swap (e.g. to drop predictions cached for the previous model). Readers
+    take `registry.current` once per request and use that snapshot throughout.
+    """
+
+    def __init__(self, loader, watch_paths=None, poll_interval=2.0, on_swap=None):
+        self._loader = loader
+        self._watch_paths = watch_paths or (lambda: [])
+        self._on_swap = on_swap
+        self.poll_interval = poll_interval
+        self._current = None
+        self._lock = threading.Lock()
+        self._reload_thread = None
+        self._watch_pid = None
+        self._watch_state = None
+        self.generation = 0
+        self.last_reload = {'status': 'never'}
+
+    @property
+    def current(self):
+        return self._current
+
+    def swap(self, served):
+        """Publish served (None selects the rule-based scorer) as the current model"""
+        with self._lock:
+            self._current = served
+            self.generation += 1
+        if self._on_swap is not None:
+            self._on_swap()
+
+    def load_now(self, reason='manual'):
+        """Load and swap synchronously; on failure the current model keeps serving"""
+        started = time.perf_counter()
+        # Recorded before loading: a change made during the load triggers another reload
+        self._watch_state = file_state(self._watch_paths())
+        try:
+            served = self._loader()
+        except Exception as e:
+            self.last_reload = {'status': 'failed', 'reason': reason, 'error': str(e),
+                                'finished_at': time.time()}
+            if self._current is None:
+                print(f"⚠️  No model loaded ({e}), using rule-based prediction")
+            else:
+                print(f"❌ Model reload ({reason}) failed, still serving {self._current.version}: {e}")
+            return False
+        self.swap(served)
+        self.last_reload = {'status': 'ok', 'reason': reason, 'version': served.version,
+                            'duration_ms': round((time.perf_counter() - started) * 1000, 1),
+                            'finished_at': time.time()}
+        return True
+
+    def reloading(self):
+        thread = self._reload_thread
+        return thread is not None and thread.is_alive()
+
+    def reload_async(self, reason='manual'):
+        """Start a background reload; returns False if one is already running"""
+        with self._lock:
+            if self.reloading():
+                return False
+            self._reload_thread = threading.Thread(target=self.load_now, args=(reason,),
+                                                   name='model-reload', daemon=True)
+            self._reload_thread.start()
+            return True
+
+    def wait(self, timeout=None):
+        """Block until a running reload finishes (used by tests and scripts)"""
+        thread = self._reload_thread
+        if thread is not None:
+            thread.join(timeout)
+
+    def ensure_watcher(self):
+        """Start this process's file watcher (each gunicorn worker runs its own)"""
+        if self.poll_interval <= 0 or self._watch_pid == os.getpid():
+            return
+        with self._lock:
+            if self._watch_pid == os.getpid():
+                return
+            self._watch_pid = os.getpid()
+            threading.Thread(target=self._watch, name='model-watch', daemon=True).start()
+
+    def _watch(self):
+        while True:
+            time.sleep(self.poll_interval)
+            try:
+                if file_state(self._watch_paths()) != self._watch_state:
+                    self.reload_async('file change')
+            except Exception as e:
+                print(f"❌ Model watcher error: {e}")
+
+    def status(self):
+        served = self._current
+        return {
+            'version': served.version if served else None,
+            'type': served.model_type if served else 'rule_based',
+            'path': served.path if served else None,
+            'loaded_at': served.loaded_at if served else None,
+            'generation': self.generation,
+            'reloading': self.reloading(),
+            'last_reload': dict(self.last_reload),
+        }
+
+
+def write_manifest(manifest_path, artifact_path, model_type, version, golden):
+    """Atomically write the manifest; artifact_path is stored relative to it"""
+    manifest_dir = os.path.dirname(os.path.abspath(manifest_path))
+    manifest = {
+        'path': os.path.relpath(os.path.abspath(artifact_path), manifest_dir),
+        'type': model_type,
+        'version': version,
+        'golden': golden,
+    }
+    os.makedirs(manifest_dir, exist_ok=True)
+    tmp_path = f"{manifest_path}.tmp"
+    with open(tmp_path, 'w') as f:
+        json.dump(manifest, f, indent=2)
+    os.replace(tmp_path, manifest_path)
+    return manifest
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Publish a model version to the serving manifest")
+    sub = parser.add_subparsers(dest='command', required=True)
+    publish = sub.add_parser('publish', help='validate an artifact and point the manifest at it')
+    publish.add_argument('artifact', help='model file (.pkl, .joblib or .npz)')
+    publish.add_argument('--version', help='version label (default: file modification time)')
+    publish.add_argument('--type', choices=['complex', 'simple'], help='model type (default: from file name)')
+    publish.add_argument('--manifest', default=os.environ.get('MODEL_MANIFEST', os.path.join('models', 'manifest.json')))
+    args = parser.parse_args(argv)
+
+    model_type = args.type or model_type_for(args.artifact)
+    version = args.version or time.strftime('%Y%m%d-%H%M%S', time.localtime(os.path.getmtime(args.artifact)))
+    golden = validate_model(load_artifact(args.artifact), model_type)
+    write_manifest(args.manifest, args.artifact, model_type, version, golden)
+    print(f"✅ Published {args.artifact} as version {version} ({model_type}) in {args.manifest}")
+    print(f"Golden probabilities: {[round(p, 4) for p in golden]}")
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,311 @@
+"""
+Typed patient record shared by the form, JSON and model-input paths.
+
+SCHEMA lists every model input column once, in the order the complex
+pipeline expects, with its /predict form field, kind, default and
+plausible range. A PatientRecord keeps one slot per column. It is parsed
+from the form or from a JSON object in one pass over the schema, checked
+against the ranges, and written straight into a preallocated NumPy row or
+batch matrix, or typed DataFrame columns, in model column order, so no
+per-request dict is built and no column can end up out of order. Batch API
+records and the chunks of score.py (through invalid_cells()) are checked
+against the same rules.
+
+A record also reads like the patient_data dicts it replaces (record['Age'],
+.get(), .items()), so the rule-based scorer, the prediction cache and the
+array-backed scorers take it unchanged.
+"""
+import math
+from functools import lru_cache
+from operator import attrgetter
+
+CATEGORY = 'category'  # Non-empty string (State_Name, Gender)
+INT = 'int'            # Whole number in [low, high]
+FLAG = 'flag'          # Checkbox on the form, 0/1 in JSON
+URBAN = 'urban'        # 'Urban' / 'Rural' select on the form, 1/0 in JSON
+
+
+class Field:
+    __slots__ = ('name', 'source', 'kind', 'default', 'low', 'high')
+
+    def __init__(self, name, source, kind, default, low=None, high=None):
+        self.name = name
+        self.source = source
+        self.kind = kind
+        self.default = default
+        if kind in (FLAG, URBAN):
+            low, high = 0, 1
+        self.low = low
+        self.high = high
+
+
+# Model column order; ranges are wide physiological limits, not the training data's span
+SCHEMA = (
+    Field('State_Name', 'state', CATEGORY, 'Delhi'),
+    Field('Age', 'age', INT, 45, 0, 120),
+    Field('Gender', 'gender', CATEGORY, 'Male'),
+    Field('Diabetes', 'diabetes', FLAG, 0),
+    Field('Hypertension', 'hypertension', FLAG, 0),
+    Field('Obesity', 'obesity', FLAG, 0),
+    Field('Smoking', 'smoking', FLAG, 0),
+    Field('Alcohol_Consumption', 'alcohol', FLAG, 0),
+    Field('Physical_Activity', 'physical_activity', INT, 2, 0, 10),
+    Field('Diet_Score', 'diet_score', INT, 5, 0, 10),
+    Field('Cholesterol_Level', 'cholesterol', INT, 200, 50, 1000),
+    Field('Triglyceride_Level', 'triglyceride', INT, 150, 10, 3000),
+    Field('LDL_Level', 'ldl', INT, 100, 10, 500),
+    Field('HDL_Level', 'hdl', INT, 50, 5, 200),
+    Field('Systolic_BP', 'systolic_bp', INT, 120, 50, 300),
+    Field('Diastolic_BP', 'diastolic_bp', INT, 80, 20, 200),
+    Field('Air_Pollution_Exposure', 'air_pollution', INT, 1, 0, 10),
+    Field('Family_History', 'family_history', FLAG, 0),
+    Field('Stress_Level', 'stress_level', INT, 5, 0, 10),
+    Field('Healthcare_Access', 'healthcare', URBAN, 1),
+    Field('Heart_Attack_History', 'heart_attack_history', FLAG, 0),
+    Field('Emergency_Response_Time', 'emergency_time', INT, 200, 0, 10000),
+    Field('Annual_Income', 'annual_income', INT, 500000, 0, 10**9),
+    Field('Health_Insurance', 'health_insurance', FLAG, 0),
+)
+FIELD_NAMES = tuple(field.name for field in SCHEMA)
+FIELDS = {field.name: field for field in SCHEMA}
+
+# Form-only state substitutions: Kerala is scored as Tamil Nadu
+STATE_ALIASES = {'Kerala': 'Tamil Nadu'}
+
+
+class RecordError(ValueError):
+    """Invalid patient input; .errors maps each bad field to what is wrong with it"""
+
+    def __init__(self, errors):
+        self.errors = errors
+        super().__init__('Invalid fields: ' + ', '.join(f'{name} ({problem})' for name, problem in errors.items()))
+
+
+def _check_range(field, value, errors):
+    if not field.low <= value <= field.high:
+        errors[field.name] = f'must be between {field.low} and {field.high}'
+
+
+def _form_value(field, form, errors):
+    raw = form.get(field.source)
+    if field.kind == FLAG:
+        return 1 if raw else 0
+    if field.kind == URBAN:
+        return 1 if (raw if raw is not None else 'Urban') == 'Urban' else 0
+    if field.kind == CATEGORY:
+        value = raw if raw is not None else field.default
+        if not value:
+            errors[field.name] = 'must be a non-empty string'
+        if field.name == 'State_Name':
+            value = STATE_ALIASES.get(value, value)
+        return value
+    if raw is None:
+        return field.default
+    try:
+        value = int(raw)
+    except (TypeError, ValueError):
+        errors[field.name] = 'not a whole number'
+        return field.default
+    _check_range(field, value, errors)
+    return value
+
+
+def _json_value(field, value, errors):
+    if value is None:
+        errors[field.name] = 'missing'
+        return field.default
+    if field.kind == CATEGORY:
+        if not isinstance(value, str) or not value:
+            errors[field.name] = 'must be a non-empty string'
+        return value
+    if isinstance(value, str):
+        try:
+            value = float(value)
+        except ValueError:
+            errors[field.name] = 'not a number'
+            return field.default
+    if not isinstance(value, (int, float)) or not math.isfinite(value):
+        errors[field.name] = 'not a number'
+        return field.default
+    if isinstance(value, float) and value.is_integer():
+        value = int(value)
+    _check_range(field, value, errors)
+    return value
+
+
+@lru_cache(maxsize=None)
+def _getter(columns):
+    """Compiled attrgetter returning the values of columns as a tuple"""
+    get = attrgetter(*columns)
+    return (lambda record: (get(record),)) if len(columns) == 1 else get
+
+
+@lru_cache(maxsize=None)
+def _column_index(columns):
+    import pandas as pd
+    return pd.Index(columns)
+
+
+class PatientRecord:
+    """One patient's model inputs, one slot per SCHEMA column"""
+
+    __slots__ = FIELD_NAMES
+
+    def __init__(self, *values):
+        if len(values) != len(FIELD_NAMES):
+            raise TypeError(f'PatientRecord takes {len(FIELD_NAMES)} values, got {len(values)}')
+        for name, value in zip(FIELD_NAMES, values):
+            setattr(self, name, value)
+
+    @classmethod
+    def from_form(cls, form):
+        """Parse the /predict form (unchecked boxes absent, missing fields defaulted); raises RecordError"""
+        errors = {}
+        record = cls(*[_form_value(field, form, errors) for field in SCHEMA])
+        if errors:
+            raise RecordError(errors)
+        return record
+
+    @classmethod
+    def from_json(cls, data):
+        """Parse a JSON object keyed by column name; every field is required. Raises RecordError"""
+        if not isinstance(data, dict):
+            raise RecordError({'record': 'must be a JSON object'})
+        errors = {}
+        values = []
+        for field in SCHEMA:
+            value = data.get(field.name)
+            # Well-formed values (an in-range int, a non-empty string) skip the full checks
+            if type(value) is int and field.low is not None and field.low <= value <= field.high:
+                values.append(value)
+            elif type(value) is str and value and field.kind == CATEGORY:
+                values.append(value)
+            else:
+                values.append(_json_value(field, value, errors))
+        record = cls(*values)
+        if errors:
+            raise RecordError(errors)
+        return record
+
+    # Read-only mapping interface of the patient_data dicts
+    def __getitem__(self, name):
+        if name not in FIELDS:
+            raise KeyError(name)
+        return getattr(self, name)
+
+    def get(self, name, default=None):
+        return getattr(self, name) if name in FIELDS else default
+
+    def __contains__(self, name):
+        return name in FIELDS
+
+    def __iter__(self):
+        return iter(FIELD_NAMES)
+
+    def __len__(self):
+        return len(FIELD_NAMES)
+
+    def keys(self):
+        return FIELD_NAMES
+
+    def values(self):
+        return _getter(FIELD_NAMES)(self)
+
+    def items(self):
+        return zip(FIELD_NAMES, self.values())
+
+    def to_dict(self):
+        return dict(self.items())
+
+    def __eq__(self, other):
+        if not isinstance(other, PatientRecord):
+            return NotImplemented
+        return self.values() == other.values()
+
+    def __repr__(self):
+        return f"PatientRecord({', '.join(f'{name}={value!r}' for name, value in self.items())})"
+
+    def to_row(self, columns=FIELD_NAMES, out=None):
+        """Numeric columns as a float64 (1, len(columns)) row, written into out when given"""
+        import numpy as np
+        if out is None:
+            out = np.empty((1, len(columns)), dtype=np.float64)
+        out[0] = _getter(tuple(columns))(self)
+        return out
+
+    def to_frame(self, columns=FIELD_NAMES, **extra):
+        """One-row DataFrame in columns order; extra supplies or overrides column values"""
+        return records_to_frame([self], columns, **extra)
+
+
+def _values(record, columns):
+    if isinstance(record, PatientRecord):
+        return _getter(columns)(record)
+    return [record.get(col) for col in columns]
+
+
+def records_to_matrix(records, columns, out=None):
+    """Numeric columns of records (PatientRecords or dicts) as a float64 matrix, written into out when given"""
+    import numpy as np
+    columns = tuple(columns)
+    if out is None:
+        out = np.empty((len(records), len(columns)), dtype=np.float64)
+    for i, record in enumerate(records):
+        out[i] = _values(record, columns)
+    return out
+
+
+def invalid_cells(frame, required, optional=()):
+    """
+    from_json's checks in column form, for frames read from CSV or NDJSON:
+    maps each required column, and each optional one present in frame, to a
+    boolean array marking the rows whose value from_json would reject. An
+    optional column may be missing (NaN) but not out of range. Numeric
+    columns are coerced in place (pd.to_numeric), so the frame can be scored
+    afterwards.
+    """
+    import numpy as np
+    import pandas as pd
+    invalid = {}
+    for col in list(required) + [col for col in optional if col in frame.columns]:
+        field = FIELDS[col]
+        if field.kind == CATEGORY:
+            invalid[col] = ~frame[col].map(lambda v: isinstance(v, str) and v != '').to_numpy(dtype=bool)
+            continue
+        frame[col] = pd.to_numeric(frame[col], errors='coerce')
+        values = frame[col].to_numpy(dtype=np.float64)
+        with np.errstate(invalid='ignore'):
+            bad = ~((values >= field.low) & (values <= field.high))
+        if col in optional:
+            bad &= ~np.isnan(values)
+        invalid[col] = bad
+    return invalid
+
+
+def _column(name, values):
+    """One frame column: object for the categories, int64 or float64 as the values need otherwise"""
+    import numpy as np
+    field = FIELDS.get(name)
+    if field is not None and field.kind == CATEGORY:
+        return np.array(values, dtype=object)
+    column = np.array(values)
+    if column.dtype.kind not in 'biuf':
+        column = np.array(values, dtype=np.float64)  # Missing (None) values of dict records become NaN
+    return column
+
+
+def records_to_frame(records, columns=FIELD_NAMES, **extra):
+    """
+    DataFrame of records (PatientRecords or dicts) in columns order with
+    typed columns, as read_csv gives them, built column by column rather
+    than from per-row dicts
+    """
+    import pandas as pd
+    columns = tuple(columns)
+    if extra:
+        rows = [[extra[col] if col in extra else record[col] for col in columns] for record in records]
+    else:
+        rows = [_values(record, columns) for record in records]
+    by_column = zip(*rows) if rows else [()] * len(columns)
+    data = {col: _column(col, values) for col, values in zip(columns, by_column)}
+    return pd.DataFrame(data, columns=_column_index(columns), copy=False)
@@ -0,0 +1,86 @@
+"""
+Bounded in-process LRU cache for single-patient predictions.
+
+Keys are a canonical hash of the patient_data dict plus the fingerprint
+of the model that produced the value, so a reloaded model never serves
+a stale entry even before the cache is cleared.
+"""
+import hashlib
+import json
+import os
+import threading
+import time
+from collections import OrderedDict
+
+
+def model_fingerprint(path):
+    """Cheap identity of a model artifact: resolved path, size and mtime"""
+    stat = os.stat(path)
+    raw = f"{os.path.abspath(path)}:{stat.st_size}:{stat.st_mtime_ns}"
+    return hashlib.blake2b(raw.encode(), digest_size=8).hexdigest()
+
+
+def cache_key(patient_data, fingerprint):
+    """Canonical hash of patient_data (key order and int/float spelling do not matter)"""
+    canonical = {}
+    for name, value in patient_data.items():
+        if isinstance(value, float) and value.is_integer():
+            value = int(value)
+        canonical[name] = value
+    payload = json.dumps(canonical, sort_keys=True, separators=(',', ':'), default=str)
+    return hashlib.blake2b(f"{fingerprint}|{payload}".encode(), digest_size=16).hexdigest()
+
+
+class PredictionCache:
+    """Thread-safe LRU cache with an optional per-entry TTL (seconds)"""
+
+    def __init__(self, max_size=1024, ttl=None):
+        self.max_size = max_size
+        self.ttl = ttl or None
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                value, expires = entry
+                if expires is None or expires > time.monotonic():
+                    self._entries.move_to_end(key)
+                    self.hits += 1
+                    return value
+                del self._entries[key]
+                self.evictions += 1
+            self.misses += 1
+            return None
+
+    def put(self, key, value):
+        if self.max_size <= 0:
+            return
+        expires = time.monotonic() + self.ttl if self.ttl else None
+        with self._lock:
+            self._entries[key] = (value, expires)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'size': len(self._entries),
+                'max_size': self.max_size,
+                'ttl_seconds': self.ttl,
+                'hits': self.hits,
+                'misses': self.misses,
+                'evictions': self.evictions,
+                'hit_rate': round(self.hits / lookups, 4) if lookups else 0.0,
+            }
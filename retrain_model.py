@@ -1,7 +1,43 @@
 #!/usr/bin/env python3
 """
 Retrain the heart disease model with Railway-compatible versions
+
+Default mode fits LogisticRegression and a 200-tree RandomForest on one
+split and keeps the better one. --search instead runs a cross-validated
+successive-halving search over both model families and their
+hyperparameters, in parallel with joblib (--n-jobs), with the fitted
+ColumnTransformer cached by Pipeline(memory=...) so it is computed once
+per fold and sample size rather than once per candidate.
+
+Every full retrain also saves the training distribution of each feature
+(heart_disease_drift_baseline.json) for the drift monitor behind /drift.
+
+--incremental updates the saved model with only the rows appended to the
+CSV since the last run (tracked in heart_disease_train_state.json, with the
+byte length and SHA-256 of the CSV trained on so far: a file that was
+truncated or rewritten rather than appended to is refused). The
+fitted preprocessor is kept as is: a forest gets extra trees trained on
+the new rows (warm_start), a logistic regression is warm-started from its
+current coefficients. Fewer than --min-new-rows appended rows (default 50),
+or rows whose training or hold-out part would hold a single class, leave
+the model unchanged until more are appended.
+
+Usage:
+    python retrain_model.py
+    python retrain_model.py --search --n-jobs -1
+    python retrain_model.py --incremental
 """
+import argparse
+import hashlib
+import io
+import json
+import os
+import shutil
+import sys
+import tempfile
+import time
+from contextlib import contextmanager
+
 import pandas as pd
 import numpy as np
 from sklearn.model_selection import train_test_split
@@ -13,105 +49,31 @@ from sklearn.linear_model import LogisticRegression
 from sklearn.ensemble import RandomForestClassifier
 from sklearn.metrics import classification_report, roc_auc_score
 import joblib
-import sys
 
-print("🔬 Retraining Heart Disease Model...")
-print(f"Python version: {sys.version}")
-
-# Check versions
-try:
-    import sklearn
-    print(f"scikit-learn version: {sklearn.__version__}")
-except:
-    print("❌ scikit-learn not available")
-
-# Load dataset
-print("\n📊 Loading dataset...")
-df = pd.read_csv('heart.csv')
-print(f"Dataset shape: {df.shape}")
-print(f"Columns: {list(df.columns)}")
-
-# Prepare features
-X = df.drop(columns=['Patient_ID', 'Heart_Attack_Risk'])  # Exclude Patient_ID and target
-y = df['Heart_Attack_Risk']
-
-print(f"Features shape: {X.shape}")
-print(f"Target shape: {y.shape}")
-
-# Identify categorical vs numeric
-cat_cols = X.select_dtypes(include=['object']).columns.tolist()
-num_cols = X.select_dtypes(include=['int64','float64']).columns.tolist()
-
-print(f"Categorical columns: {cat_cols}")
-print(f"Numeric columns: {num_cols}")
-
-# Create pipelines
-numeric_transformer = Pipeline(steps=[
-    ('imputer', SimpleImputer(strategy='median')),
-    ('scaler', StandardScaler())
-])
-
-categorical_transformer = Pipeline(steps=[
-    ('imputer', SimpleImputer(strategy='most_frequent')),
-    ('onehot', OneHotEncoder(handle_unknown='ignore'))
-])
-
-preprocessor = ColumnTransformer(
-    transformers=[
-        ('num', numeric_transformer, num_cols),
-        ('cat', categorical_transformer, cat_cols)
-    ]
-)
-
-# Split data
-X_train, X_test, y_train, y_test = train_test_split(
-    X, y, test_size=0.2, random_state=42, stratify=y
-)
-
-print(f"Training set: {X_train.shape}")
-print(f"Test set: {X_test.shape}")
-
-# Train models
-print("\n🚀 Training models...")
-
-# Logistic Regression
-pipe_lr = Pipeline(steps=[('preprocessor', preprocessor),
-                          ('clf', LogisticRegression(max_iter=1000, class_weight='balanced'))])
-
-# Random Forest
-pipe_rf = Pipeline(steps=[('preprocessor', preprocessor),
-                          ('clf', RandomForestClassifier(n_estimators=200, class_weight='balanced', random_state=42))])
-
-models = {"LogisticRegression": pipe_lr, "RandomForest": pipe_rf}
-results = {}
-
-for name, model in models.items():
-    print(f"\n▶ Training {name}")
-    model.fit(X_train, y_train)
-    y_pred = model.predict(X_test)
-    y_prob = model.predict_proba(X_test)[:,1]
-    
-    print(f"ROC AUC: {roc_auc_score(y_test, y_prob):.4f}")
-    results[name] = (model, roc_auc_score(y_test, y_prob))
-
-# Select best model
-best_model_name = max(results.items(), key=lambda x: x[1][1])[0]
-best_model = results[best_model_name][0]
-best_score = results[best_model_name][1]
-
-print(f"\n✅ Best model: {best_model_name} (ROC AUC: {best_score:.4f})")
-
-# Save the model
-print("\n💾 Saving model...")
-joblib.dump(best_model, "heart_disease_pipeline.pkl")
-print("✅ Model saved as heart_disease_pipeline.pkl")
-
-# Test the saved model
-print("\n🧪 Testing saved model...")
-loaded_model = joblib.load("heart_disease_pipeline.pkl")
-
-# Create sample data for testing
-sample_data = {
+from data_cache import apply_schema, load_training_data
+
+# Candidate model families and hyperparameters for --search
+SEARCH_SPACE = [
+    {
+        'clf': [LogisticRegression(max_iter=1000, class_weight='balanced')],
+        'clf__C': [0.01, 0.1, 1.0, 10.0],
+    },
+    {
+        'clf': [RandomForestClassifier(class_weight='balanced', random_state=42)],
+        'clf__n_estimators': [100, 200],
+        'clf__max_depth': [None, 8, 16],
+        'clf__min_samples_leaf': [1, 5, 20],
+    },
+]
+
+# Rows consumed from the training CSV and by which model, written next to the model
+STATE_FILE = "heart_disease_train_state.json"
+
+# Fewest appended rows --incremental trains on; fewer are left for a later run
+MIN_INCREMENTAL_ROWS = 50
+
+# Patient used to smoke-test the saved model
+SAMPLE_DATA = {
     'State_Name': 'Delhi',
     'Age': 45,
     'Gender': 'Male',
@@ -138,22 +100,473 @@ sample_data = {
     'Health_Insurance': 1
 }
 
-sample_df = pd.DataFrame([sample_data])
-print(f"Sample data shape: {sample_df.shape}")
-
-try:
-    prediction = loaded_model.predict(sample_df)
-    probability = loaded_model.predict_proba(sample_df)
-    risk_score = probability[0][1] * 100
-    
-    print(f"✅ Test prediction successful!")
-    print(f"Prediction: {prediction[0]}")
-    print(f"Risk probability: {probability[0][1]:.4f}")
-    print(f"Risk score: {risk_score:.1f}%")
-    
-except Exception as e:
-    print(f"❌ Test prediction failed: {e}")
-    import traceback
-    traceback.print_exc()
-
-print("\n🏁 Model retraining completed!")
\ No newline at end of file
+
+class StageTimer:
+    """Collects wall-clock time per named stage"""
+
+    def __init__(self):
+        self.stages = []
+
+    @contextmanager
+    def stage(self, name):
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.stages.append((name, time.perf_counter() - started))
+
+    def report(self):
+        total = sum(seconds for _, seconds in self.stages)
+        print("\n⏱️  Timing breakdown:")
+        for name, seconds in self.stages:
+            print(f"  {name:<24} {seconds:8.2f}s  ({seconds / total:5.1%})")
+        print(f"  {'total':<24} {total:8.2f}s")
+
+
+def build_preprocessor(num_cols, cat_cols):
+    numeric_transformer = Pipeline(steps=[
+        ('imputer', SimpleImputer(strategy='median')),
+        ('scaler', StandardScaler())
+    ])
+
+    categorical_transformer = Pipeline(steps=[
+        ('imputer', SimpleImputer(strategy='most_frequent')),
+        ('onehot', OneHotEncoder(handle_unknown='ignore'))
+    ])
+
+    return ColumnTransformer(
+        transformers=[
+            ('num', numeric_transformer, num_cols),
+            ('cat', categorical_transformer, cat_cols)
+        ]
+    )
+
+
+def train_default(preprocessor, X_train, y_train, X_test, y_test, only=None):
+    """Fit the fixed pipelines (or just `only`) on the training split; returns (name, model, test ROC AUC)"""
+    # Logistic Regression
+    pipe_lr = Pipeline(steps=[('preprocessor', preprocessor),
+                              ('clf', LogisticRegression(max_iter=1000, class_weight='balanced'))])
+
+    # Random Forest
+    pipe_rf = Pipeline(steps=[('preprocessor', preprocessor),
+                              ('clf', RandomForestClassifier(n_estimators=200, class_weight='balanced', random_state=42))])
+
+    models = {"LogisticRegression": pipe_lr, "RandomForest": pipe_rf}
+    if only:
+        models = {only: models[only]}
+    results = {}
+
+    for name, model in models.items():
+        print(f"\n▶ Training {name}")
+        model.fit(X_train, y_train)
+        y_prob = model.predict_proba(X_test)[:, 1]
+
+        print(f"ROC AUC: {roc_auc_score(y_test, y_prob):.4f}")
+        results[name] = (model, roc_auc_score(y_test, y_prob))
+
+    # Select best model
+    best_model_name = max(results.items(), key=lambda x: x[1][1])[0]
+    return best_model_name, results[best_model_name][0], results[best_model_name][1]
+
+
+def train_search(preprocessor, X_train, y_train, n_jobs=-1, cv=5, factor=3,
+                 cache_dir=None, search_space=None):
+    """
+    Successive-halving grid search over SEARCH_SPACE.
+    Each round scores the surviving candidates on `factor` times more training
+    rows. Returns (name, refitted pipeline, the search object).
+    """
+    from sklearn.experimental import enable_halving_search_cv  # noqa: F401
+    from sklearn.model_selection import HalvingGridSearchCV, StratifiedKFold
+
+    pipeline = Pipeline(steps=[('preprocessor', preprocessor), ('clf', LogisticRegression())],
+                        memory=cache_dir)
+    search = HalvingGridSearchCV(
+        pipeline,
+        search_space or SEARCH_SPACE,
+        factor=factor,
+        cv=StratifiedKFold(n_splits=cv, shuffle=True, random_state=42),
+        scoring='roc_auc',
+        n_jobs=n_jobs,
+        random_state=42,
+        refit=True,
+    )
+    search.fit(X_train, y_train)
+
+    results = pd.DataFrame(search.cv_results_)
+    last_round = results[results['iter'] == results['iter'].max()]
+    print(f"\n🔎 Evaluated {len(results)} candidate fits over {search.n_iterations_} rounds "
+          f"(samples per round: {list(search.n_resources_)})")
+    print("Top candidates in the final round (mean CV ROC AUC):")
+    for _, row in last_round.sort_values('mean_test_score', ascending=False).head(5).iterrows():
+        params = {k.replace('clf__', ''): v for k, v in row['params'].items() if k != 'clf'}
+        print(f"  {row['mean_test_score']:.4f}  {type(row['params']['clf']).__name__} {params}")
+
+    best_model = search.best_estimator_
+    # The cache directory is temporary; the saved pipeline must not point at it
+    best_model.set_params(memory=None)
+    return type(best_model.named_steps['clf']).__name__, best_model, search
+
+
+def split_rows(X, y):
+    """The 80/20 split shared by all modes (stratified unless a class has fewer than two rows)"""
+    counts = y.value_counts()
+    stratify = y if len(counts) > 1 and counts.min() >= 2 else None
+    return train_test_split(X, y, test_size=0.2, random_state=42, stratify=stratify)
+
+
+def train_incremental(model, X_new, y_new, train_rows, X_old=None, y_old=None, add_trees=None,
+                      class_counts=None):
+    """
+    Update a fitted pipeline in place without refitting its preprocessor,
+    whose imputer medians, scaler statistics and categories define the
+    feature space the existing trees and coefficients were fitted in.
+
+    RandomForest: warm_start adds trees fitted on the new rows only, by
+    default in proportion to the new rows (add_trees = n_estimators *
+    new / train_rows) so every training row carries about the same weight.
+    class_weight='balanced' would be computed from the new rows alone, so
+    the class weights come from class_counts (all rows trained on so far).
+    LogisticRegression has no partial_fit; it is warm-started from its
+    coefficients and refitted on X_old plus the new rows, which is cheap.
+    Returns the number of trees added (0 for a linear model).
+    """
+    preprocessor = model.named_steps['preprocessor']
+    clf = model.named_steps['clf']
+    if y_new.nunique() < 2:
+        raise ValueError("New rows contain a single class; wait for more data or run a full retrain")
+
+    if isinstance(clf, RandomForestClassifier):
+        if add_trees is None:
+            add_trees = max(1, round(clf.n_estimators * len(X_new) / train_rows))
+        class_weight = clf.class_weight
+        if class_weight == 'balanced' and class_counts:
+            total = sum(class_counts.values())
+            clf.set_params(class_weight={label: total / (len(class_counts) * count)
+                                         for label, count in class_counts.items()})
+        clf.set_params(warm_start=True, n_estimators=clf.n_estimators + add_trees)
+        clf.fit(preprocessor.transform(X_new), y_new)
+        clf.set_params(warm_start=False, class_weight=class_weight)
+        return add_trees
+    if isinstance(clf, LogisticRegression):
+        if X_old is None:
+            raise ValueError("A logistic regression update needs the previously trained rows")
+        clf.set_params(warm_start=True)
+        clf.fit(preprocessor.transform(pd.concat([X_old, X_new])), pd.concat([y_old, y_new]))
+        clf.set_params(warm_start=False)
+        return 0
+    raise ValueError(f"Incremental update is not supported for {type(clf).__name__}")
+
+
+def read_state(output_dir):
+    path = os.path.join(output_dir, STATE_FILE)
+    try:
+        with open(path) as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return None
+
+
+def write_state(output_dir, state):
+    path = os.path.join(output_dir, STATE_FILE)
+    with open(f"{path}.tmp", 'w') as f:
+        json.dump(state, f, indent=2)
+    os.replace(f"{path}.tmp", path)
+
+
+def read_appended_csv(path, state):
+    """
+    Read the training CSV's bytes and check that the rows already trained on
+    are unchanged (only appended to). States written before the data hash
+    was recorded are checked by row count only.
+    """
+    with open(path, 'rb') as f:
+        content = f.read()
+    if 'data_sha256' in state:
+        trained = state['data_bytes']
+        if len(content) < trained or hashlib.sha256(content[:trained]).hexdigest() != state['data_sha256']:
+            raise SystemExit(f"❌ {path} was truncated or rewritten since the last run, not appended to; "
+                             "run a full retrain")
+    else:
+        rows = sum(1 for line in content.splitlines() if line.strip()) - 1
+        if rows < state['rows']:
+            raise SystemExit(f"❌ {path} has fewer rows than the {state['rows']:,} already trained on")
+    return content
+
+
+def smoke_test(model_path):
+    """Load the saved model and score SAMPLE_DATA"""
+    loaded_model = joblib.load(model_path)
+    sample_df = pd.DataFrame([SAMPLE_DATA])
+    print(f"Sample data shape: {sample_df.shape}")
+
+    try:
+        prediction = loaded_model.predict(sample_df)
+        probability = loaded_model.predict_proba(sample_df)
+        risk_score = probability[0][1] * 100
+
+        print(f"✅ Test prediction successful!")
+        print(f"Prediction: {prediction[0]}")
+        print(f"Risk probability: {probability[0][1]:.4f}")
+        print(f"Risk score: {risk_score:.1f}%")
+
+    except Exception as e:
+        print(f"❌ Test prediction failed: {e}")
+        import traceback
+        traceback.print_exc()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Retrain the heart disease model")
+    parser.add_argument('--data', default='heart.csv', help='training CSV')
+    parser.add_argument('--no-data-cache', action='store_true',
+                        help='parse the CSV instead of loading the typed columnar cache (data_cache.py)')
+    parser.add_argument('--output-dir', default='.', help='where the model files are written')
+    parser.add_argument('--search', action='store_true',
+                        help='cross-validated successive-halving search over model families')
+    parser.add_argument('--n-jobs', type=int, default=-1, help='parallel search jobs (-1 = all cores)')
+    parser.add_argument('--cv', type=int, default=5, help='cross-validation folds for --search')
+    parser.add_argument('--factor', type=int, default=3, help='successive-halving elimination factor')
+    parser.add_argument('--cache-dir', help='preprocessor cache for --search (default: temporary)')
+    parser.add_argument('--no-cache', action='store_true', help='do not cache the fitted preprocessor')
+    parser.add_argument('--model', choices=['LogisticRegression', 'RandomForest'],
+                        help='train only this model family (default: keep the better of both)')
+    parser.add_argument('--incremental', action='store_true',
+                        help='update the saved model with the rows appended since the last run')
+    parser.add_argument('--min-new-rows', type=int, default=MIN_INCREMENTAL_ROWS,
+                        help='--incremental leaves the model unchanged with fewer appended rows')
+    parser.add_argument('--add-trees', type=int,
+                        help='trees added by --incremental (default: proportional to the new rows)')
+    parser.add_argument('--compact', action='store_true',
+                        help='also write the forest as heart_disease_model.compact.npz (compact_model.py)')
+    parser.add_argument('--auc-budget', type=float,
+                        help='with --compact, keep the fewest trees within this ROC AUC of the full forest, '
+                             'measured on a validation slice of the training rows')
+    args = parser.parse_args(argv)
+
+    timer = StageTimer()
+    model_path = os.path.join(args.output_dir, "heart_disease_pipeline.pkl")
+    # The tree cap is chosen on validation rows carved from the training split, so
+    # the hold-out ROC AUC reported for the capped forest is not tuned on
+    tree_cap = args.compact and args.auc_budget is not None
+    X_val = y_val = None
+    print("🔬 Retraining Heart Disease Model...")
+    print(f"Python version: {sys.version}")
+
+    # Check versions
+    try:
+        import sklearn
+        print(f"scikit-learn version: {sklearn.__version__}")
+    except:
+        print("❌ scikit-learn not available")
+
+    if args.incremental:
+        state = read_state(args.output_dir)
+        if state is None or not os.path.exists(model_path):
+            raise SystemExit(f"❌ No {STATE_FILE} / saved model in {args.output_dir}; run a full retrain first")
+        with timer.stage('load model'):
+            best_model = joblib.load(model_path)
+        forest = isinstance(best_model.named_steps['clf'], RandomForestClassifier)
+
+        # A forest only needs the new rows; the CSV must only have been appended to
+        print(f"\n📊 Loading rows after the first {state['rows']:,} of {args.data}...")
+        with timer.stage('load data'):
+            content = read_appended_csv(args.data, state)
+            if forest and 'data_bytes' in state:
+                header = content[:content.index(b'\n') + 1]
+                df = apply_schema(pd.read_csv(io.BytesIO(header + content[state['data_bytes']:])))
+            elif forest:
+                df = apply_schema(pd.read_csv(io.BytesIO(content), skiprows=range(1, state['rows'] + 1)))
+            else:
+                df = load_training_data(args.data, use_cache=not args.no_data_cache)
+        new = df if forest else df.iloc[state['rows']:]
+        total_rows = state['rows'] + len(df) if forest else len(df)
+        if len(new) == 0:
+            print("✅ No new rows since the last run, model unchanged")
+            return {'mode': 'incremental', 'new_rows': 0, 'rows': total_rows}
+
+        def unchanged(reason):
+            # The state is not advanced, so these rows are picked up again next time
+            print(f"⚠️  {reason}; model unchanged, rerun once more rows are appended")
+            return {'mode': 'incremental', 'new_rows': len(new), 'rows': state['rows'], 'skipped': reason}
+
+        if len(new) < args.min_new_rows:
+            return unchanged(f"Only {len(new):,} new rows (--min-new-rows {args.min_new_rows})")
+        X_new = new.drop(columns=['Patient_ID', 'Heart_Attack_Risk'])
+        y_new = new['Heart_Attack_Risk']
+        X_train, X_test, y_train, y_test = split_rows(X_new, y_new)
+        if tree_cap:
+            X_train, X_val, y_train, y_val = split_rows(X_train, y_train)
+        if any(part.nunique() < 2 for part in (y_train, y_test, y_val) if part is not None):
+            return unchanged(f"The {len(new):,} new rows do not give the training and hold-out rows both classes")
+        X_old = y_old = None
+        if not forest:
+            old = df.iloc[:state['rows']]
+            X_old, y_old = old.drop(columns=['Patient_ID', 'Heart_Attack_Risk']), old['Heart_Attack_Risk']
+        print(f"New rows: {len(new):,} (training on {len(X_train):,}, holding out {len(X_test):,})")
+
+        if forest:
+            # The new trees are fitted on the new training rows only
+            class_counts = {int(label): count for label, count in state['class_counts'].items()}
+            fitted = y_train
+        else:
+            # The logistic regression is refitted on every older row, including the
+            # rows earlier runs held out, plus the new training rows
+            class_counts = {}
+            fitted = pd.concat([y_old, y_train])
+        for label, count in fitted.value_counts().items():
+            class_counts[int(label)] = class_counts.get(int(label), 0) + int(count)
+
+        print("\n🚀 Updating model...")
+        with timer.stage('incremental update'):
+            added = train_incremental(best_model, X_train, y_train, state['train_rows'],
+                                      X_old=X_old, y_old=y_old, add_trees=args.add_trees,
+                                      class_counts=class_counts)
+        best_model_name = type(best_model.named_steps['clf']).__name__
+        if added:
+            print(f"Added {added} trees ({best_model.named_steps['clf'].n_estimators} total)")
+        train_rows = state['train_rows'] + len(X_train) if forest else len(y_old) + len(X_train)
+        with timer.stage('hold-out evaluation'):
+            # Scored on the held-out new rows only: the model has seen every older row
+            best_score = roc_auc_score(y_test, best_model.predict_proba(X_test)[:, 1])
+        mode = 'incremental'
+    else:
+        # Load dataset
+        print("\n📊 Loading dataset...")
+        with timer.stage('load data'):
+            df = load_training_data(args.data, use_cache=not args.no_data_cache)
+            with open(args.data, 'rb') as f:
+                content = f.read()
+        print(f"Dataset shape: {df.shape}")
+        print(f"Columns: {list(df.columns)}")
+
+        # Prepare features
+        X = df.drop(columns=['Patient_ID', 'Heart_Attack_Risk'])  # Exclude Patient_ID and target
+        y = df['Heart_Attack_Risk']
+
+        print(f"Features shape: {X.shape}")
+        print(f"Target shape: {y.shape}")
+
+        # Identify categorical vs numeric
+        cat_cols = X.select_dtypes(include=['object', 'category']).columns.tolist()
+        num_cols = X.select_dtypes(include='number').columns.tolist()
+
+        print(f"Categorical columns: {cat_cols}")
+        print(f"Numeric columns: {num_cols}")
+
+        preprocessor = build_preprocessor(num_cols, cat_cols)
+
+        # Split data
+        X_train, X_test, y_train, y_test = split_rows(X, y)
+        if tree_cap:
+            X_train, X_val, y_train, y_val = split_rows(X_train, y_train)
+
+        print(f"Training set: {X_train.shape}")
+        print(f"Test set: {X_test.shape}")
+        if tree_cap:
+            print(f"Validation set (tree cap): {X_val.shape}")
+
+        if args.search:
+            cache_dir = None if args.no_cache else (args.cache_dir or tempfile.mkdtemp(prefix='heart-preproc-'))
+            print(f"\n🚀 Searching models (n_jobs={args.n_jobs}, {args.cv}-fold CV, factor {args.factor}, "
+                  f"preprocessor cache: {cache_dir or 'off'})...")
+            try:
+                with timer.stage('search (CV + refit)'):
+                    best_model_name, best_model, search = train_search(
+                        preprocessor, X_train, y_train, n_jobs=args.n_jobs, cv=args.cv,
+                        factor=args.factor, cache_dir=cache_dir)
+            finally:
+                if cache_dir and not args.cache_dir:
+                    shutil.rmtree(cache_dir, ignore_errors=True)
+            print(f"Best CV ROC AUC: {search.best_score_:.4f}")
+            with timer.stage('hold-out evaluation'):
+                best_score = roc_auc_score(y_test, best_model.predict_proba(X_test)[:, 1])
+            mode = 'search'
+        else:
+            # Train models
+            print("\n🚀 Training models...")
+            with timer.stage('train + evaluate'):
+                best_model_name, best_model, best_score = train_default(preprocessor, X_train, y_train, X_test, y_test,
+                                                                       only=args.model)
+            mode = 'default'
+        total_rows = len(df)
+        train_rows = len(X_train)
+        class_counts = {int(label): int(count) for label, count in y_train.value_counts().items()}
+
+    print(f"\n✅ Best model: {best_model_name} (ROC AUC: {best_score:.4f})")
+
+    # Save the model
+    print("\n💾 Saving model...")
+    with timer.stage('save'):
+        joblib.dump(best_model, model_path)
+        write_state(args.output_dir, {'data': os.path.abspath(args.data), 'rows': total_rows,
+                                      'data_bytes': len(content),
+                                      'data_sha256': hashlib.sha256(content).hexdigest(),
+                                      'train_rows': train_rows, 'class_counts': class_counts,
+                                      'model': best_model_name,
+                                      'mode': mode, 'trained_at': time.time()})
+    print(f"✅ Model saved as {model_path}")
+
+    # Training distribution for the serving drift monitor (/drift). An incremental
+    # update keeps the preprocessor and therefore the baseline of the full retrain.
+    if mode != 'incremental':
+        from drift_monitor import BASELINE_FILE, build_baseline, save_baseline
+        baseline_path = os.path.join(args.output_dir, BASELINE_FILE)
+        with timer.stage('save drift baseline'):
+            save_baseline(build_baseline(X_train), baseline_path)
+        print(f"✅ Drift baseline saved as {baseline_path}")
+
+    # Export the compiled fast-path scorer (SCORER_MODE=compiled in app.py)
+    print("\n⚡ Exporting compiled scorer...")
+    from compiled_scorer import CompiledScorer
+    from model_registry import record_source
+    compiled_path = os.path.join(args.output_dir, "heart_disease_compiled.joblib")
+    with timer.stage('export compiled scorer'):
+        compiled = CompiledScorer.from_pipeline(best_model, flatten_forest=True)
+        max_diff = np.abs(compiled.predict_proba(X_test)[:, 1] - best_model.predict_proba(X_test)[:, 1]).max()
+        compiled.save(compiled_path)
+        record_source(compiled_path, model_path)
+    print(f"Max probability difference vs pipeline: {max_diff:.2e}")
+    print(f"✅ Compiled scorer saved as {compiled_path}")
+
+    compact_path = os.path.join(args.output_dir, "heart_disease_model.compact.npz")
+    compact_written = False
+    if args.compact:
+        from compact_model import load_compact, save_compact, select_tree_count
+        from flat_forest import FlatForest
+        if not isinstance(compiled.classifier, FlatForest):
+            print(f"⚠️  Compact export skipped: {best_model_name} is not a forest")
+        else:
+            with timer.stage('export compact artifact'):
+                n_trees = None
+                if tree_cap:
+                    n_trees, auc, full_auc = select_tree_count(compiled, X_val, y_val, args.auc_budget)
+                    print(f"🌲 Keeping {n_trees}/{compiled.classifier.n_estimators} trees: validation ROC AUC "
+                          f"{auc:.4f} vs {full_auc:.4f} (budget {args.auc_budget})")
+                save_compact(compiled, compact_path, n_trees=n_trees)
+                compact_prob = load_compact(compact_path).predict_proba(X_test)[:, 1]
+                compact_diff = np.abs(compact_prob - best_model.predict_proba(X_test)[:, 1]).max()
+            compact_written = True
+            print(f"✅ Compact artifact saved as {compact_path} ({os.path.getsize(compact_path) / 1e6:.2f} MB, "
+                  f"pickle {os.path.getsize(model_path) / 1e6:.2f} MB, max probability difference {compact_diff:.2e}, "
+                  f"hold-out ROC AUC {roc_auc_score(y_test, compact_prob):.4f})")
+    # app.py serves the compact artifact before the pickle, so one left by an
+    # earlier run would keep the previous model in service
+    if not compact_written and os.path.exists(compact_path):
+        os.remove(compact_path)
+        print(f"🗑️  Removed stale {compact_path} (rerun with --compact to export the new model)")
+
+    # Test the saved model
+    print("\n🧪 Testing saved model...")
+    with timer.stage('smoke test'):
+        smoke_test(model_path)
+
+    timer.report()
+    print("\n🏁 Model retraining completed!")
+    return {'mode': mode, 'model': best_model_name, 'roc_auc': best_score, 'rows': total_rows,
+            'train_rows': train_rows, 'stages': dict(timer.stages)}
+
+
+if __name__ == '__main__':
+    main()
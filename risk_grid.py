@@ -0,0 +1,257 @@
+#!/usr/bin/env python3
+"""
+Precomputed risk lookup table for the simple 12-feature model.
+
+Every simple-model input comes from a bounded slider or checkbox on
+templates/predict.html, so the probabilities can be materialized offline
+over a quantized grid and served with an O(1) index lookup. The grid is
+stored as a float64 .npy file (memory-mapped at load time) with a JSON
+sidecar describing the axes. float64 keeps 'exact' answers identical to
+predict_proba: a float32 table moves probabilities by ~1e-8, enough to
+change int(p * 100) at a percent boundary (0.01 would score 0).
+
+Usage:
+    python risk_grid.py materialize --model simple_heart_model.pkl --out simple_heart_grid.npy
+    python risk_grid.py report --model simple_heart_model.pkl --grid simple_heart_grid.npy
+    (override an axis with --axis Age=25:95:10, repeatable)
+"""
+import argparse
+import json
+import os
+import sys
+import threading
+import time
+
+import numpy as np
+
+from inference import SIMPLE_FEATURES
+
+# (start, stop, step) per simple-model feature; grid points include stop.
+# Axes are aligned so the form defaults (age 45, diet 5, cholesterol 200,
+# BP 120/80, stress 5) land exactly on grid points.
+DEFAULT_AXES = {
+    'Age': (25, 95, 10),
+    'Diabetes': (0, 1, 1),
+    'Hypertension': (0, 1, 1),
+    'Obesity': (0, 1, 1),
+    'Smoking': (0, 1, 1),
+    'Physical_Activity': (0, 4, 1),
+    'Diet_Score': (1, 9, 2),
+    'Cholesterol_Level': (100, 400, 100),
+    'Systolic_BP': (80, 200, 20),
+    'Diastolic_BP': (60, 120, 20),
+    'Family_History': (0, 1, 1),
+    'Stress_Level': (1, 9, 2),
+}
+
+# Grid cells re-scored at load time to detect a table built from a different model
+N_PROBES = 32
+
+
+def spec_path_for(grid_path):
+    return os.path.splitext(grid_path)[0] + '.json'
+
+
+class RiskGrid:
+    """Memory-mapped probability table over a quantized simple-model input space"""
+
+    def __init__(self, table, starts, steps, counts, mode='exact'):
+        self.table = table
+        self.starts = np.asarray(starts, dtype=np.float64)
+        self.steps = np.asarray(steps, dtype=np.float64)
+        self.counts = np.asarray(counts, dtype=np.int64)
+        self.strides = np.array([int(np.prod(self.counts[i + 1:])) for i in range(len(self.counts))], dtype=np.int64)
+        self.mode = mode
+        self.probes = []
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+
+    @classmethod
+    def load(cls, path, mode='exact'):
+        with open(spec_path_for(path)) as f:
+            spec = json.load(f)
+        if spec['features'] != SIMPLE_FEATURES:
+            raise ValueError("Risk grid was built for a different feature order")
+        table = np.load(path, mmap_mode='r')
+        if mode == 'exact' and table.dtype != np.float64:
+            raise ValueError(f"{path} stores {table.dtype} probabilities; 'exact' mode needs a float64 "
+                             "table (run `python risk_grid.py materialize` again)")
+        grid = cls(table, spec['starts'], spec['steps'], spec['counts'], mode=mode)
+        grid.probes = spec.get('probes', [])
+        return grid
+
+    def verify(self, model):
+        """Check the table against the model on the stored probe cells"""
+        if not self.probes:
+            return True
+        cells = np.array([probe[0] for probe in self.probes], dtype=np.int64)
+        expected = np.array([probe[1] for probe in self.probes])
+        actual = model.predict_proba(self.cell_values(cells))[:, 1]
+        return bool(np.allclose(actual, expected, atol=1e-6))
+
+    def cell_values(self, cells):
+        """Feature matrix for an array of flat cell indices"""
+        idx = np.stack(np.unravel_index(cells, tuple(self.counts)), axis=1)
+        return self.starts + idx * self.steps
+
+    def lookup(self, values):
+        """
+        Probability for one row of simple-model feature values, or None.
+        In 'exact' mode only rows that sit on grid points are answered; in
+        'nearest' mode in-range rows are rounded to the closest grid point.
+        """
+        pos = (np.asarray(values, dtype=np.float64) - self.starts) / self.steps
+        idx = np.rint(pos)
+        if self.mode == 'exact':
+            on_grid = np.all(np.abs(pos - idx) < 1e-9)
+        else:
+            on_grid = True
+        if not on_grid or np.any(idx < 0) or np.any(idx >= self.counts):
+            with self._lock:
+                self.misses += 1
+            return None
+        with self._lock:
+            self.hits += 1
+        return float(self.table[int(idx.astype(np.int64) @ self.strides)])
+
+    def lookup_batch(self, X):
+        """Vectorized nearest-point lookup with clipping (used by the accuracy report)"""
+        idx = np.rint((np.asarray(X, dtype=np.float64) - self.starts) / self.steps)
+        idx = np.clip(idx, 0, self.counts - 1).astype(np.int64)
+        return np.asarray(self.table[idx @ self.strides], dtype=np.float64)
+
+
+class GridScorer:
+    """Serve simple-model predictions from a RiskGrid, falling back to the exact model"""
+
+    def __init__(self, model, grid):
+        self.model = model
+        self.grid = grid
+        self.classes_ = model.classes_
+
+    def predict_proba(self, X):
+        return self.model.predict_proba(X)
+
+    def predict(self, X):
+        return self.model.predict(X)
+
+    def predict_proba_record(self, patient_data):
+        values = [patient_data[col] for col in SIMPLE_FEATURES]
+        prob = self.grid.lookup(values)
+        if prob is None:
+            return self.model.predict_proba(np.array([values]))[0]
+        return np.array([1.0 - prob, prob])
+
+
+def parse_axes(overrides):
+    axes = dict(DEFAULT_AXES)
+    for override in overrides or []:
+        name, _, spec = override.partition('=')
+        if name not in axes:
+            raise SystemExit(f"Unknown feature '{name}'; expected one of {SIMPLE_FEATURES}")
+        start, stop, step = (float(part) for part in spec.split(':'))
+        axes[name] = (start, stop, step)
+    return axes
+
+
+def materialize(model, out_path, axes, chunk_size=262144):
+    """Score every grid cell and write the table plus its JSON sidecar"""
+    starts = [float(axes[col][0]) for col in SIMPLE_FEATURES]
+    steps = [float(axes[col][2]) for col in SIMPLE_FEATURES]
+    counts = [int(np.floor((axes[col][1] - axes[col][0]) / axes[col][2] + 1e-9)) + 1 for col in SIMPLE_FEATURES]
+    n_cells = int(np.prod(counts))
+    print(f"🧮 Materializing {n_cells:,} grid cells ({n_cells * 8 / 1e6:.1f} MB)...")
+
+    table = np.lib.format.open_memmap(out_path, mode='w+', dtype=np.float64, shape=(n_cells,))
+    grid = RiskGrid(table, starts, steps, counts)
+    start_time = time.perf_counter()
+    for start in range(0, n_cells, chunk_size):
+        cells = np.arange(start, min(start + chunk_size, n_cells), dtype=np.int64)
+        table[cells] = model.predict_proba(grid.cell_values(cells))[:, 1]
+        done = cells[-1] + 1
+        print(f"  {done:,}/{n_cells:,} cells ({done / (time.perf_counter() - start_time):,.0f} cells/s)")
+    table.flush()
+
+    rng = np.random.default_rng(0)
+    probe_cells = rng.integers(0, n_cells, min(N_PROBES, n_cells))
+    spec = {
+        'features': SIMPLE_FEATURES,
+        'starts': starts,
+        'steps': steps,
+        'counts': counts,
+        'probes': [[int(cell), float(table[cell])] for cell in probe_cells],
+    }
+    with open(spec_path_for(out_path), 'w') as f:
+        json.dump(spec, f, indent=2)
+    print(f"✅ Risk grid saved as {out_path} (+ {spec_path_for(out_path)})")
+
+
+def accuracy_report(model, grid, csv_path='heart.csv'):
+    """
+    Compare nearest-grid probabilities with the exact model on the held-out
+    split used by create_simple_model.py (test_size=0.2, random_state=42).
+    """
+    import pandas as pd
+    from sklearn.metrics import roc_auc_score
+    from sklearn.model_selection import train_test_split
+
+    df = pd.read_csv(csv_path)
+    _, X, _, y = train_test_split(df[SIMPLE_FEATURES].to_numpy(dtype=np.float64),
+                                  df['Heart_Attack_Risk'].to_numpy(),
+                                  test_size=0.2, random_state=42, stratify=df['Heart_Attack_Risk'])
+    exact = model.predict_proba(X)[:, 1]
+    approx = grid.lookup_batch(X)
+
+    def category(p):
+        return np.digitize(p, [0.33, 0.66])
+
+    abs_err = np.abs(approx - exact)
+    on_grid = np.all(np.abs((X - grid.starts) / grid.steps - np.rint((X - grid.starts) / grid.steps)) < 1e-9, axis=1)
+    report = {
+        'rows': len(X),
+        'rows_on_grid': int(on_grid.sum()),
+        'mean_abs_error': float(abs_err.mean()),
+        'p99_abs_error': float(np.percentile(abs_err, 99)),
+        'max_abs_error': float(abs_err.max()),
+        'risk_category_agreement': float((category(approx) == category(exact)).mean()),
+        'risk_score_agreement': float((np.floor(approx * 100) == np.floor(exact * 100)).mean()),
+        'roc_auc_exact': float(roc_auc_score(y, exact)),
+        'roc_auc_grid': float(roc_auc_score(y, approx)),
+    }
+    print("\n📊 Quantization accuracy report, held-out rows (nearest grid point vs exact model):")
+    for key, value in report.items():
+        print(f"  {key}: {value:.4f}" if isinstance(value, float) else f"  {key}: {value}")
+    return report
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Precompute the simple-model risk lookup table")
+    sub = parser.add_subparsers(dest='command', required=True)
+    for name in ('materialize', 'report'):
+        cmd = sub.add_parser(name)
+        cmd.add_argument('--model', default='simple_heart_model.pkl', help='simple model (.pkl or .npz)')
+        cmd.add_argument('--data', default='heart.csv', help='CSV used for the accuracy report')
+    sub.choices['materialize'].add_argument('--out', default='simple_heart_grid.npy')
+    sub.choices['materialize'].add_argument('--axis', action='append', help='FEATURE=START:STOP:STEP')
+    sub.choices['materialize'].add_argument('--chunk-size', type=int, default=262144)
+    sub.choices['report'].add_argument('--grid', default='simple_heart_grid.npy')
+    args = parser.parse_args(argv)
+
+    if args.model.endswith('.npz'):
+        from flat_forest import FlatForest
+        model = FlatForest.load(args.model)
+    else:
+        import joblib
+        model = joblib.load(args.model)
+
+    if args.command == 'materialize':
+        materialize(model, args.out, parse_axes(args.axis), chunk_size=args.chunk_size)
+        grid_path = args.out
+    else:
+        grid_path = args.grid
+    accuracy_report(model, RiskGrid.load(grid_path, mode='nearest'), csv_path=args.data)
+
+
+if __name__ == '__main__':
+    sys.exit(main())
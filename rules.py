@@ -0,0 +1,196 @@
+#!/usr/bin/env python3
+"""
+Rule-based heart disease risk scoring.
+
+calculate_rule_based_risk scores one patient_data dict and is the fallback
+when no model is loaded. calculate_rule_based_risk_batch applies the same
+rules to whole columns with masked arithmetic; it adds the terms in the
+same order as the scalar version, so the results are bit-for-bit equal.
+
+Baseline a CSV with the same columns as heart.csv:
+    python rules.py heart.csv
+"""
+import sys
+import time
+
+# Columns the rules read; the optional ones fall back to defaults that add nothing
+RULE_COLUMNS = ['Age', 'Diabetes', 'Hypertension', 'Obesity', 'Smoking', 'Physical_Activity',
+                'Systolic_BP', 'Diastolic_BP', 'Cholesterol_Level', 'Family_History',
+                'Stress_Level', 'Diet_Score']
+RULE_OPTIONAL_COLUMNS = ['Triglyceride_Level', 'HDL_Level']
+
+def calculate_rule_based_risk(patient_data):
+    """
+    Calculate heart disease risk using evidence-based clinical rules
+    Returns risk score between 0.0 and 1.0
+    """
+    risk_score = 0.0
+    
+    # Age factor (major risk factor)
+    age = patient_data['Age']
+    if age >= 65:
+        risk_score += 0.25
+    elif age >= 55:
+        risk_score += 0.15
+    elif age >= 45:
+        risk_score += 0.10
+    elif age >= 35:
+        risk_score += 0.05
+    
+    # Major medical conditions
+    if patient_data['Diabetes']:
+        risk_score += 0.20  # Diabetes is a major risk factor
+    if patient_data['Hypertension']:
+        risk_score += 0.15  # High blood pressure
+    if patient_data['Obesity']:
+        risk_score += 0.10  # Obesity
+    
+    # Lifestyle factors
+    if patient_data['Smoking']:
+        risk_score += 0.20  # Smoking is a major risk factor
+    if patient_data['Physical_Activity'] <= 1:
+        risk_score += 0.10  # Sedentary lifestyle
+    
+    # Blood pressure values
+    systolic = patient_data['Systolic_BP']
+    diastolic = patient_data['Diastolic_BP']
+    if systolic >= 140 or diastolic >= 90:
+        risk_score += 0.15  # Stage 1 hypertension or higher
+    elif systolic >= 130 or diastolic >= 80:
+        risk_score += 0.08  # Elevated blood pressure
+    
+    # Cholesterol levels
+    cholesterol = patient_data['Cholesterol_Level']
+    if cholesterol >= 240:
+        risk_score += 0.15  # High cholesterol
+    elif cholesterol >= 200:
+        risk_score += 0.08  # Borderline high
+    
+    # Family history
+    if patient_data['Family_History']:
+        risk_score += 0.12  # Genetic predisposition
+    
+    # Stress level
+    stress = patient_data['Stress_Level']
+    if stress >= 8:
+        risk_score += 0.08  # High stress
+    elif stress >= 6:
+        risk_score += 0.04  # Moderate stress
+    
+    # Diet score (lower is worse)
+    diet = patient_data['Diet_Score']
+    if diet <= 3:
+        risk_score += 0.08  # Poor diet
+    elif diet <= 5:
+        risk_score += 0.04  # Fair diet
+    
+    # Cap the risk score at 1.0 (100%)
+    risk_score = min(risk_score, 1.0)
+    
+    # Add some variance based on triglycerides and other factors
+    if patient_data.get('Triglyceride_Level', 150) >= 200:
+        risk_score += 0.05
+    
+    if patient_data.get('HDL_Level', 50) < 40:  # Low HDL (good cholesterol)
+        risk_score += 0.05
+    
+    # Ensure minimum risk for very young, healthy individuals
+    if age < 30 and risk_score < 0.05:
+        risk_score = max(risk_score, 0.05)
+    
+    # Final cap
+    return min(risk_score, 0.95)  # Max 95% risk
+
+
+def _has_column(data, name):
+    if hasattr(data, 'columns'):
+        return name in data.columns
+    names = getattr(getattr(data, 'dtype', None), 'names', None)
+    return name in (names if names is not None else data)
+
+
+def calculate_rule_based_risk_batch(data):
+    """
+    Vectorized calculate_rule_based_risk over a DataFrame, a structured NumPy
+    array or a dict of arrays with the heart.csv column names.
+    Returns a float64 array with one risk score per row.
+    """
+    import numpy as np
+
+    def column(name, default=None):
+        if default is not None and not _has_column(data, name):
+            return None
+        return np.asarray(data[name], dtype=np.float64)
+
+    age = column('Age')
+    risk = np.zeros(len(age))
+
+    # Age factor (major risk factor)
+    risk += np.select([age >= 65, age >= 55, age >= 45, age >= 35], [0.25, 0.15, 0.10, 0.05], 0.0)
+
+    # Major medical conditions
+    risk += np.where(column('Diabetes') != 0, 0.20, 0.0)
+    risk += np.where(column('Hypertension') != 0, 0.15, 0.0)
+    risk += np.where(column('Obesity') != 0, 0.10, 0.0)
+
+    # Lifestyle factors
+    risk += np.where(column('Smoking') != 0, 0.20, 0.0)
+    risk += np.where(column('Physical_Activity') <= 1, 0.10, 0.0)
+
+    # Blood pressure values
+    systolic = column('Systolic_BP')
+    diastolic = column('Diastolic_BP')
+    risk += np.select([(systolic >= 140) | (diastolic >= 90), (systolic >= 130) | (diastolic >= 80)],
+                      [0.15, 0.08], 0.0)
+
+    # Cholesterol levels
+    cholesterol = column('Cholesterol_Level')
+    risk += np.select([cholesterol >= 240, cholesterol >= 200], [0.15, 0.08], 0.0)
+
+    # Family history
+    risk += np.where(column('Family_History') != 0, 0.12, 0.0)
+
+    # Stress level
+    stress = column('Stress_Level')
+    risk += np.select([stress >= 8, stress >= 6], [0.08, 0.04], 0.0)
+
+    # Diet score (lower is worse)
+    diet = column('Diet_Score')
+    risk += np.select([diet <= 3, diet <= 5], [0.08, 0.04], 0.0)
+
+    # Cap the risk score at 1.0 (100%)
+    np.minimum(risk, 1.0, out=risk)
+
+    # Optional columns fall back to the scalar defaults (150 / 50), which add nothing
+    triglyceride = column('Triglyceride_Level', 150)
+    if triglyceride is not None:
+        risk += np.where(triglyceride >= 200, 0.05, 0.0)
+    hdl = column('HDL_Level', 50)
+    if hdl is not None:
+        risk += np.where(hdl < 40, 0.05, 0.0)
+
+    # Ensure minimum risk for very young, healthy individuals
+    risk[(age < 30) & (risk < 0.05)] = 0.05
+
+    # Final cap
+    return np.minimum(risk, 0.95)  # Max 95% risk
+
+
+def main(argv=None):
+    import pandas as pd
+
+    argv = sys.argv[1:] if argv is None else argv
+    csv_path = argv[0] if argv else 'heart.csv'
+    df = pd.read_csv(csv_path)
+    started = time.perf_counter()
+    risk = calculate_rule_based_risk_batch(df)
+    elapsed = time.perf_counter() - started
+    print(f"📏 Scored {len(risk):,} rows in {elapsed * 1000:.2f} ms ({len(risk) / elapsed:,.0f} rows/s)")
+    print(f"Mean risk: {risk.mean():.4f}")
+    if 'Heart_Attack_Risk' in df.columns:
+        from sklearn.metrics import roc_auc_score
+        print(f"ROC AUC vs Heart_Attack_Risk: {roc_auc_score(df['Heart_Attack_Risk'], risk):.4f}")
+
+
+if __name__ == '__main__':
+    sys.exit(main())
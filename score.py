@@ -0,0 +1,277 @@
+#!/usr/bin/env python3
+"""
+Stream a patient extract through the heart disease model in fixed-size chunks.
+
+Reads CSV or NDJSON (one JSON object per line) chunk by chunk, scores each
+chunk with one predict_proba call (or the vectorized rule-based scorer) and
+appends probability and risk_category to a CSV or Parquet output, so peak
+memory depends on --chunk-size, not on the size of the input. A JSON array
+(.json) cannot be read incrementally: it is loaded whole, then scored in
+chunks.
+
+With --workers N the chunks are scored in a pool of N processes, each of
+which loads the model once at start-up (--mmap shares array-backed
+artifacts between them); results are written back in input order and at
+most 2*N chunks are in flight.
+
+Usage:
+    python score.py patients.csv -o scored.csv
+    python score.py patients.ndjson -o scored.parquet --chunk-size 100000
+    python score.py patients.json -o scored.csv
+    python score.py patients.csv -o scored.csv --rules
+    python score.py patients.csv -o scored.csv --workers 0   # one worker per core
+"""
+import argparse
+import os
+import resource
+import sys
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+from inference import FEATURE_COLUMNS, SIMPLE_FEATURES, predict_proba_batch
+from model_registry import load_artifact, model_type_for
+from patient_record import invalid_cells
+from rules import RULE_COLUMNS, RULE_OPTIONAL_COLUMNS, calculate_rule_based_risk_batch
+
+
+def log(message):
+    # Progress goes to stderr so `-o -` can stream results to stdout
+    print(message, file=sys.stderr)
+
+
+def first_byte(path):
+    """First non-whitespace byte of the file at path (b'' if it is empty or unreadable)"""
+    try:
+        with open(path, 'rb') as f:
+            return f.read(4096).lstrip()[:1]
+    except OSError:
+        return b''
+
+
+def detect_format(path, explicit, choices):
+    if explicit:
+        return explicit
+    ext = os.path.splitext(path)[1].lower().lstrip('.')
+    aliases = {'jsonl': 'ndjson', 'pq': 'parquet'}
+    fmt = aliases.get(ext, ext)
+    if fmt == 'json' and 'json' in choices and first_byte(path) == b'{':
+        fmt = 'ndjson'  # A .json file of one object per line
+    return fmt if fmt in choices else choices[0]
+
+
+class Scorer:
+    """
+    Loaded model (or the rule-based scorer) plus the columns it needs.
+    With load=False only the column spec is set up (used by the parent
+    process when worker processes do the scoring).
+    """
+
+    def __init__(self, model_path=None, mmap=False, load=True):
+        self.model_path = model_path
+        if model_path is None:
+            self.model = None
+            self.model_type = 'rule_based'
+            self.required = list(RULE_COLUMNS)
+            self.optional = list(RULE_OPTIONAL_COLUMNS)
+        else:
+            self.model = load_artifact(model_path, mmap=mmap) if load else None
+            self.model_type = model_type_for(model_path)
+            self.required = list(SIMPLE_FEATURES if self.model_type == "simple" else FEATURE_COLUMNS)
+            self.optional = []
+
+    def predict(self, X):
+        if self.model is None:
+            return calculate_rule_based_risk_batch(X)
+        return predict_proba_batch(self.model, self.model_type, X)[:, 1]
+
+
+def score_chunk(chunk, scorer, keep_columns):
+    """
+    Validate and score one chunk. Rows PatientRecord.from_json would reject
+    (a missing, non-numeric or out-of-range required value, or an
+    out-of-range optional one), checked column by column with
+    invalid_cells(), are left unscored (empty probability and
+    risk_category), as in the batch API.
+    Returns (output DataFrame, number of invalid rows).
+    """
+    X = chunk.reindex(columns=scorer.required + [col for col in scorer.optional if col in chunk.columns])
+    invalid = invalid_cells(X, scorer.required, scorer.optional)
+    valid = ~np.logical_or.reduce(list(invalid.values()))
+
+    probability = np.full(len(X), np.nan)
+    if valid.any():
+        probability[valid] = scorer.predict(X[valid] if not valid.all() else X)
+    category = np.where(probability < 0.33, 'Low', np.where(probability < 0.66, 'Medium', 'High'))
+
+    out = chunk[keep_columns].reset_index(drop=True) if keep_columns else pd.DataFrame(index=range(len(X)))
+    out['probability'] = probability
+    out['risk_category'] = np.where(valid, category, None)
+    return out, int((~valid).sum())
+
+
+# Per-process scorer for pool workers, loaded once by the pool initializer
+_worker_scorer = None
+
+
+def _init_worker(model_path, mmap):
+    global _worker_scorer
+    _worker_scorer = Scorer(model_path, mmap=mmap)
+
+
+def _score_in_worker(chunk, keep_columns):
+    return score_chunk(chunk, _worker_scorer, keep_columns)
+
+
+def score_serial(chunks, scorer):
+    for chunk, keep in chunks:
+        yield score_chunk(chunk, scorer, keep)
+
+
+def score_parallel(chunks, model_path, mmap, workers):
+    """Score (chunk, keep) pairs in a process pool, yielding results in input order"""
+    pool = ProcessPoolExecutor(max_workers=workers, initializer=_init_worker, initargs=(model_path, mmap))
+    pending = deque()
+    try:
+        for chunk, keep in chunks:
+            pending.append(pool.submit(_score_in_worker, chunk, keep))
+            # Bound the chunks held in memory; the oldest result is written first
+            if len(pending) >= 2 * workers:
+                yield pending.popleft().result()
+        while pending:
+            yield pending.popleft().result()
+    finally:
+        pool.shutdown(wait=True, cancel_futures=True)
+
+
+def iter_chunks(path, input_format, chunk_size):
+    source = sys.stdin if path == '-' else path
+    if input_format == 'ndjson':
+        return pd.read_json(source, lines=True, chunksize=chunk_size, dtype=False)
+    if input_format == 'json':
+        frame = pd.read_json(source, orient='records', dtype=False)
+        return (frame.iloc[start:start + chunk_size] for start in range(0, len(frame), chunk_size))
+    return pd.read_csv(source, chunksize=chunk_size)
+
+
+class ChunkWriter:
+    """Append scored chunks to a CSV file or to row groups of a Parquet file"""
+
+    def __init__(self, path, output_format):
+        self.path = path
+        self.output_format = output_format
+        self._file = None
+        self._parquet = None
+
+    def write(self, frame):
+        if self.output_format == 'parquet':
+            try:
+                import pyarrow as pa
+                import pyarrow.parquet as pq
+            except ImportError:
+                raise SystemExit("❌ Parquet output needs pyarrow (pip install pyarrow)")
+            if self._parquet is None:
+                table = pa.Table.from_pandas(frame, preserve_index=False)
+                self._parquet = pq.ParquetWriter(self.path, table.schema)
+            else:
+                # Later chunks follow the first chunk's schema (an all-invalid chunk has no dtype to infer)
+                table = pa.Table.from_pandas(frame, schema=self._parquet.schema, preserve_index=False)
+            self._parquet.write_table(table)
+            return
+        header = self._file is None
+        if self._file is None:
+            self._file = sys.stdout if self.path == '-' else open(self.path, 'w', newline='')
+        frame.to_csv(self._file, header=header, index=False)
+
+    def close(self):
+        if self._parquet is not None:
+            self._parquet.close()
+        if self._file is not None and self._file is not sys.stdout:
+            self._file.close()
+
+
+def peak_rss_mb():
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def run(args):
+    input_format = detect_format(args.input, args.input_format, ['csv', 'ndjson', 'json'])
+    output_format = detect_format(args.output, args.output_format, ['csv', 'parquet'])
+    model_path = None if args.rules else args.model
+    workers = args.workers or os.cpu_count()
+    scorer = Scorer(model_path, mmap=args.mmap, load=workers == 1)
+    log(f"🔬 Scoring {args.input} ({input_format}) with {scorer.model_type} "
+        f"{'rules' if model_path is None else 'model from ' + model_path}, chunks of {args.chunk_size:,}, "
+        f"{workers} worker{'s' if workers > 1 else ''}")
+
+    def checked_chunks():
+        for i, chunk in enumerate(iter_chunks(args.input, input_format, args.chunk_size)):
+            if i == 0:
+                missing = [col for col in scorer.required if col not in chunk.columns]
+                if missing:
+                    raise SystemExit(f"❌ Input is missing required columns: {', '.join(missing)}")
+            yield chunk, [col for col in args.keep if col in chunk.columns]
+
+    if workers == 1:
+        results = score_serial(checked_chunks(), scorer)
+    else:
+        results = score_parallel(checked_chunks(), model_path, args.mmap, workers)
+
+    writer = ChunkWriter(args.output, output_format)
+    rows = invalid = 0
+    started = time.perf_counter()
+    try:
+        for out, bad in results:
+            writer.write(out)
+            rows += len(out)
+            invalid += bad
+            if args.progress:
+                elapsed = time.perf_counter() - started
+                log(f"  {rows:,} rows ({rows / elapsed:,.0f} rows/s, peak RSS {peak_rss_mb():.0f} MB)")
+    finally:
+        results.close()
+        writer.close()
+
+    elapsed = time.perf_counter() - started
+    report = {
+        'rows': rows,
+        'invalid_rows': invalid,
+        'seconds': elapsed,
+        'rows_per_second': rows / elapsed if elapsed > 0 else 0.0,
+        'workers': workers,
+        'peak_rss_mb': peak_rss_mb(),
+    }
+    log(f"✅ Scored {rows:,} rows ({invalid:,} invalid) in {elapsed:.2f}s: "
+        f"{report['rows_per_second']:,.0f} rows/s, peak RSS {report['peak_rss_mb']:.0f} MB -> {args.output}")
+    return report
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(description="Stream-score a patient CSV/NDJSON extract")
+    parser.add_argument('input', help="input CSV or NDJSON file ('-' for stdin)")
+    parser.add_argument('-o', '--output', default='-', help="output .csv or .parquet ('-' for stdout CSV)")
+    parser.add_argument('--model', default='heart_disease_pipeline.pkl',
+                        help='model artifact (.pkl pipeline, .joblib compiled scorer, .npz flat forest or .compact.npz)')
+    parser.add_argument('--rules', action='store_true', help='use the rule-based scorer instead of a model')
+    parser.add_argument('--chunk-size', type=int, default=50000, help='rows per chunk')
+    parser.add_argument('--input-format', choices=['csv', 'ndjson', 'json'],
+                        help='json = one JSON array (default: from the file extension)')
+    parser.add_argument('--output-format', choices=['csv', 'parquet'], help='default: from the file extension')
+    parser.add_argument('--keep', nargs='*', default=['Patient_ID'],
+                        help='input columns copied to the output (default: Patient_ID)')
+    parser.add_argument('--mmap', action='store_true', help='memory-map array-backed model artifacts')
+    parser.add_argument('--workers', type=int, default=1,
+                        help='scoring processes (default 1 = in-process, 0 = one per CPU core)')
+    parser.add_argument('--progress', action='store_true', help='log throughput after every chunk')
+    return parser
+
+
+def main(argv=None):
+    run(build_parser().parse_args(argv))
+
+
+if __name__ == '__main__':
+    sys.exit(main())
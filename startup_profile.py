@@ -0,0 +1,84 @@
+#!/usr/bin/env python3
+"""
+Startup profile for app.py, run as `python app.py --profile-startup`.
+
+Imports app in a fresh interpreter under `python -X importtime` and
+reports the slowest imports, the time to import app (model loading
+included) and the time to answer the first /health request, i.e. what a
+new worker pays before it can take traffic.
+"""
+import argparse
+import os
+import subprocess
+import sys
+
+APP_DIR = os.path.dirname(os.path.abspath(__file__))
+HEAVY_MODULES = ('numpy', 'pandas', 'joblib', 'sklearn', 'scipy')
+
+CHILD_SCRIPT = f"""
+import sys, time
+t0 = time.perf_counter()
+import app
+t1 = time.perf_counter()
+app.app.test_client().get('/health')
+t2 = time.perf_counter()
+heavy = ','.join(m for m in {HEAVY_MODULES!r} if m in sys.modules) or '-'
+print(f"STARTUP {{t1 - t0:.6f}} {{t2 - t1:.6f}} {{heavy}}")
+"""
+
+
+def parse_importtime(stderr):
+    """Return (module, self_us, cumulative_us) rows from -X importtime output"""
+    rows = []
+    for line in stderr.splitlines():
+        if not line.startswith('import time:'):
+            continue
+        parts = line[len('import time:'):].split('|')
+        if len(parts) != 3 or not parts[0].strip().isdigit():
+            continue
+        rows.append((parts[2].strip(), int(parts[0]), int(parts[1])))
+    return rows
+
+
+def run_once(importtime):
+    env = dict(os.environ)
+    env['PYTHONPATH'] = os.pathsep.join(p for p in (APP_DIR, env.get('PYTHONPATH')) if p)
+    cmd = [sys.executable] + (['-X', 'importtime'] if importtime else []) + ['-c', CHILD_SCRIPT]
+    proc = subprocess.run(cmd, capture_output=True, text=True, env=env)
+    for line in proc.stdout.splitlines():
+        if line.startswith('STARTUP '):
+            _, import_s, first_request_s, heavy = line.split()
+            return float(import_s), float(first_request_s), heavy, proc.stderr
+    raise RuntimeError(f"app failed to start:\n{proc.stderr[-2000:]}")
+
+
+def profile_startup(top=15, runs=3):
+    """Print an import-time report for app.py and return the timings"""
+    _, _, heavy, stderr = run_once(importtime=True)
+    # Timings come from separate runs without importtime, which adds its own overhead
+    timings = [run_once(importtime=False)[:2] for _ in range(runs)]
+    import_s = min(t[0] for t in timings)
+    first_request_s = min(t[1] for t in timings)
+
+    rows = sorted(parse_importtime(stderr), key=lambda row: row[2], reverse=True)
+    print(f"⏱️  Startup profile (cwd: {os.getcwd()}, best of {runs})")
+    print(f"  import app:        {import_s * 1000:8.1f} ms")
+    print(f"  first /health:     {first_request_s * 1000:8.1f} ms")
+    print(f"  time to first req: {(import_s + first_request_s) * 1000:8.1f} ms")
+    print(f"  heavy modules loaded: {heavy}")
+    print(f"\n  Slowest imports (cumulative, from -X importtime):")
+    for name, self_us, cumulative_us in rows[:top]:
+        print(f"  {cumulative_us / 1000:8.1f} ms  (self {self_us / 1000:6.1f} ms)  {name}")
+    return {'import_s': import_s, 'first_request_s': first_request_s, 'heavy_modules': heavy}
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Report app.py import time and time to first request")
+    parser.add_argument('--top', type=int, default=15, help='number of imports to list')
+    parser.add_argument('--runs', type=int, default=3, help='timed runs (best is reported)')
+    args = parser.parse_args(argv)
+    profile_startup(top=args.top, runs=args.runs)
+
+
+if __name__ == '__main__':
+    main()
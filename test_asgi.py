@@ -0,0 +1,100 @@
+#!/usr/bin/env python3
+"""
+Test the ASGI entry point against the Flask app it mirrors
+"""
+import asyncio
+import json
+import os
+import sys
+import urllib.parse
+sys.path.append(os.path.dirname(__file__))
+
+import numpy as np
+import pytest
+
+import app as app_module
+from asgi import HeartASGI
+from audit_log import AuditLog
+from model_registry import GOLDEN_PATIENTS, ServedModel
+
+
+class ConstantModel:
+    classes_ = np.array([0, 1])
+
+    def predict_proba(self, X):
+        return np.tile([0.25, 0.75], (len(X), 1))
+
+
+def call(asgi_app, method, path, body=b'', content_type=None):
+    """Run one request through the ASGI callable; returns (status, headers, body)"""
+    headers = [(b'content-type', content_type.encode())] if content_type else []
+    scope = {'type': 'http', 'method': method, 'path': path, 'headers': headers, 'query_string': b''}
+    messages = [{'type': 'http.request', 'body': body, 'more_body': False}]
+    sent = []
+
+    async def receive():
+        return messages.pop(0) if messages else {'type': 'http.disconnect'}
+
+    async def send(message):
+        sent.append(message)
+
+    asyncio.run(asgi_app(scope, receive, send))
+    start, response = sent
+    return start['status'], dict(start['headers']), response['body']
+
+
+@pytest.fixture(autouse=True)
+def no_audit_log(monkeypatch):
+    """AUDIT_LOG_PATH='': keep audited patient records out of the working directory"""
+    monkeypatch.setattr(app_module, 'audit_log', AuditLog(''))
+
+
+def test_pages_static_files_and_errors():
+    asgi_app = HeartASGI(executor_threads=2)
+    status, headers, body = call(asgi_app, 'GET', '/')
+    assert status == 200 and headers[b'content-type'].startswith(b'text/html')
+    assert b'/static/style.css' in body
+    status, headers, _ = call(asgi_app, 'GET', '/static/style.css')
+    assert status == 200 and headers[b'content-type'] == b'text/css'
+    assert call(asgi_app, 'GET', '/static/../app.py')[0] == 404
+    assert call(asgi_app, 'GET', '/nope')[0] == 404
+    assert call(asgi_app, 'GET', '/api/v1/predict/batch')[0] == 405
+
+
+def test_predict_form_with_model_and_rule_based_fallback():
+    asgi_app = HeartASGI(executor_threads=2)
+    app_module.prediction_cache.clear()
+    form = urllib.parse.urlencode({'age': '58', 'smoking': 'on', 'cholesterol': '260'}).encode()
+    served = app_module.model_registry.current
+    try:
+        app_module.model_registry.swap(ServedModel(ConstantModel(), "complex"))
+        status, _, body = call(asgi_app, 'POST', '/predict', form, 'application/x-www-form-urlencoded')
+        assert status == 200 and b'75' in body
+
+        app_module.model_registry.swap(None)
+        status, _, rules_body = call(asgi_app, 'POST', '/predict', form, 'application/x-www-form-urlencoded')
+        flask_body = app_module.app.test_client().post('/predict', data=form,
+                                                       content_type='application/x-www-form-urlencoded').data
+        assert status == 200 and rules_body == flask_body
+    finally:
+        app_module.model_registry.swap(served)
+
+
+def test_batch_api_matches_flask():
+    asgi_app = HeartASGI(executor_threads=2)
+    record = dict(GOLDEN_PATIENTS[1])
+    payload = json.dumps([record, {'Age': 'x'}, 'not an object']).encode()
+    served = app_module.model_registry.current
+    try:
+        app_module.model_registry.swap(ServedModel(ConstantModel(), "complex"))
+        status, _, body = call(asgi_app, 'POST', '/api/v1/predict/batch', payload, 'application/json')
+        flask_response = app_module.app.test_client().post('/api/v1/predict/batch', data=payload,
+                                                           content_type='application/json')
+        assert status == 200
+        assert json.loads(body) == flask_response.get_json()
+        assert json.loads(body)['errors'] == 2
+
+        status, _, body = call(asgi_app, 'POST', '/api/v1/predict/batch', b'{"not": "a list"}', 'application/json')
+        assert status == 400 and 'error' in json.loads(body)
+    finally:
+        app_module.model_registry.swap(served)
@@ -0,0 +1,114 @@
+#!/usr/bin/env python3
+"""
+Test the buffered prediction audit log and its use in /predict
+"""
+import json
+import os
+import sys
+import time
+sys.path.append(os.path.dirname(__file__))
+
+import numpy as np
+
+import app as app_module
+from audit_log import AuditLog
+from model_registry import GOLDEN_PATIENTS, ServedModel
+from patient_record import PatientRecord
+
+
+class ConstantModel:
+    classes_ = np.array([0, 1])
+
+    def predict_proba(self, X):
+        return np.tile([0.2, 0.8], (len(X), 1))
+
+
+def read_entries(path):
+    with open(path) as f:
+        return [json.loads(line) for line in f]
+
+
+def test_full_buffer_drops_by_policy(tmp_path):
+    for drop, kept in (('oldest', [2, 3, 4]), ('newest', [0, 1, 2])):
+        log = AuditLog(str(tmp_path / f'{drop}.jsonl'), capacity=3, flush_interval=60, batch_size=100, drop=drop)
+        log._writer_pid = os.getpid()  # No background writer: the buffer only fills
+        for i in range(5):
+            log.record(i=i)
+        assert log.stats()['dropped'] == 2
+        assert log.flush() == 3
+        assert [entry['i'] for entry in read_entries(log.path)] == kept
+
+
+def test_buffer_is_bounded_in_rows(tmp_path):
+    log = AuditLog(str(tmp_path / 'rows.jsonl'), capacity=10, flush_interval=60, batch_size=100)
+    log._writer_pid = os.getpid()
+    log.record(i=0)
+    log.record(i=1)
+    assert log.record(rows=9, i=2)  # A batch evicts the oldest rows until it fits
+    assert log.stats()['buffered'] == 10 and log.stats()['dropped'] == 1
+    assert log.record(rows=11, i=3) is False  # Larger than the whole buffer
+    assert log.stats()['buffered'] == 10 and log.stats()['dropped'] == 12
+    log.flush()
+    assert [(entry['i'], entry['rows']) for entry in read_entries(log.path)] == [(1, 1), (2, 9)]
+    assert log.stats()['written'] == 10
+
+    newest = AuditLog(str(tmp_path / 'newest.jsonl'), capacity=10, flush_interval=60, drop='newest')
+    newest._writer_pid = os.getpid()
+    assert newest.record(rows=9) and newest.record(rows=2) is False
+    assert newest.stats()['dropped'] == 2
+
+
+def test_flush_serialises_records_and_rotates(tmp_path):
+    path = str(tmp_path / 'audit.jsonl')
+    log = AuditLog(path, flush_interval=60, batch_size=100, max_bytes=2000, backups=2)
+    log._writer_pid = os.getpid()
+    record = PatientRecord.from_json(GOLDEN_PATIENTS[0])
+    log.record(inputs=record, probability=np.float64(0.25))
+    log.flush()
+    entry = read_entries(path)[0]
+    assert entry['inputs'] == GOLDEN_PATIENTS[0] and entry['probability'] == 0.25 and 'ts' in entry
+
+    for _ in range(10):
+        log.record(inputs=record)
+        log.flush()
+    assert os.path.exists(f'{path}.1') and os.path.exists(f'{path}.2')
+    assert not os.path.exists(f'{path}.3')
+    assert os.path.getsize(path) <= 2000
+    assert log.stats()['rotations'] >= 2
+
+
+def test_background_writer_and_close_flush(tmp_path):
+    path = str(tmp_path / 'audit.jsonl')
+    log = AuditLog(path, flush_interval=0.05, batch_size=1000)
+    log.record(n=1)
+    deadline = time.time() + 5
+    while not os.path.exists(path) and time.time() < deadline:
+        time.sleep(0.02)
+    assert [entry['n'] for entry in read_entries(path)] == [1]
+
+    log.flush_interval = 60
+    log.record(n=2)
+    log.close()
+    assert [entry['n'] for entry in read_entries(path)] == [1, 2]
+    assert log.record(n=3) is False
+
+
+def test_predict_and_batch_requests_are_audited(tmp_path, monkeypatch):
+    log = AuditLog(str(tmp_path / 'predictions.jsonl'), flush_interval=60, batch_size=1000)
+    monkeypatch.setattr(app_module, 'audit_log', log)
+    served = app_module.model_registry.current
+    app_module.prediction_cache.clear()
+    client = app_module.app.test_client()
+    try:
+        app_module.model_registry.swap(ServedModel(ConstantModel(), "complex", version='v-test'))
+        assert client.post('/predict', data={'age': '66'}).status_code == 200
+        assert client.post('/api/v1/predict/batch', json=[GOLDEN_PATIENTS[0], {'Age': 'x'}]).status_code == 200
+    finally:
+        app_module.model_registry.swap(served)
+    log.close()
+
+    single, batch = read_entries(log.path)
+    assert single['endpoint'] == '/predict' and single['model_version'] == 'v-test'
+    assert single['inputs']['Age'] == 66 and single['probability'] == 0.8 and single['latency_ms'] >= 0
+    assert batch['rows'] == 2 and batch['results'][0]['probability'] == 0.8
+    assert batch['results'][1]['error'] is not None
@@ -0,0 +1,122 @@
+#!/usr/bin/env python3
+"""
+Test the batch JSON scoring endpoint
+"""
+import json
+import os
+import sys
+sys.path.append(os.path.dirname(__file__))
+
+import pandas as pd
+import pytest
+from sklearn.compose import ColumnTransformer
+from sklearn.ensemble import RandomForestClassifier
+from sklearn.impute import SimpleImputer
+from sklearn.pipeline import Pipeline
+from sklearn.preprocessing import OneHotEncoder, StandardScaler
+
+import app as app_module
+from audit_log import AuditLog
+from model_registry import ServedModel
+
+HEART_CSV = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'heart.csv')
+
+
+def build_small_pipeline(df):
+    """Fit a small pipeline with the same structure as retrain_model.py"""
+    X = df.drop(columns=['Patient_ID', 'Heart_Attack_Risk'])
+    y = df['Heart_Attack_Risk']
+    preprocessor = ColumnTransformer(transformers=[
+        ('num', Pipeline([('imputer', SimpleImputer(strategy='median')),
+                          ('scaler', StandardScaler())]), app_module.NUMERIC_COLUMNS),
+        ('cat', Pipeline([('imputer', SimpleImputer(strategy='most_frequent')),
+                          ('onehot', OneHotEncoder(handle_unknown='ignore'))]), app_module.CATEGORICAL_COLUMNS)
+    ])
+    pipeline = Pipeline([('preprocessor', preprocessor),
+                         ('clf', RandomForestClassifier(n_estimators=10, random_state=42))])
+    return pipeline.fit(X, y)
+
+
+@pytest.fixture(autouse=True)
+def no_audit_log(monkeypatch):
+    """AUDIT_LOG_PATH='': keep audited patient records out of the working directory"""
+    monkeypatch.setattr(app_module, 'audit_log', AuditLog(''))
+
+
+def test_batch_endpoint_scores_valid_rows_and_reports_errors():
+    df = pd.read_csv(HEART_CSV, nrows=500)
+    pipeline = build_small_pipeline(df)
+    served = app_module.model_registry.current
+    try:
+        app_module.model_registry.swap(ServedModel(pipeline, "complex"))
+
+        records = df[app_module.FEATURE_COLUMNS].head(20).to_dict('records')
+        records[3] = dict(records[3], Age='not a number')
+        del records[7]['Gender']
+        records.append('not an object')
+
+        client = app_module.app.test_client()
+        response = client.post('/api/v1/predict/batch', json=records)
+        assert response.status_code == 200
+        body = response.get_json()
+
+        assert body['count'] == 21
+        assert body['errors'] == 3
+        results = body['results']
+        assert 'Age' in results[3]['error']
+        assert 'Gender' in results[7]['error']
+        assert results[20]['error'] == 'Record must be a JSON object'
+
+        expected = pipeline.predict_proba(df[app_module.FEATURE_COLUMNS].head(20))[:, 1]
+        for i, result in enumerate(results[:20]):
+            if i in (3, 7):
+                assert result['probability'] is None
+                continue
+            assert result['error'] is None
+            assert abs(result['probability'] - expected[i]) < 1e-12
+            assert result['risk_category'] in ('Low', 'Medium', 'High')
+    finally:
+        app_module.model_registry.swap(served)
+
+
+def test_batch_endpoint_accepts_ndjson_and_rule_based_fallback():
+    df = pd.read_csv(HEART_CSV, nrows=5)
+    served = app_module.model_registry.current
+    try:
+        app_module.model_registry.swap(None)
+
+        records = df[app_module.FEATURE_COLUMNS].to_dict('records')
+        body = '\n'.join(json.dumps(record) for record in records)
+
+        client = app_module.app.test_client()
+        response = client.post('/api/v1/predict/batch', data=body, content_type='application/x-ndjson')
+        assert response.status_code == 200
+        payload = response.get_json()
+
+        assert payload['model'] == 'rule_based'
+        for record, result in zip(records, payload['results']):
+            assert result['probability'] == app_module.calculate_rule_based_risk(record)
+    finally:
+        app_module.model_registry.swap(served)
+
+
+def test_batch_endpoint_rejects_non_array_body():
+    client = app_module.app.test_client()
+    response = client.post('/api/v1/predict/batch', json={'Age': 45})
+    assert response.status_code == 400
+
+
+def test_predict_patient_matches_predict_and_predict_proba():
+    from inference import predict_patient
+
+    df = pd.read_csv(HEART_CSV, nrows=300)
+    pipeline = build_small_pipeline(df)
+    X = df[app_module.FEATURE_COLUMNS].head(25)
+
+    expected_prob = pipeline.predict_proba(X)[:, 1]
+    expected_class = pipeline.predict(X)
+    for i, patient_data in enumerate(X.to_dict('records')):
+        pred_prob, pred_class, category = predict_patient(pipeline, "complex", patient_data)
+        assert pred_prob == expected_prob[i]
+        assert pred_class == expected_class[i]
+        assert category == app_module.categorize_risk(expected_prob[i])
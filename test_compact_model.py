@@ -0,0 +1,71 @@
+#!/usr/bin/env python3
+"""
+Test the compact forest artifact against the sklearn models it is exported from
+"""
+import copy
+import os
+import sys
+sys.path.append(os.path.dirname(__file__))
+
+import joblib
+import numpy as np
+import pandas as pd
+from sklearn.ensemble import RandomForestClassifier
+from sklearn.pipeline import Pipeline
+
+from compact_model import _round_down_float32, load_compact, save_compact, select_tree_count
+from compiled_scorer import CompiledScorer
+from flat_forest import FlatForest
+from inference import CATEGORICAL_COLUMNS, FEATURE_COLUMNS, NUMERIC_COLUMNS, SIMPLE_FEATURES
+from model_registry import GOLDEN_PATIENTS, load_artifact
+from retrain_model import build_preprocessor
+
+HEART_CSV = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'heart.csv')
+
+
+def fit_pipeline(df, n_estimators=20):
+    pipeline = Pipeline([('preprocessor', build_preprocessor(NUMERIC_COLUMNS, CATEGORICAL_COLUMNS)),
+                         ('clf', RandomForestClassifier(n_estimators=n_estimators, random_state=0))])
+    return pipeline.fit(df[FEATURE_COLUMNS], df['Heart_Attack_Risk'])
+
+
+def test_rounded_thresholds_keep_every_split():
+    rng = np.random.default_rng(0)
+    thresholds = rng.normal(size=2000) * 100
+    x = (thresholds + rng.normal(size=2000) * 1e-5).astype(np.float32)
+    assert ((x <= thresholds) == (x <= _round_down_float32(thresholds))).all()
+
+
+def test_pipeline_round_trip_matches_pickle(tmp_path):
+    df = pd.read_csv(HEART_CSV, nrows=1500)
+    pipeline = fit_pipeline(df.head(1000))
+    path = str(tmp_path / 'heart_disease_model.compact.npz')
+    save_compact(CompiledScorer.from_pipeline(pipeline, flatten_forest=True), path)
+    joblib.dump(pipeline, tmp_path / 'pipeline.pkl')
+
+    compact = load_artifact(path)
+    assert isinstance(compact, CompiledScorer) and isinstance(compact.classifier, FlatForest)
+    assert compact.classifier.threshold.dtype == np.float32 and compact.classifier.value.dtype == np.float32
+    X = df.tail(500)[FEATURE_COLUMNS]
+    np.testing.assert_allclose(compact.predict_proba(X), pipeline.predict_proba(X), atol=1e-6)
+    for patient in GOLDEN_PATIENTS:
+        np.testing.assert_allclose(compact.predict_proba_record(patient),
+                                   pipeline.predict_proba(pd.DataFrame([patient]))[0], atol=1e-6)
+    assert os.path.getsize(path) * 10 < os.path.getsize(tmp_path / 'pipeline.pkl')
+
+
+def test_tree_cap_keeps_leading_trees(tmp_path):
+    df = pd.read_csv(HEART_CSV, nrows=800)
+    X, y = df[SIMPLE_FEATURES].to_numpy(), df['Heart_Attack_Risk']
+    forest = RandomForestClassifier(n_estimators=30, random_state=0).fit(X, y)
+    path = str(tmp_path / 'simple_heart_model.compact.npz')
+    save_compact(FlatForest.from_estimator(forest), path, n_trees=12)
+
+    capped = copy.deepcopy(forest)
+    capped.estimators_ = forest.estimators_[:12]
+    loaded = load_compact(path)
+    assert isinstance(loaded, FlatForest) and loaded.n_estimators == 12
+    np.testing.assert_allclose(loaded.predict_proba(X), capped.predict_proba(X), atol=1e-6)
+
+    n_trees, auc, full_auc = select_tree_count(FlatForest.from_estimator(forest), X, y, auc_budget=0.05)
+    assert 10 <= n_trees <= 30 and auc >= full_auc - 0.05
@@ -0,0 +1,79 @@
+#!/usr/bin/env python3
+"""
+Parity tests for the compiled fast-path scorer against pipeline.predict_proba
+"""
+import os
+import sys
+sys.path.append(os.path.dirname(__file__))
+
+import numpy as np
+import pandas as pd
+from sklearn.compose import ColumnTransformer
+from sklearn.ensemble import RandomForestClassifier
+from sklearn.impute import SimpleImputer
+from sklearn.linear_model import LogisticRegression
+from sklearn.pipeline import Pipeline
+from sklearn.preprocessing import OneHotEncoder, StandardScaler
+
+from compiled_scorer import CompiledScorer
+from inference import CATEGORICAL_COLUMNS, FEATURE_COLUMNS, NUMERIC_COLUMNS, predict_patient
+
+HEART_CSV = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'heart.csv')
+
+
+def build_pipeline(clf):
+    """Same preprocessing structure as retrain_model.py"""
+    preprocessor = ColumnTransformer(transformers=[
+        ('num', Pipeline([('imputer', SimpleImputer(strategy='median')),
+                          ('scaler', StandardScaler())]), NUMERIC_COLUMNS),
+        ('cat', Pipeline([('imputer', SimpleImputer(strategy='most_frequent')),
+                          ('onehot', OneHotEncoder(handle_unknown='ignore'))]), CATEGORICAL_COLUMNS)
+    ])
+    return Pipeline([('preprocessor', preprocessor), ('clf', clf)])
+
+
+def load_heart():
+    df = pd.read_csv(HEART_CSV)
+    return df[FEATURE_COLUMNS], df['Heart_Attack_Risk']
+
+
+def test_random_forest_parity_on_full_dataset():
+    X, y = load_heart()
+    pipeline = build_pipeline(RandomForestClassifier(n_estimators=20, random_state=42)).fit(X, y)
+    scorer = CompiledScorer.from_pipeline(pipeline)
+
+    expected = pipeline.predict_proba(X)
+    np.testing.assert_array_equal(scorer.predict_proba(X), expected)
+
+    for i, patient_data in enumerate(X.iloc[::50].to_dict('records')):
+        np.testing.assert_array_equal(scorer.predict_proba_record(patient_data), expected[i * 50])
+
+
+def test_logistic_regression_parity_on_full_dataset():
+    X, y = load_heart()
+    pipeline = build_pipeline(LogisticRegression(max_iter=1000, class_weight='balanced')).fit(X, y)
+    scorer = CompiledScorer.from_pipeline(pipeline)
+
+    expected = pipeline.predict_proba(X)
+    np.testing.assert_allclose(scorer.predict_proba(X), expected, rtol=0, atol=1e-12)
+
+    for i, patient_data in enumerate(X.to_dict('records')):
+        pred_prob, pred_class, _ = predict_patient(scorer, "complex", patient_data)
+        assert abs(pred_prob - expected[i, 1]) < 1e-12
+        assert pred_class == pipeline.classes_[np.argmax(expected[i])]
+
+
+def test_missing_and_unknown_values_match_pipeline(tmp_path):
+    X, y = load_heart()
+    pipeline = build_pipeline(RandomForestClassifier(n_estimators=10, random_state=0)).fit(X.head(2000), y.head(2000))
+    path = tmp_path / 'compiled.joblib'
+    CompiledScorer.from_pipeline(pipeline).save(path)
+    scorer = CompiledScorer.load(path)
+
+    sample = X.head(5).copy()
+    sample['State_Name'] = sample['State_Name'].astype(object)
+    sample.loc[sample.index[0], 'Cholesterol_Level'] = np.nan
+    sample.loc[sample.index[1], 'State_Name'] = 'Atlantis'
+    sample.loc[sample.index[2], 'Gender'] = None
+
+    np.testing.assert_array_equal(scorer.predict_proba(sample), pipeline.predict_proba(sample))
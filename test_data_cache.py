@@ -0,0 +1,54 @@
+#!/usr/bin/env python3
+"""
+Test the typed columnar cache of the training CSV
+"""
+import os
+import sys
+sys.path.append(os.path.dirname(__file__))
+
+import numpy as np
+import pandas as pd
+
+import data_cache
+
+HEART_CSV = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'heart.csv')
+
+
+def test_cache_matches_csv_with_narrow_dtypes(tmp_path):
+    csv = tmp_path / 'heart.csv'
+    pd.read_csv(HEART_CSV, nrows=500).to_csv(csv, index=False)
+    expected = pd.read_csv(csv)
+
+    df = data_cache.load_training_data(str(csv))
+    assert list(df.columns) == list(expected.columns)
+    assert str(df['Diabetes'].dtype) == 'int8'
+    assert str(df['Annual_Income'].dtype) == 'int32'
+    assert isinstance(df['State_Name'].dtype, pd.CategoricalDtype)
+    assert not df['Cholesterol_Level'].to_numpy().flags.owndata  # Memory-mapped from the cache
+    pd.testing.assert_frame_equal(df.astype(expected.dtypes.to_dict()), expected)
+
+
+def test_cache_is_reused_until_csv_changes(tmp_path, monkeypatch):
+    csv = tmp_path / 'heart.csv'
+    pd.read_csv(HEART_CSV, nrows=100).to_csv(csv, index=False)
+    data_cache.load_training_data(str(csv))
+    first_entries = os.listdir(tmp_path / '.data_cache')
+
+    built = []
+    original_build = data_cache.build_cache
+    monkeypatch.setattr(data_cache, 'build_cache', lambda *args: built.append(args) or original_build(*args))
+    data_cache.load_training_data(str(csv))
+    assert built == []
+
+    pd.read_csv(HEART_CSV, nrows=101).to_csv(csv, index=False)
+    assert len(data_cache.load_training_data(str(csv))) == 101
+    assert len(built) == 1
+    entries = os.listdir(tmp_path / '.data_cache')
+    assert len(entries) == 1 and entries != first_entries
+
+
+def test_values_outside_schema_fall_back_to_inference():
+    df = data_cache.apply_schema(pd.DataFrame({'Age': [30, 300], 'Diabetes': [0, np.nan], 'Extra': [1, 2]}))
+    assert str(df['Age'].dtype) == 'int16'
+    assert df['Diabetes'].dtype == np.float64
+    assert str(df['Extra'].dtype) == 'int8'
@@ -0,0 +1,122 @@
+#!/usr/bin/env python3
+"""
+Test the drift baseline, the streaming sketches, the cross-worker merge and /drift
+"""
+import os
+import sys
+import time
+sys.path.append(os.path.dirname(__file__))
+
+import pandas as pd
+import pytest
+
+import app as app_module
+from audit_log import AuditLog
+import drift_monitor
+from drift_monitor import DriftMonitor, build_baseline, save_baseline
+from inference import FEATURE_COLUMNS
+from model_registry import GOLDEN_PATIENTS
+from patient_record import PatientRecord
+
+HEART_CSV = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'heart.csv')
+
+
+def training_rows(nrows=2000):
+    return pd.read_csv(HEART_CSV, nrows=nrows)[FEATURE_COLUMNS]
+
+
+def monitor_for(tmp_path, X, drift_dir=''):
+    path = str(tmp_path / 'baseline.json')
+    save_baseline(build_baseline(X), path)
+    return DriftMonitor(baseline_path=path, drift_dir=drift_dir, flush_interval=0)
+
+
+@pytest.fixture(autouse=True)
+def no_audit_log(monkeypatch):
+    """AUDIT_LOG_PATH='': keep audited patient records out of the working directory"""
+    monkeypatch.setattr(app_module, 'audit_log', AuditLog(''))
+
+
+def test_training_like_traffic_is_stable_and_shifted_traffic_drifts(tmp_path):
+    X = training_rows()
+    baseline = build_baseline(X)
+    age = baseline['features']['Age']
+    assert len(age['edges']) == 9 and abs(sum(age['fractions']) - 1) < 1e-9
+    assert baseline['features']['Smoking']['edges'] == [0.0]
+    assert baseline['features']['Gender']['categories'] == ['Female', 'Male']
+
+    monitor = monitor_for(tmp_path, X)
+    for record in X.head(500).to_dict('records'):
+        monitor.observe(record)
+    monitor.observe_frame(X.iloc[500:])
+    report = monitor.report()
+    assert report['observations'] == len(X)
+    assert report['drifted'] == [] and report['warnings'] == []
+    assert all(abs(feature['psi']) < 1e-9 for feature in report['features'].values())
+
+    shifted = X.assign(Age=X['Age'] + 30, Gender='Male', State_Name='Atlantis')
+    monitor = monitor_for(tmp_path, X)
+    monitor.observe_frame(shifted)
+    report = monitor.report()
+    assert {'Age', 'Gender', 'State_Name'} <= set(report['drifted'])
+    assert report['features']['Age']['ks'] > 0.4
+    assert report['features']['State_Name']['unseen_categories'] == len(X)
+    assert report['features']['Cholesterol_Level']['status'] == 'ok'
+
+
+def test_counts_of_all_workers_are_summed(tmp_path):
+    X = training_rows(500)
+    drift_dir = tmp_path / 'drift'
+    first = monitor_for(tmp_path, X, str(drift_dir))
+    first.observe(PatientRecord.from_json(GOLDEN_PATIENTS[0]))
+    first.flush()
+    # A second worker writes under its own pid; simulate that by renaming
+    os.replace(drift_dir / f'{os.getpid()}.drift', drift_dir / 'other-worker.drift')
+    second = DriftMonitor(baseline_path=first.baseline_path, drift_dir=str(drift_dir), flush_interval=0)
+    second.observe_frame(X.head(3))
+    observations, counts, _ = second.collect()
+    assert observations == 4 and sum(counts['Age']) == 4
+
+    # A retrain writes a new baseline: counts against the old one are ignored and restart at zero
+    save_baseline(build_baseline(X.head(300)), first.baseline_path)
+    os.utime(first.baseline_path, (0, 0))
+    second.refresh()
+    assert second.stats()['observations'] == 0 and second.collect()[0] == 0
+
+
+def test_old_slices_leave_the_window(tmp_path):
+    X = training_rows(500)
+    path = str(tmp_path / 'baseline.json')
+    save_baseline(build_baseline(X), path)
+    monitor = DriftMonitor(baseline_path=path, drift_dir='', window=0.3, slices=3)
+    monitor.observe_frame(X.assign(Age=X['Age'] + 30))  # A shift that has since passed
+    assert monitor.collect()[0] == len(X)
+    time.sleep(0.35)
+    monitor.observe_frame(X)
+    observations, counts, oldest = monitor.collect()
+    assert observations == len(X) and oldest == monitor._slice_id()
+    assert len(monitor._slices) == 3  # Constant memory: expired slices are reused
+
+    report = monitor.report()
+    assert report['window']['seconds'] == 0.3 and report['window']['start'] <= report['window']['end']
+    assert report['features']['Age']['status'] == 'ok' and report['drifted'] == []
+
+
+def test_drift_endpoint(tmp_path, monkeypatch):
+    client = app_module.app.test_client()
+    monkeypatch.setattr(app_module, 'drift_monitor', DriftMonitor(baseline_path=str(tmp_path / 'missing.json'),
+                                                                  drift_dir=''))
+    assert client.get('/drift').status_code == 404
+
+    monitor = monitor_for(tmp_path, training_rows(500))
+    monkeypatch.setattr(app_module, 'drift_monitor', monitor)
+    assert client.post('/predict', data={'age': '70', 'smoking': 'on'}).status_code == 200
+    assert client.post('/api/v1/predict/batch', json=[GOLDEN_PATIENTS[0], {'Age': 'x'}]).status_code == 200
+    body = client.get('/drift').get_json()
+    assert body['observations'] == 2
+    assert body['features']['Age']['status'] == 'insufficient_data'
+
+    monkeypatch.setattr(drift_monitor, 'DRIFT_MIN_OBSERVATIONS', 1)
+    body = client.get('/drift').get_json()
+    assert body['features']['Age']['psi'] > 0 and body['baseline']['rows'] == 500
+    assert client.get('/health').get_json()['drift']['observations'] == 2
@@ -0,0 +1,54 @@
+#!/usr/bin/env python3
+"""
+Parity tests for the flattened RandomForest evaluator
+"""
+import os
+import sys
+sys.path.append(os.path.dirname(__file__))
+
+import numpy as np
+import pandas as pd
+from sklearn.ensemble import RandomForestClassifier
+
+from compiled_scorer import CompiledScorer
+from flat_forest import FlatForest
+from inference import FEATURE_COLUMNS, SIMPLE_FEATURES, predict_patient
+from test_compiled_scorer import build_pipeline
+
+HEART_CSV = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'heart.csv')
+
+
+def test_simple_forest_parity_and_roundtrip(tmp_path):
+    df = pd.read_csv(HEART_CSV)
+    X = df[SIMPLE_FEATURES].to_numpy()
+    y = df['Heart_Attack_Risk']
+    forest = RandomForestClassifier(n_estimators=25, class_weight='balanced', random_state=42).fit(X, y)
+
+    flat = FlatForest.from_estimator(forest)
+    np.testing.assert_allclose(flat.predict_proba(X), forest.predict_proba(X), rtol=0, atol=1e-12)
+    np.testing.assert_array_equal(flat.predict(X), forest.predict(X))
+
+    path = tmp_path / 'simple.npz'
+    flat.save(path)
+    loaded = FlatForest.load(path)
+    np.testing.assert_array_equal(loaded.predict_proba(X[:100]), flat.predict_proba(X[:100]))
+    np.testing.assert_array_equal(loaded.classes_, forest.classes_)
+
+    mapped = FlatForest.load(path, mmap=True)
+    assert not mapped.threshold.flags.owndata
+    np.testing.assert_array_equal(mapped.predict_proba(X[:100]), flat.predict_proba(X[:100]))
+
+
+def test_compiled_scorer_with_flat_forest_matches_pipeline():
+    df = pd.read_csv(HEART_CSV)
+    X = df[FEATURE_COLUMNS]
+    y = df['Heart_Attack_Risk']
+    pipeline = build_pipeline(RandomForestClassifier(n_estimators=20, random_state=7)).fit(X, y)
+    scorer = CompiledScorer.from_pipeline(pipeline, flatten_forest=True)
+    assert isinstance(scorer.classifier, FlatForest)
+
+    expected = pipeline.predict_proba(X)
+    np.testing.assert_allclose(scorer.predict_proba(X), expected, rtol=0, atol=1e-12)
+    for i, patient_data in enumerate(X.head(200).to_dict('records')):
+        pred_prob, _, _ = predict_patient(scorer, "complex", patient_data)
+        assert abs(pred_prob - expected[i, 1]) < 1e-12
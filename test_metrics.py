@@ -0,0 +1,89 @@
+#!/usr/bin/env python3
+"""
+Test the timing histograms, the cross-worker snapshot merge and /metrics
+"""
+import os
+import re
+import sys
+sys.path.append(os.path.dirname(__file__))
+
+import numpy as np
+import pytest
+
+import app as app_module
+from audit_log import AuditLog
+from metrics import DEFAULT_BUCKETS, Histogram, MetricsRegistry
+from model_registry import ServedModel
+
+
+class ConstantModel:
+    classes_ = np.array([0, 1])
+
+    def predict_proba(self, X):
+        return np.tile([0.4, 0.6], (len(X), 1))
+
+
+def sample(text, series):
+    match = re.search(rf'^{re.escape(series)} (\S+)$', text, re.MULTILINE)
+    assert match, f"{series} missing from exposition"
+    return float(match.group(1))
+
+
+@pytest.fixture(autouse=True)
+def no_audit_log(monkeypatch):
+    """AUDIT_LOG_PATH='': keep audited patient records out of the working directory"""
+    monkeypatch.setattr(app_module, 'audit_log', AuditLog(''))
+
+
+def test_histogram_buckets_and_render():
+    histogram = Histogram()
+    for value in (0.00005, 0.003, 0.003, 20.0):
+        histogram.observe(value)
+    counts, total = histogram.snapshot()
+    assert counts[0] == 1 and counts[DEFAULT_BUCKETS.index(0.005)] == 2 and counts[-1] == 1
+    assert abs(total - 20.00605) < 1e-9
+
+    registry = MetricsRegistry(metrics_dir='')
+    with registry.stage('inference'):
+        pass
+    registry.inc('heart_errors_total', 2, kind='prediction')
+    text = registry.render([('heart_model_generation', 'Model swaps', {}, 3)])
+    assert '# TYPE heart_stage_duration_seconds histogram' in text
+    assert sample(text, 'heart_stage_duration_seconds_bucket{stage="inference",le="+Inf"}') == 1
+    assert sample(text, 'heart_stage_duration_seconds_count{stage="inference"}') == 1
+    assert sample(text, 'heart_errors_total{kind="prediction"}') == 2
+    assert sample(text, 'heart_model_generation') == 3
+
+
+def test_snapshots_of_all_workers_are_summed(tmp_path):
+    first = MetricsRegistry(metrics_dir=str(tmp_path))
+    second = MetricsRegistry(metrics_dir=str(tmp_path))
+    first.inc('heart_errors_total', kind='prediction')
+    first.flush()
+    # A second worker writes under its own pid; simulate that by renaming
+    os.replace(tmp_path / f'{os.getpid()}.json', tmp_path / 'other-worker.json')
+    second.inc('heart_errors_total', 4, kind='prediction')
+    text = second.render()
+    assert sample(text, 'heart_errors_total{kind="prediction"}') == 5
+
+
+def test_metrics_endpoint_reports_stages_after_predict():
+    served = app_module.model_registry.current
+    try:
+        app_module.model_registry.swap(ServedModel(ConstantModel(), "complex"))
+        app_module.prediction_cache.clear()
+        client = app_module.app.test_client()
+        assert client.post('/predict', data={'age': '61'}).status_code == 200
+        assert client.post('/predict', data={'age': '61'}).status_code == 200
+
+        response = client.get('/metrics')
+        assert response.status_code == 200
+        assert response.content_type.startswith('text/plain; version=0.0.4')
+        text = response.get_data(as_text=True)
+        for name in ('parse_form', 'build_input', 'inference', 'render'):
+            assert sample(text, f'heart_stage_duration_seconds_count{{stage="{name}"}}') >= 1
+        assert sample(text, 'heart_request_duration_seconds_count{endpoint="/predict",method="POST",status="200"}') >= 2
+        assert sample(text, 'heart_prediction_cache_requests_total{result="hit"}') >= 1
+        assert sample(text, 'heart_model_loaded') == 1
+    finally:
+        app_module.model_registry.swap(served)
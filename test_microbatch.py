@@ -0,0 +1,91 @@
+#!/usr/bin/env python3
+"""
+Test that the micro-batcher groups concurrent predictions and keeps results per caller
+"""
+import os
+import sys
+import threading
+sys.path.append(os.path.dirname(__file__))
+
+import numpy as np
+import pytest
+
+from inference import FEATURE_COLUMNS, predict_patient
+from microbatch import MicroBatcher
+
+
+class AgeModel:
+    """Probability grows with Age, so every caller can recognise its own row"""
+    classes_ = np.array([0, 1])
+
+    def __init__(self):
+        self.calls = 0
+        self.rows = []
+
+    def predict_proba(self, X):
+        self.calls += 1
+        self.rows.append(len(X))
+        p = X['Age'].to_numpy(dtype=float) / 100.0
+        return np.column_stack([1 - p, p])
+
+
+class FailingModel(AgeModel):
+    def predict_proba(self, X):
+        raise RuntimeError('model exploded')
+
+
+def patient(age):
+    record = {col: 0 for col in FEATURE_COLUMNS}
+    record.update(State_Name='Delhi', Gender='Male', Age=age)
+    return record
+
+
+def run_concurrently(batcher, model, ages):
+    results = {}
+    errors = {}
+    barrier = threading.Barrier(len(ages))
+
+    def call(age):
+        barrier.wait()
+        try:
+            results[age] = batcher.predict_patient(model, "complex", patient(age))
+        except Exception as e:
+            errors[age] = e
+
+    threads = [threading.Thread(target=call, args=(age,)) for age in ages]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join(timeout=10)
+    return results, errors
+
+
+def test_concurrent_requests_share_one_call_and_get_their_own_result():
+    model = AgeModel()
+    batcher = MicroBatcher(window_ms=200, max_rows=64)
+    ages = list(range(30, 46))
+    results, errors = run_concurrently(batcher, model, ages)
+
+    assert not errors
+    for age in ages:
+        assert results[age] == predict_patient(AgeModel(), "complex", patient(age))
+    assert model.calls < len(ages)
+    assert sum(model.rows) == len(ages)
+    assert batcher.stats()['rows'] == len(ages)
+
+
+def test_max_rows_caps_the_batch():
+    model = AgeModel()
+    batcher = MicroBatcher(window_ms=200, max_rows=4)
+    results, errors = run_concurrently(batcher, model, list(range(20, 30)))
+    assert not errors and len(results) == 10
+    assert max(model.rows) <= 4
+
+
+def test_model_errors_reach_every_caller():
+    batcher = MicroBatcher(window_ms=50, max_rows=64)
+    results, errors = run_concurrently(batcher, FailingModel(), [40, 50, 60])
+    assert not results
+    assert set(errors) == {40, 50, 60}
+    with pytest.raises(RuntimeError):
+        raise errors[40]
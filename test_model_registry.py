@@ -0,0 +1,148 @@
+#!/usr/bin/env python3
+"""
+Test the model registry: background reload, atomic swap, file watch and manifests
+"""
+import os
+import sys
+import threading
+import time
+sys.path.append(os.path.dirname(__file__))
+
+import joblib
+import numpy as np
+import pandas as pd
+import pytest
+from sklearn.ensemble import RandomForestClassifier
+
+import app as app_module
+from flat_forest import FlatForest
+from inference import SIMPLE_FEATURES
+from model_registry import ModelRegistry, ServedModel, record_source, validate_model, write_manifest
+
+HEART_CSV = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'heart.csv')
+
+
+class ConstantModel:
+    classes_ = np.array([0, 1])
+
+    def __init__(self, prob):
+        self.prob = prob
+
+    def predict_proba(self, X):
+        return np.tile([1 - self.prob, self.prob], (len(X), 1))
+
+
+def wait_for(condition, timeout=5.0):
+    deadline = time.monotonic() + timeout
+    while not condition():
+        assert time.monotonic() < deadline, "condition not reached in time"
+        time.sleep(0.01)
+
+
+def test_reload_serves_old_model_until_new_one_is_ready():
+    release = threading.Event()
+    versions = iter(['v1', 'v2'])
+
+    def loader():
+        version = next(versions)
+        if version == 'v2':
+            release.wait(5)
+        return ServedModel(ConstantModel(0.5), "complex", version=version)
+
+    registry = ModelRegistry(loader, poll_interval=0)
+    assert registry.load_now('startup')
+    assert registry.reload_async()
+    assert not registry.reload_async()  # One reload at a time
+    assert registry.current.version == 'v1'
+    assert registry.status()['reloading']
+
+    release.set()
+    registry.wait(5)
+    assert registry.current.version == 'v2'
+    assert registry.status()['last_reload']['status'] == 'ok'
+
+
+def test_failed_reload_keeps_current_model():
+    loaders = iter([lambda: ServedModel(ConstantModel(0.2), "complex", version='good'),
+                    lambda: validate_model(ConstantModel(float('nan')), "complex")])
+    registry = ModelRegistry(lambda: next(loaders)(), poll_interval=0)
+    registry.load_now()
+    assert not registry.load_now()
+    assert registry.current.version == 'good'
+    assert 'outside [0, 1]' in registry.status()['last_reload']['error']
+
+
+def test_file_watch_triggers_reload(tmp_path):
+    trigger = tmp_path / 'reload'
+    registry = ModelRegistry(lambda: ServedModel(ConstantModel(0.4), "complex"),
+                             watch_paths=lambda: [str(trigger)], poll_interval=0.02)
+    registry.load_now('startup')
+    registry.ensure_watcher()
+    trigger.touch()
+    wait_for(lambda: registry.generation == 2 and not registry.reloading())
+    assert registry.status()['last_reload']['reason'] == 'file change'
+
+
+def test_manifest_golden_probabilities_gate_the_load(tmp_path, monkeypatch):
+    df = pd.read_csv(HEART_CSV)
+    forest = RandomForestClassifier(n_estimators=5, random_state=0)
+    forest.fit(df[SIMPLE_FEATURES].to_numpy(), df['Heart_Attack_Risk'])
+    flat = FlatForest.from_estimator(forest)
+    artifact = tmp_path / 'v1' / 'simple_model.npz'
+    artifact.parent.mkdir()
+    flat.save(str(artifact))
+
+    manifest = str(tmp_path / 'manifest.json')
+    golden = validate_model(flat, "simple")
+    write_manifest(manifest, str(artifact), "simple", 'v1', golden)
+    monkeypatch.setattr(app_module, 'MODEL_PATH', '')
+    monkeypatch.setattr(app_module, 'MODEL_MANIFEST', manifest)
+    served = app_module.load_serving_model()
+    assert (served.version, served.model_type) == ('v1', 'simple')
+
+    write_manifest(manifest, str(artifact), "simple", 'v2', [p + 0.1 for p in golden])
+    with pytest.raises(RuntimeError, match='Golden sample mismatch'):
+        app_module.load_serving_model()
+
+
+def test_compiled_mode_only_uses_artifacts_built_from_the_loaded_model(tmp_path, monkeypatch):
+    df = pd.read_csv(HEART_CSV, nrows=1000)
+    X, y = df[SIMPLE_FEATURES].to_numpy(), df['Heart_Attack_Risk']
+    paths = {}
+    for version, seed in (('v1', 0), ('v2', 1)):
+        paths[version] = str(tmp_path / f'simple_{version}.pkl')
+        joblib.dump(RandomForestClassifier(n_estimators=5, random_state=seed).fit(X, y), paths[version])
+    flat_path = str(tmp_path / 'simple_heart_model.npz')
+    FlatForest.from_estimator(joblib.load(paths['v1'])).save(flat_path)
+    record_source(flat_path, paths['v1'])
+    monkeypatch.setattr(app_module, 'SCORER_MODE', 'compiled')
+    monkeypatch.setattr(app_module, 'FLAT_SIMPLE_MODEL_PATH', flat_path)
+    monkeypatch.setattr(app_module, 'RISK_GRID_MODE', 'off')
+
+    for version in ('v1', 'v2'):
+        monkeypatch.setattr(app_module, 'MODEL_PATH', paths[version])
+        served = app_module.load_serving_model()
+        assert isinstance(served.model, FlatForest)
+        # v2 must not be served the v1 forest exported next to it
+        np.testing.assert_allclose(served.model.predict_proba(X[:50]),
+                                   joblib.load(paths[version]).predict_proba(X[:50]), atol=1e-6)
+
+
+def test_reload_endpoint_returns_immediately_and_health_reports_version(tmp_path, monkeypatch):
+    monkeypatch.setattr(app_module, 'MODEL_RELOAD_TRIGGER', str(tmp_path / 'reload'))
+    monkeypatch.setattr(app_module.model_registry, '_loader',
+                        lambda: ServedModel(ConstantModel(0.7), "complex", version='hot'))
+    served = app_module.model_registry.current
+    try:
+        client = app_module.app.test_client()
+        response = client.post('/reload-model')
+        assert response.status_code == 202
+        assert os.path.exists(tmp_path / 'reload')
+
+        app_module.model_registry.wait(5)
+        health = client.get('/health').get_json()
+        assert health['model_version'] == 'hot'
+        assert health['model']['last_reload']['reason'] == 'reload-model'
+    finally:
+        app_module.model_registry.wait(5)
+        app_module.model_registry.swap(served)
@@ -0,0 +1,92 @@
+#!/usr/bin/env python3
+"""
+Test PatientRecord parsing, validation and model-input conversion
+"""
+import os
+import sys
+sys.path.append(os.path.dirname(__file__))
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from inference import FEATURE_COLUMNS, SIMPLE_FEATURES, model_input
+from model_registry import GOLDEN_PATIENTS
+from patient_record import PatientRecord, RecordError, invalid_cells, records_to_frame, records_to_matrix
+from prediction_cache import cache_key
+from rules import calculate_rule_based_risk
+
+
+def test_form_parsing_matches_the_old_dict():
+    form = {'state': 'Kerala', 'age': '61', 'gender': 'Female', 'smoking': 'on', 'diabetes': 'on',
+            'cholesterol': '245', 'healthcare': 'Rural', 'annual_income': '750000'}
+    record = PatientRecord.from_form(form)
+    assert record['State_Name'] == 'Tamil Nadu'
+    assert (record.Age, record.Gender, record.Smoking, record.Diabetes, record.Hypertension) == (61, 'Female', 1, 1, 0)
+    assert record['Healthcare_Access'] == 0
+    assert record['Diet_Score'] == 5  # default
+    assert list(record.keys()) == FEATURE_COLUMNS
+
+    defaults = PatientRecord.from_form({})
+    assert defaults['State_Name'] == 'Delhi' and defaults['Healthcare_Access'] == 1
+
+
+def test_invalid_input_lists_every_bad_field():
+    with pytest.raises(RecordError) as error:
+        PatientRecord.from_form({'age': '250', 'cholesterol': 'high'})
+    assert set(error.value.errors) == {'Age', 'Cholesterol_Level'}
+    with pytest.raises(RecordError) as error:
+        PatientRecord.from_form({'state': '', 'gender': ''})
+    assert set(error.value.errors) == {'State_Name', 'Gender'}
+
+    record = PatientRecord.from_json(GOLDEN_PATIENTS[0])
+    assert record.to_dict() == GOLDEN_PATIENTS[0]
+    with pytest.raises(RecordError) as error:
+        PatientRecord.from_json(dict(GOLDEN_PATIENTS[0], Gender='', Systolic_BP=None, Diabetes=2))
+    assert set(error.value.errors) == {'Gender', 'Systolic_BP', 'Diabetes'}
+
+
+def test_record_is_a_drop_in_for_patient_data_dicts():
+    patient = GOLDEN_PATIENTS[1]
+    record = PatientRecord.from_json(patient)
+    assert cache_key(record, 'v1') == cache_key(patient, 'v1')
+    assert calculate_rule_based_risk(record) == calculate_rule_based_risk(patient)
+
+    frame = model_input(record, 'complex')
+    pd.testing.assert_frame_equal(frame, pd.DataFrame([patient], columns=FEATURE_COLUMNS))
+    row = model_input(record, 'simple')
+    assert row.shape == (1, len(SIMPLE_FEATURES))
+    assert row[0].tolist() == [patient[col] for col in SIMPLE_FEATURES]
+
+
+def test_batch_conversion_writes_in_column_order():
+    records = [PatientRecord.from_json(patient) for patient in GOLDEN_PATIENTS]
+    out = np.zeros((len(records), len(SIMPLE_FEATURES)))
+    assert records_to_matrix(records, SIMPLE_FEATURES, out=out) is out
+    assert out.tolist() == [[patient[col] for col in SIMPLE_FEATURES] for patient in GOLDEN_PATIENTS]
+
+    frame = records_to_frame(records, ['Patient_ID'] + FEATURE_COLUMNS, Patient_ID=1)
+    assert frame.columns[0] == 'Patient_ID' and (frame['Patient_ID'] == 1).all()
+    assert frame['Age'].tolist() == [patient['Age'] for patient in GOLDEN_PATIENTS]
+    assert frame['Age'].dtype == np.int64 and frame['State_Name'].dtype == object
+
+
+def test_column_checks_flag_the_fields_from_json_rejects():
+    patients = [dict(GOLDEN_PATIENTS[0], Age='61'), dict(GOLDEN_PATIENTS[1], Age=-5, Gender=''),
+                dict(GOLDEN_PATIENTS[0], Cholesterol_Level='high', State_Name=None),
+                dict(GOLDEN_PATIENTS[1], HDL_Level=float('nan'), Diabetes=2, Annual_Income=1e12),
+                dict(GOLDEN_PATIENTS[0], Systolic_BP=None)]
+    rejected = []
+    for patient in patients:
+        try:
+            PatientRecord.from_json(patient)
+            rejected.append(set())
+        except RecordError as e:
+            rejected.append(set(e.errors))
+
+    invalid = invalid_cells(pd.DataFrame(patients, columns=FEATURE_COLUMNS), FEATURE_COLUMNS)
+    assert [{col for col in FEATURE_COLUMNS if invalid[col][i]} for i in range(len(patients))] == rejected
+    assert rejected[0] == set() and rejected[4] == {'Systolic_BP'}
+
+    optional = invalid_cells(pd.DataFrame(patients, columns=FEATURE_COLUMNS), ['Age'], ['HDL_Level', 'Diet_Score'])
+    assert set(optional) == {'Age', 'HDL_Level', 'Diet_Score'} and not optional['HDL_Level'].any()
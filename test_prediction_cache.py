@@ -0,0 +1,90 @@
+#!/usr/bin/env python3
+"""
+Test the LRU prediction cache and its use in /predict
+"""
+import os
+import sys
+import time
+sys.path.append(os.path.dirname(__file__))
+
+import numpy as np
+import pytest
+
+import app as app_module
+from audit_log import AuditLog
+from model_registry import ServedModel
+from prediction_cache import PredictionCache, cache_key
+
+
+class CountingModel:
+    """Minimal model that records how often it is asked to predict"""
+    classes_ = np.array([0, 1])
+
+    def __init__(self):
+        self.calls = 0
+
+    def predict_proba(self, X):
+        self.calls += 1
+        return np.tile([0.3, 0.7], (len(X), 1))
+
+
+@pytest.fixture(autouse=True)
+def no_audit_log(monkeypatch):
+    """AUDIT_LOG_PATH='': keep audited patient records out of the working directory"""
+    monkeypatch.setattr(app_module, 'audit_log', AuditLog(''))
+
+
+def test_lru_eviction_and_stats():
+    cache = PredictionCache(max_size=2)
+    cache.put('a', 1)
+    cache.put('b', 2)
+    assert cache.get('a') == 1
+    cache.put('c', 3)  # evicts 'b', the least recently used
+    assert cache.get('b') is None
+    assert cache.get('c') == 3
+    stats = cache.stats()
+    assert (stats['hits'], stats['misses'], stats['evictions'], stats['size']) == (2, 1, 1, 2)
+
+
+def test_ttl_expiry():
+    cache = PredictionCache(max_size=10, ttl=0.05)
+    cache.put('a', 1)
+    assert cache.get('a') == 1
+    time.sleep(0.1)
+    assert cache.get('a') is None
+    assert cache.stats()['evictions'] == 1
+
+
+def test_cache_key_is_canonical():
+    first = cache_key({'Age': 45, 'Gender': 'Male'}, 'v1')
+    assert first == cache_key({'Gender': 'Male', 'Age': 45.0}, 'v1')
+    assert first != cache_key({'Gender': 'Male', 'Age': 46}, 'v1')
+    assert first != cache_key({'Gender': 'Male', 'Age': 45}, 'v2')
+
+
+def test_repeated_predict_hits_cache_and_health_reports_it():
+    counting_model = CountingModel()
+    served = app_module.model_registry.current
+    try:
+        app_module.model_registry.swap(ServedModel(counting_model, "complex"))
+        app_module.prediction_cache.clear()
+        before = app_module.prediction_cache.stats()
+
+        client = app_module.app.test_client()
+        form = {'age': '52', 'smoking': 'on', 'cholesterol': '240'}
+        assert client.post('/predict', data=form).status_code == 200
+        assert client.post('/predict', data=form).status_code == 200
+        assert counting_model.calls == 1
+
+        stats = client.get('/health').get_json()['prediction_cache']
+        assert stats['hits'] - before['hits'] == 1
+        assert stats['misses'] - before['misses'] == 1
+
+        # Swapping the model empties the cache, and a different model never sees the old entry
+        other_model = CountingModel()
+        app_module.model_registry.swap(ServedModel(other_model, "complex"))
+        assert app_module.prediction_cache.stats()['size'] == 0
+        assert client.post('/predict', data=form).status_code == 200
+        assert other_model.calls == 1
+    finally:
+        app_module.model_registry.swap(served)
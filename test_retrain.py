@@ -0,0 +1,128 @@
+#!/usr/bin/env python3
+"""
+Test the retraining script's default and search modes on a small sample
+"""
+import os
+import sys
+sys.path.append(os.path.dirname(__file__))
+
+import joblib
+import pandas as pd
+import pytest
+from sklearn.ensemble import RandomForestClassifier
+from sklearn.linear_model import LogisticRegression
+
+import retrain_model
+from inference import CATEGORICAL_COLUMNS, FEATURE_COLUMNS, NUMERIC_COLUMNS
+
+HEART_CSV = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'heart.csv')
+
+
+def test_search_caches_preprocessor_and_returns_clean_pipeline(tmp_path):
+    df = pd.read_csv(HEART_CSV, nrows=900)
+    space = [
+        {'clf': [LogisticRegression(max_iter=500)], 'clf__C': [0.1, 1.0]},
+        {'clf': [RandomForestClassifier(random_state=0)], 'clf__n_estimators': [5, 10]},
+    ]
+    cache_dir = str(tmp_path / 'cache')
+    name, model, search = retrain_model.train_search(
+        retrain_model.build_preprocessor(NUMERIC_COLUMNS, CATEGORICAL_COLUMNS),
+        df[FEATURE_COLUMNS], df['Heart_Attack_Risk'], n_jobs=1, cv=3, factor=2,
+        cache_dir=cache_dir, search_space=space)
+
+    assert name in ('LogisticRegression', 'RandomForestClassifier')
+    assert model.memory is None
+    assert len(search.cv_results_['params']) > len(space[0]['clf__C']) + len(space[1]['clf__n_estimators'])
+    assert os.listdir(cache_dir)  # Fitted preprocessors were cached
+    assert model.predict_proba(df[FEATURE_COLUMNS].head(5)).shape == (5, 2)
+
+
+def test_default_mode_writes_pipeline_and_compiled_scorer(tmp_path):
+    data = tmp_path / 'heart.csv'
+    pd.read_csv(HEART_CSV, nrows=600).to_csv(data, index=False)
+    retrain_model.main(['--data', str(data), '--output-dir', str(tmp_path)])
+
+    pipeline = joblib.load(tmp_path / 'heart_disease_pipeline.pkl')
+    assert set(pipeline.named_steps) == {'preprocessor', 'clf'}
+    assert os.path.exists(tmp_path / 'heart_disease_compiled.joblib')
+    assert os.path.exists(tmp_path / 'heart_disease_drift_baseline.json')
+
+
+def test_tree_cap_uses_validation_rows_and_stale_compact_is_removed(tmp_path):
+    data = tmp_path / 'heart.csv'
+    pd.read_csv(HEART_CSV, nrows=600).to_csv(data, index=False)
+    args = ['--data', str(data), '--output-dir', str(tmp_path), '--model', 'RandomForest']
+    report = retrain_model.main(args + ['--compact', '--auc-budget', '0.01'])
+    assert os.path.exists(tmp_path / 'heart_disease_model.compact.npz')
+    assert report['train_rows'] == 384  # 80% of the 480 training rows; the rest chose the tree cap
+
+    # The app prefers the compact file, so a retrain without --compact must not leave the old one
+    retrain_model.main(args)
+    assert not os.path.exists(tmp_path / 'heart_disease_model.compact.npz')
+
+
+def test_incremental_adds_trees_for_appended_rows_only(tmp_path):
+    df = pd.read_csv(HEART_CSV, nrows=800)
+    data = tmp_path / 'heart.csv'
+    df.head(600).to_csv(data, index=False)
+    retrain_model.main(['--data', str(data), '--output-dir', str(tmp_path), '--model', 'RandomForest'])
+    before = joblib.load(tmp_path / 'heart_disease_pipeline.pkl')
+
+    df.iloc[600:].to_csv(data, mode='a', header=False, index=False)
+    report = retrain_model.main(['--data', str(data), '--output-dir', str(tmp_path), '--incremental',
+                                 '--add-trees', '7'])
+    after = joblib.load(tmp_path / 'heart_disease_pipeline.pkl')
+    state = retrain_model.read_state(str(tmp_path))
+
+    assert after.named_steps['clf'].n_estimators == before.named_steps['clf'].n_estimators + 7
+    assert after.named_steps['clf'].class_weight == 'balanced'
+    # The preprocessor keeps the statistics fitted on the first 600 rows
+    assert (after.named_steps['preprocessor'].named_transformers_['num'].named_steps['scaler'].mean_
+            == before.named_steps['preprocessor'].named_transformers_['num'].named_steps['scaler'].mean_).all()
+    assert (state['rows'], state['train_rows']) == (800, 480 + 160)
+    assert report['mode'] == 'incremental'
+
+    assert retrain_model.main(['--data', str(data), '--output-dir', str(tmp_path), '--incremental'])['new_rows'] == 0
+
+
+def test_incremental_waits_for_enough_rows_and_counts_the_rows_it_fits(tmp_path):
+    df = pd.read_csv(HEART_CSV, nrows=800)
+    data = tmp_path / 'heart.csv'
+    df.head(600).to_csv(data, index=False)
+    args = ['--data', str(data), '--output-dir', str(tmp_path)]
+    retrain_model.main(args + ['--model', 'LogisticRegression'])
+
+    df.iloc[600:601].to_csv(data, mode='a', header=False, index=False)
+    report = retrain_model.main(args + ['--incremental'])
+    assert report['new_rows'] == 1 and 'min-new-rows' in report['skipped']
+    assert retrain_model.read_state(str(tmp_path))['rows'] == 600  # Picked up again next time
+
+    df.iloc[601:].to_csv(data, mode='a', header=False, index=False)
+    report = retrain_model.main(args + ['--incremental'])
+    state = retrain_model.read_state(str(tmp_path))
+    # The logistic regression is refitted on all 600 older rows plus 160 of the 200 new ones
+    assert report['train_rows'] == state['train_rows'] == 760 == sum(state['class_counts'].values())
+
+
+def test_incremental_refuses_a_truncated_or_rewritten_csv(tmp_path):
+    df = pd.read_csv(HEART_CSV, nrows=700)
+    data = tmp_path / 'heart.csv'
+    df.head(600).to_csv(data, index=False)
+    args = ['--data', str(data), '--output-dir', str(tmp_path)]
+    retrain_model.main(args + ['--model', 'RandomForest'])
+
+    df.head(500).to_csv(data, index=False)
+    with pytest.raises(SystemExit, match='truncated or rewritten'):
+        retrain_model.main(args + ['--incremental'])
+    # Same row count, different rows: skipping the first 600 would have found nothing new
+    df.tail(600).to_csv(data, index=False)
+    with pytest.raises(SystemExit, match='truncated or rewritten'):
+        retrain_model.main(args + ['--incremental'])
+
+    # A state file from before the data hash falls back to counting rows
+    state = retrain_model.read_state(str(tmp_path))
+    del state['data_bytes'], state['data_sha256']
+    retrain_model.write_state(str(tmp_path), state)
+    df.head(500).to_csv(data, index=False)
+    with pytest.raises(SystemExit, match='fewer rows'):
+        retrain_model.main(args + ['--incremental'])
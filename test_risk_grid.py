@@ -0,0 +1,83 @@
+#!/usr/bin/env python3
+"""
+Test the precomputed simple-model risk grid
+"""
+import os
+import sys
+import threading
+sys.path.append(os.path.dirname(__file__))
+
+import numpy as np
+import pandas as pd
+import pytest
+from sklearn.ensemble import RandomForestClassifier
+
+from inference import SIMPLE_FEATURES, predict_patient
+from risk_grid import DEFAULT_AXES, GridScorer, RiskGrid, materialize
+
+HEART_CSV = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'heart.csv')
+
+SMALL_AXES = dict(DEFAULT_AXES, Age=(25, 65, 20), Physical_Activity=(0, 2, 1),
+                  Diet_Score=(1, 5, 4), Stress_Level=(1, 5, 4))
+
+
+def fit_simple_model():
+    df = pd.read_csv(HEART_CSV, nrows=2000)
+    return RandomForestClassifier(n_estimators=10, random_state=42).fit(
+        df[SIMPLE_FEATURES].to_numpy(), df['Heart_Attack_Risk'])
+
+
+def test_grid_lookup_matches_model_on_grid_points(tmp_path):
+    model = fit_simple_model()
+    path = str(tmp_path / 'grid.npy')
+    materialize(model, path, SMALL_AXES)
+    grid = RiskGrid.load(path)
+    assert grid.verify(model)
+
+    cells = np.arange(0, len(grid.table), 97)
+    values = grid.cell_values(cells)
+    expected = model.predict_proba(values)[:, 1]
+    for row, prob in zip(values, expected):
+        assert grid.lookup(row) == prob  # Bit-identical, so int(p * 100) never differs
+    assert grid.hits == len(cells)
+
+
+def test_exact_mode_refuses_a_float32_table_and_counts_under_threads(tmp_path):
+    model = fit_simple_model()
+    path = str(tmp_path / 'grid.npy')
+    materialize(model, path, SMALL_AXES)
+    np.save(path, np.load(path).astype(np.float32))
+    with pytest.raises(ValueError, match='float64'):
+        RiskGrid.load(path, mode='exact')
+
+    grid = RiskGrid.load(path, mode='nearest')
+    row = grid.cell_values(np.array([0]))[0]
+    threads = [threading.Thread(target=lambda: [grid.lookup(row) for _ in range(2000)]) for _ in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert grid.hits == 8000
+
+
+def test_grid_scorer_falls_back_to_exact_model(tmp_path):
+    model = fit_simple_model()
+    path = str(tmp_path / 'grid.npy')
+    materialize(model, path, SMALL_AXES)
+    scorer = GridScorer(model, RiskGrid.load(path, mode='exact'))
+
+    patient_data = {'Age': 45, 'Diabetes': 1, 'Hypertension': 0, 'Obesity': 1, 'Smoking': 0,
+                    'Physical_Activity': 2, 'Diet_Score': 5, 'Cholesterol_Level': 200,
+                    'Systolic_BP': 120, 'Diastolic_BP': 80, 'Family_History': 1, 'Stress_Level': 5}
+    on_grid_prob, _, _ = predict_patient(scorer, "simple", patient_data)
+    expected = model.predict_proba([[patient_data[col] for col in SIMPLE_FEATURES]])[0, 1]
+    assert abs(on_grid_prob - expected) < 1e-6
+
+    off_grid = dict(patient_data, Cholesterol_Level=233)
+    off_grid_prob, _, _ = predict_patient(scorer, "simple", off_grid)
+    assert off_grid_prob == model.predict_proba([[off_grid[col] for col in SIMPLE_FEATURES]])[0, 1]
+    assert scorer.grid.hits == 1 and scorer.grid.misses == 1
+
+    other_model = RandomForestClassifier(n_estimators=3, random_state=1).fit(
+        np.random.default_rng(0).integers(0, 300, (200, 12)), np.arange(200) % 2)
+    assert not scorer.grid.verify(other_model)
@@ -0,0 +1,47 @@
+#!/usr/bin/env python3
+"""
+Test the vectorized rule-based scorer against the scalar one
+"""
+import os
+import sys
+sys.path.append(os.path.dirname(__file__))
+
+import numpy as np
+import pandas as pd
+
+from rules import calculate_rule_based_risk, calculate_rule_based_risk_batch
+
+HEART_CSV = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'heart.csv')
+
+
+def test_batch_matches_scalar_on_every_heart_csv_row():
+    df = pd.read_csv(HEART_CSV)
+    expected = np.array([calculate_rule_based_risk(row) for row in df.to_dict('records')])
+    np.testing.assert_array_equal(calculate_rule_based_risk_batch(df), expected)
+
+
+def test_batch_matches_scalar_on_edge_cases():
+    base = {'Age': 25, 'Diabetes': 0, 'Hypertension': 0, 'Obesity': 0, 'Smoking': 0,
+            'Physical_Activity': 3, 'Diet_Score': 8, 'Cholesterol_Level': 180,
+            'Systolic_BP': 110, 'Diastolic_BP': 70, 'Family_History': 0, 'Stress_Level': 2,
+            'Triglyceride_Level': 120, 'HDL_Level': 60}
+    cases = [
+        base,  # Young and healthy: raised to the 0.05 floor
+        dict(base, Age=29, Triglyceride_Level=210),  # Add-on lifts it above the floor
+        dict(base, Age=70, Diabetes=1, Hypertension=1, Obesity=1, Smoking=1, Physical_Activity=0,
+             Diet_Score=2, Cholesterol_Level=300, Systolic_BP=170, Family_History=1, Stress_Level=9,
+             Triglyceride_Level=300, HDL_Level=30),  # Hits the 1.0 cap, then the 0.95 cap
+        dict(base, Age=55, Systolic_BP=130, Diastolic_BP=79, Cholesterol_Level=200, Stress_Level=6,
+             Diet_Score=5, HDL_Level=40),  # Every lower threshold exactly
+        dict(base, Age=35, Diastolic_BP=90, Cholesterol_Level=240, Stress_Level=8, Diet_Score=3),
+    ]
+    df = pd.DataFrame(cases)
+    expected = [calculate_rule_based_risk(case) for case in cases]
+    np.testing.assert_array_equal(calculate_rule_based_risk_batch(df), expected)
+
+    # Structured arrays work too, and missing optional columns use the scalar defaults
+    records = df.drop(columns=['Triglyceride_Level', 'HDL_Level']).to_records(index=False)
+    expected = [calculate_rule_based_risk({k: v for k, v in case.items()
+                                           if k not in ('Triglyceride_Level', 'HDL_Level')})
+                for case in cases]
+    np.testing.assert_array_equal(calculate_rule_based_risk_batch(records), expected)
@@ -0,0 +1,111 @@
+#!/usr/bin/env python3
+"""
+Test the streaming batch scoring CLI
+"""
+import os
+import sys
+sys.path.append(os.path.dirname(__file__))
+
+import joblib
+import numpy as np
+import pandas as pd
+import pytest
+
+import app as app_module
+import score
+from inference import FEATURE_COLUMNS, categorize_risk
+from rules import calculate_rule_based_risk_batch
+from test_batch_api import build_small_pipeline
+
+HEART_CSV = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'heart.csv')
+
+
+def test_chunked_model_scoring_matches_pipeline(tmp_path):
+    df = pd.read_csv(HEART_CSV, nrows=300)
+    pipeline = build_small_pipeline(df)
+    model_path = str(tmp_path / 'heart_disease_pipeline.pkl')
+    joblib.dump(pipeline, model_path)
+
+    extract = df.head(50).copy()
+    extract['Age'] = extract['Age'].astype(object)
+    extract.loc[4, 'Age'] = 'unknown'
+    extract.loc[9, 'Gender'] = None
+    input_path = tmp_path / 'patients.csv'
+    extract.to_csv(input_path, index=False)
+    output_path = tmp_path / 'scored.csv'
+
+    report = score.run(score.build_parser().parse_args(
+        [str(input_path), '-o', str(output_path), '--model', model_path, '--chunk-size', '7']))
+    assert (report['rows'], report['invalid_rows']) == (50, 2)
+
+    scored = pd.read_csv(output_path)
+    assert list(scored.columns) == ['Patient_ID', 'probability', 'risk_category']
+    np.testing.assert_array_equal(scored['Patient_ID'], df['Patient_ID'].head(50))
+    assert scored.loc[[4, 9], 'probability'].isna().all()
+    assert scored.loc[[4, 9], 'risk_category'].isna().all()
+
+    valid = ~scored.index.isin([4, 9])
+    expected = pipeline.predict_proba(df[FEATURE_COLUMNS].head(50)[valid])[:, 1]
+    np.testing.assert_allclose(scored.loc[valid, 'probability'], expected, rtol=0, atol=1e-12)
+    assert list(scored.loc[valid, 'risk_category']) == [categorize_risk(p) for p in expected]
+
+
+def test_rule_based_ndjson_to_parquet(tmp_path):
+    pytest.importorskip('pyarrow')
+    df = pd.read_csv(HEART_CSV, nrows=120)
+    input_path = tmp_path / 'patients.ndjson'
+    df.to_json(input_path, orient='records', lines=True)
+    output_path = tmp_path / 'scored.parquet'
+
+    score.main([str(input_path), '-o', str(output_path), '--rules', '--chunk-size', '50'])
+    scored = pd.read_parquet(output_path)
+    np.testing.assert_array_equal(scored['probability'], calculate_rule_based_risk_batch(df))
+
+
+def test_json_array_and_line_delimited_json_files(tmp_path):
+    df = pd.read_csv(HEART_CSV, nrows=120)
+    expected = calculate_rule_based_risk_batch(df)
+    for name, lines in (('array.json', False), ('lines.json', True), ('lines.jsonl', True)):
+        input_path = tmp_path / name
+        df.to_json(input_path, orient='records', lines=lines)
+        output_path = tmp_path / f'{name}.csv'
+        score.main([str(input_path), '-o', str(output_path), '--rules', '--chunk-size', '50'])
+        np.testing.assert_allclose(pd.read_csv(output_path)['probability'], expected)
+    assert score.detect_format(str(tmp_path / 'array.json'), None, ['csv', 'ndjson', 'json']) == 'json'
+    assert score.detect_format(str(tmp_path / 'lines.json'), None, ['csv', 'ndjson', 'json']) == 'ndjson'
+
+
+def test_out_of_range_rows_are_invalid_as_in_the_batch_api():
+    df = pd.read_csv(HEART_CSV, nrows=20)
+    df.loc[2, 'Age'] = -5
+    df.loc[5, 'Cholesterol_Level'] = 1e9
+    df.loc[7, 'HDL_Level'] = 500  # Optional for the rule-based scorer
+    out, invalid = score.score_chunk(df, score.Scorer(), ['Patient_ID'])
+    _, errors = app_module.validate_patient_batch(df[FEATURE_COLUMNS].to_dict('records'))
+    assert invalid == 3
+    assert out['probability'].isna().tolist() == [error is not None for error in errors]
+
+
+def test_missing_required_columns_stop_the_run(tmp_path):
+    input_path = tmp_path / 'patients.csv'
+    pd.read_csv(HEART_CSV, nrows=5).drop(columns=['Age']).to_csv(input_path, index=False)
+    with pytest.raises(SystemExit, match='Age'):
+        score.main([str(input_path), '-o', str(tmp_path / 'out.csv'), '--rules'])
+
+
+def test_worker_pool_output_matches_serial_order(tmp_path):
+    df = pd.read_csv(HEART_CSV, nrows=400)
+    model_path = str(tmp_path / 'heart_disease_pipeline.pkl')
+    joblib.dump(build_small_pipeline(df), model_path)
+    input_path = tmp_path / 'patients.csv'
+    df.to_csv(input_path, index=False)
+
+    outputs = {}
+    for workers in ('1', '3'):
+        outputs[workers] = tmp_path / f'scored_{workers}.csv'
+        score.main([str(input_path), '-o', str(outputs[workers]), '--model', model_path,
+                    '--chunk-size', '37', '--workers', workers])
+    serial = pd.read_csv(outputs['1'])
+    parallel = pd.read_csv(outputs['3'])
+    pd.testing.assert_frame_equal(parallel, serial)
+    np.testing.assert_array_equal(parallel['Patient_ID'], df['Patient_ID'])
@@ -0,0 +1,60 @@
+#!/usr/bin/env python3
+"""
+Test model path resolution and the lazy-import startup of app.py
+"""
+import json
+import os
+import subprocess
+import sys
+sys.path.append(os.path.dirname(__file__))
+
+import pandas as pd
+import pytest
+from sklearn.ensemble import RandomForestClassifier
+
+import app as app_module
+from flat_forest import FlatForest
+from inference import SIMPLE_FEATURES
+
+APP_DIR = os.path.dirname(os.path.abspath(__file__))
+
+
+def test_rule_based_startup_skips_heavy_imports(tmp_path):
+    code = ("import sys, app; "
+            "print(app.model_registry.current is None, "
+            "[m for m in ('numpy', 'pandas', 'joblib', 'sklearn') if m in sys.modules])")
+    env = dict(os.environ, MODEL_PATH='none', PYTHONPATH=APP_DIR)
+    result = subprocess.run([sys.executable, '-c', code], cwd=tmp_path, env=env,
+                            capture_output=True, text=True, check=True)
+    assert result.stdout.strip().splitlines()[-1] == 'True []'
+
+
+def test_manifest_path_is_relative_to_manifest(tmp_path, monkeypatch):
+    models_dir = tmp_path / 'models'
+    models_dir.mkdir()
+    manifest = models_dir / 'manifest.json'
+    manifest.write_text(json.dumps({'path': 'v2/forest.npz', 'type': 'simple'}))
+    monkeypatch.setattr(app_module, 'MODEL_PATH', '')
+    monkeypatch.setattr(app_module, 'MODEL_MANIFEST', str(manifest))
+    assert app_module.model_candidates() == [(str(models_dir / 'v2' / 'forest.npz'), 'simple')]
+
+    monkeypatch.setattr(app_module, 'MODEL_PATH', 'simple_heart_model.npz')
+    assert app_module.model_candidates() == [('simple_heart_model.npz', 'simple')]
+
+
+def test_load_serving_model_from_model_path(tmp_path, monkeypatch):
+    df = pd.read_csv(os.path.join(APP_DIR, 'heart.csv'))
+    forest = RandomForestClassifier(n_estimators=5, random_state=0)
+    forest.fit(df[SIMPLE_FEATURES].to_numpy(), df['Heart_Attack_Risk'])
+    path = str(tmp_path / 'simple_model.npz')
+    FlatForest.from_estimator(forest).save(path)
+
+    monkeypatch.setattr(app_module, 'MODEL_PATH', path)
+    served = app_module.load_serving_model()
+    assert isinstance(served.model, FlatForest)
+    assert (served.model_type, served.path) == ('simple', path)
+    assert served.version is not None
+
+    monkeypatch.setattr(app_module, 'MODEL_PATH', str(tmp_path / 'missing.pkl'))
+    with pytest.raises(RuntimeError):
+        app_module.load_serving_model()
@@ -0,0 +1,210 @@
+#!/usr/bin/env python3
+"""
+Test the webapp's background SHAP explanation jobs and their /predict fallback
+"""
+import importlib.util
+import multiprocessing
+import os
+import sys
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+
+WEBAPP_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'webapp')
+sys.path.insert(0, WEBAPP_DIR)
+
+import numpy as np
+import pandas as pd
+import pytest
+import shap
+from sklearn.compose import ColumnTransformer
+from sklearn.ensemble import RandomForestClassifier
+from sklearn.linear_model import LogisticRegression
+from sklearn.pipeline import Pipeline
+from sklearn.preprocessing import OneHotEncoder
+
+import explanations
+from explanations import ExplanationJobs, build_shap_explainer, explain_row, feature_columns, load_shap_background, to_dense
+
+
+def load_webapp():
+    """webapp/app.py under its own module name (the root app.py is 'app')"""
+    spec = importlib.util.spec_from_file_location('webapp_app', os.path.join(WEBAPP_DIR, 'app.py'))
+    module = importlib.util.module_from_spec(spec)
+    sys.modules['webapp_app'] = module  # Flask finds webapp/templates through it
+    spec.loader.exec_module(module)
+    return module
+
+
+webapp = load_webapp()
+
+
+def fitted_pipeline(clf=None):
+    """
+    A pipeline fed like the webapp model (State_Name one-hot encoded, Gender as
+    1 = Male) that ignores Patient_ID, so every model input is a displayed feature
+    """
+    df = pd.read_csv(os.path.join(os.path.dirname(WEBAPP_DIR), 'heart.csv'), nrows=300)
+    X = df[feature_columns].assign(Gender=(df['Gender'] == 'Male').astype(int))
+    preprocessor = ColumnTransformer([('id', 'drop', ['Patient_ID']),
+                                      ('cat', OneHotEncoder(handle_unknown='ignore'), ['State_Name'])],
+                                     remainder='passthrough', sparse_threshold=0)
+    return Pipeline([('preprocessor', preprocessor),
+                     ('clf', LogisticRegression(max_iter=200) if clf is None else clf)]).fit(X, df['Heart_Attack_Risk'])
+
+
+def test_background_is_a_fixed_encoded_sample():
+    background = load_shap_background(40)
+    assert list(background.columns) == feature_columns and len(background) == 40
+    assert set(background['Gender']) <= {0, 1}
+    pd.testing.assert_frame_equal(background, load_shap_background(40))
+
+
+@pytest.mark.parametrize('mode', ['tree', 'auto'])
+def test_explanation_covers_the_displayed_features_and_adds_up(mode, monkeypatch):
+    monkeypatch.setattr(explanations, 'SHAP_EXPLAINER', mode)
+    monkeypatch.setattr(explanations, 'SHAP_BACKGROUND_SIZE', 50)
+    pipeline = fitted_pipeline(RandomForestClassifier(n_estimators=10, max_depth=6, random_state=0))
+    explainer, aggregation = build_shap_explainer(pipeline)
+    assert isinstance(explainer, shap.TreeExplainer)
+    # 'tree' needs no background; 'auto' integrates over the heart.csv sample
+    assert explainer.feature_perturbation == ('tree_path_dependent' if mode == 'tree' else 'interventional')
+
+    # Every transformed column, including each State_Name one-hot column, maps to one feature
+    assert (aggregation.sum(axis=1) == 1).all()
+    names = pipeline.named_steps['preprocessor'].get_feature_names_out()
+    state = feature_columns[1:].index('State_Name')
+    assert aggregation[:, state].sum() == sum(name.startswith('cat__State_Name_') for name in names) > 1
+
+    row = load_shap_background(1)
+    X_transformed = to_dense(pipeline.named_steps['preprocessor'].transform(row))
+    feature_importance = explain_row(explainer, aggregation, X_transformed)
+    assert sorted(name for name, _ in feature_importance) == sorted(feature_columns[1:])
+    contributions = [value for _, value in feature_importance]
+    assert contributions == sorted(contributions, key=abs, reverse=True)
+    prob = pipeline.named_steps['clf'].predict_proba(X_transformed)[0, 1]
+    expected_value = np.ravel(explainer.expected_value)[-1]
+    assert sum(contributions) == pytest.approx(prob - expected_value, abs=1e-6)
+
+
+class BrokenExecutor:
+    def submit(self, *args):
+        raise BrokenProcessPool('A child process terminated abruptly')
+
+    def shutdown(self, **kwargs):
+        pass
+
+
+@pytest.fixture
+def release(monkeypatch):
+    """Jobs run in threads and block until the returned event is set"""
+    event = threading.Event()
+
+    def explain(X_transformed):
+        event.wait(5)
+        return [('Age', 0.5)]
+
+    monkeypatch.setattr(explanations, '_explain_in_worker', explain)
+    yield event
+    event.set()
+
+
+def thread_jobs(**kwargs):
+    jobs = ExplanationJobs('unused.pkl', **kwargs)
+    jobs._executor = ThreadPoolExecutor(max_workers=1)
+    return jobs
+
+
+def test_saturation_timeout_and_cancel(release):
+    jobs = thread_jobs(max_pending=2, timeout=0.05)
+    running, queued = jobs.submit('row'), jobs.submit('row')
+    assert running and queued
+    assert jobs.submit('row') is None  # Saturated
+    assert jobs.status(running) == {'status': 'pending'}
+
+    assert jobs.cancel(queued) and jobs.status(queued) == {'status': 'cancelled'}
+    assert jobs.cancel('no-such-job') is False
+    time.sleep(0.1)
+    assert jobs.status(running) == {'status': 'timeout'}
+    assert jobs.status('no-such-job') is None
+
+    release.set()
+    jobs.shutdown()
+    done = thread_jobs().submit('row')
+    assert done is not None
+
+
+def slow_explanation(seconds):
+    time.sleep(seconds)
+    return [('Age', seconds)]
+
+
+def test_timeout_and_cancel_of_a_running_job_recycle_the_pool(monkeypatch):
+    monkeypatch.setattr(explanations, '_explain_in_worker', slow_explanation)
+    jobs = ExplanationJobs('unused.pkl', max_pending=1, timeout=0.5)
+    for stop in ('timeout', 'cancel'):
+        executor = jobs._executor = ProcessPoolExecutor(max_workers=1, mp_context=multiprocessing.get_context('fork'))
+        job_id = jobs.submit(60)
+        future = jobs._jobs[job_id]['future']
+        deadline = time.time() + 5
+        while not (future.running() and executor._processes) and time.time() < deadline:
+            time.sleep(0.01)
+        workers = list(executor._processes.values())
+        if stop == 'timeout':
+            time.sleep(0.6)
+            assert jobs.status(job_id) == {'status': 'timeout'}
+        else:
+            assert jobs.cancel(job_id) and jobs.status(job_id) == {'status': 'cancelled'}
+
+        # The worker is killed rather than left running the job for a minute
+        assert jobs._executor is None
+        assert isinstance(future.exception(timeout=5), BrokenProcessPool)
+        for worker in workers:
+            worker.join(5)
+            assert not worker.is_alive()
+        assert jobs.in_flight() == 0
+
+    jobs._executor = ProcessPoolExecutor(max_workers=1, mp_context=multiprocessing.get_context('fork'))
+    job_id = jobs.submit(0)
+    jobs._jobs[job_id]['future'].result(timeout=5)
+    assert jobs.status(job_id) == {'status': 'done', 'feature_importance': [('Age', 0)]}
+    jobs.shutdown()
+
+
+def test_finished_job_reports_feature_importance(release):
+    jobs = thread_jobs()
+    job_id = jobs.submit('row')
+    release.set()
+    jobs._jobs[job_id]['future'].result(timeout=5)
+    assert jobs.status(job_id) == {'status': 'done', 'feature_importance': [('Age', 0.5)]}
+
+
+def test_explain_routes(release, monkeypatch):
+    jobs = thread_jobs()
+    monkeypatch.setattr(webapp, 'explanation_jobs', jobs)
+    client = webapp.app.test_client()
+    assert client.get('/explain/unknown').status_code == 404
+    assert client.delete('/explain/unknown').status_code == 404
+
+    job_id = jobs.submit('row')
+    assert client.get(f'/explain/{job_id}').get_json() == {'status': 'pending'}
+    response = client.delete(f'/explain/{job_id}')
+    assert response.status_code == 200 and response.get_json() == {'status': 'cancelled'}
+    assert client.get(f'/explain/{job_id}').get_json() == {'status': 'cancelled'}
+
+
+def test_broken_pool_falls_back_and_is_rebuilt(monkeypatch):
+    jobs = ExplanationJobs('unused.pkl')
+    jobs._executor = BrokenExecutor()
+    with pytest.raises(BrokenProcessPool):
+        jobs.submit('row')
+    assert jobs._executor is None  # The next submit() builds a new pool
+
+    jobs._executor = BrokenExecutor()
+    monkeypatch.setattr(webapp, 'model', fitted_pipeline())
+    monkeypatch.setattr(webapp, 'explanation_jobs', jobs)
+    response = webapp.app.test_client().post('/predict', data={'age': '60', 'smoking': 'on'})
+    assert response.status_code == 200
+    assert b'Cholesterol Level</span>: +0.120' in response.data  # DEFAULT_FEATURE_IMPORTANCE, inline
+    assert jobs._executor is None
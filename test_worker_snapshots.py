@@ -0,0 +1,34 @@
+#!/usr/bin/env python3
+"""
+Test the per-process snapshot writer shared by /metrics and /drift
+"""
+import os
+import sys
+import time
+sys.path.append(os.path.dirname(__file__))
+
+from worker_snapshots import WorkerSnapshots
+
+
+def test_writer_thread_and_merge(tmp_path):
+    state = {'n': 1}
+    snapshots = WorkerSnapshots(lambda: dict(state), str(tmp_path), '.snap', 0.02, 'test')
+    snapshots.ensure_writer()
+    snapshots.ensure_writer()  # One thread per process
+    path = tmp_path / f'{os.getpid()}.snap'
+    deadline = time.time() + 5
+    while not path.exists() and time.time() < deadline:
+        time.sleep(0.01)
+    assert path.exists()
+
+    os.replace(path, tmp_path / 'exited-worker.snap')
+    (tmp_path / 'torn.snap').write_text('{')
+    state['n'] = 2
+    assert sorted(snapshot['n'] for snapshot in snapshots.read_all()) == [1, 2]
+
+
+def test_without_a_directory_only_this_process_is_read(tmp_path):
+    snapshots = WorkerSnapshots(lambda: {'n': 3}, '', '.snap', 0.02, 'test')
+    snapshots.ensure_writer()
+    snapshots.write()
+    assert snapshots.read_all() == [{'n': 3}] and os.listdir(tmp_path) == []
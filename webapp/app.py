@@ -1,12 +1,22 @@
 from flask import Flask, render_template, request, redirect, url_for, jsonify
 import joblib
-import shap
 import numpy as np
-import pandas as pd
 import os
+import sys
+from explanations import ExplanationJobs, build_shap_explainer, explain_row, feature_columns, to_dense
+
+# patient_record.py (the form schema shared with the main app) lives in the repository root
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from patient_record import PatientRecord, RecordError
 
 app = Flask(__name__)
 
+# Explanations run in a background process pool unless EXPLAIN_ASYNC=0
+EXPLAIN_ASYNC = os.environ.get('EXPLAIN_ASYNC', '1') != '0'
+EXPLAIN_WORKERS = int(os.environ.get('EXPLAIN_WORKERS', min(2, os.cpu_count() or 1)))
+EXPLAIN_MAX_PENDING = int(os.environ.get('EXPLAIN_MAX_PENDING', 32))
+EXPLAIN_TIMEOUT = float(os.environ.get('EXPLAIN_TIMEOUT', 30))
+
 # Production-ready model loading with error handling
 try:
     model_path = os.path.join(os.path.dirname(__file__), 'models', 'heart_disease_pipeline.pkl')
@@ -19,6 +29,32 @@ except Exception as e:
     print(f"Error loading model: {e}")
     model = None
 
+explainer, shap_aggregation = None, None
+explanation_jobs = None
+if model is not None:
+    if EXPLAIN_ASYNC:
+        explanation_jobs = ExplanationJobs(model_path, max_workers=EXPLAIN_WORKERS,
+                                           max_pending=EXPLAIN_MAX_PENDING, timeout=EXPLAIN_TIMEOUT)
+        print(f"SHAP explanations run in background ({EXPLAIN_WORKERS} workers)")
+    else:
+        try:
+            explainer, shap_aggregation = build_shap_explainer(model)
+            print(f"SHAP explainer ready ({type(explainer).__name__})")
+        except Exception as e:
+            print(f"SHAP explainer unavailable: {e}")
+
+# Fallback feature importance based on common heart disease risk factors
+DEFAULT_FEATURE_IMPORTANCE = [
+    ('Age', 0.15),
+    ('Cholesterol_Level', 0.12), 
+    ('Systolic_BP', 0.10),
+    ('Diabetes', 0.08),
+    ('Smoking', 0.07),
+    ('Family_History', 0.06),
+    ('Stress_Level', 0.05),
+    ('Physical_Activity', -0.04)
+]
+
 @app.route('/')
 def home():
     return render_template('index.html')
@@ -26,84 +62,65 @@ def home():
 @app.route('/predict', methods=['GET', 'POST'])
 def predict():
     if request.method == 'POST':
-        # Extract all form data and convert to proper numeric format
-        state_value = request.form.get('state', 'Delhi')
-        # If Kerala is selected, map it to Tamil Nadu for the model
-        if state_value == 'Kerala':
-            state_value = 'Tamil Nadu'
-            
-        patient_data = {
-            'Patient_ID': 1,  # Default Patient ID
-            'State_Name': state_value,
-            'Age': int(request.form.get('age', 45)),
-            'Gender': 1 if request.form.get('gender', 'Male') == 'Male' else 0,  # Convert to numeric
-            'Diabetes': 1 if request.form.get('diabetes') else 0,  # Convert to numeric
-            'Hypertension': 1 if request.form.get('hypertension') else 0,  # Convert to numeric
-            'Obesity': 1 if request.form.get('obesity') else 0,  # Convert to numeric
-            'Smoking': 1 if request.form.get('smoking') else 0,  # Convert to numeric
-            'Alcohol_Consumption': 1 if request.form.get('alcohol') else 0,  # Convert to numeric
-            'Physical_Activity': int(request.form.get('physical_activity', 2)),
-            'Diet_Score': int(request.form.get('diet_score', 5)),
-            'Cholesterol_Level': int(request.form.get('cholesterol', 200)),
-            'Triglyceride_Level': int(request.form.get('triglyceride', 150)),
-            'LDL_Level': int(request.form.get('ldl', 100)),
-            'HDL_Level': int(request.form.get('hdl', 50)),
-            'Systolic_BP': int(request.form.get('systolic_bp', 120)),
-            'Diastolic_BP': int(request.form.get('diastolic_bp', 80)),
-            'Air_Pollution_Exposure': int(request.form.get('air_pollution', 1)),
-            'Family_History': 1 if request.form.get('family_history') else 0,  # Convert to numeric
-            'Stress_Level': int(request.form.get('stress_level', 5)),
-            'Healthcare_Access': 1 if request.form.get('healthcare', 'Urban') == 'Urban' else 0,  # Convert to numeric
-            'Heart_Attack_History': 1 if request.form.get('heart_attack_history') else 0,  # Convert to numeric
-            'Emergency_Response_Time': int(request.form.get('emergency_time', 200)),
-            'Annual_Income': int(request.form.get('annual_income', 500000)),
-            'Health_Insurance': 1 if request.form.get('health_insurance') else 0  # Convert to numeric
-        }
-        
-        # Create DataFrame with all features including Patient_ID (exact column names from original dataset)
-        feature_columns = ['Patient_ID', 'State_Name', 'Age', 'Gender', 'Diabetes', 'Hypertension', 'Obesity', 
-                          'Smoking', 'Alcohol_Consumption', 'Physical_Activity', 'Diet_Score',
-                          'Cholesterol_Level', 'Triglyceride_Level', 'LDL_Level', 'HDL_Level',
-                          'Systolic_BP', 'Diastolic_BP', 'Air_Pollution_Exposure', 'Family_History',
-                          'Stress_Level', 'Healthcare_Access', 'Heart_Attack_History', 
-                          'Emergency_Response_Time', 'Annual_Income', 'Health_Insurance']
+        # Parse and range-check the form in one pass
+        try:
+            record = PatientRecord.from_form(request.form)
+        except RecordError as e:
+            return render_template('result.html',
+                                   risk_score=50,
+                                   risk_category='Error',
+                                   feature_importance=[('Error', str(e))],
+                                   explain_job_id=None), 400
         
-        # Create input array in the correct order
-        input_data = [patient_data[col] for col in feature_columns]
-        X = pd.DataFrame([input_data], columns=feature_columns)
+        # This pipeline was trained with Patient_ID and Gender encoded as 1 = Male
+        X = record.to_frame(feature_columns, Patient_ID=1, Gender=1 if record.Gender == 'Male' else 0)
         
-        # Make prediction
-        pred_prob = model.predict_proba(X)[0][1]
-        pred_class = model.predict(X)[0]
+        # Transform once; the same row feeds both the classifier and SHAP
+        X_transformed = to_dense(model.named_steps['preprocessor'].transform(X))
+        pred_prob = model.named_steps['clf'].predict_proba(X_transformed)[0][1]
         risk_category = 'Low' if pred_prob < 0.33 else ('Medium' if pred_prob < 0.66 else 'High')
         
-        # SHAP explanation
-        try:
-            explainer = shap.Explainer(model.named_steps['clf'], model.named_steps['preprocessor'].transform(X))
-            shap_values = explainer(model.named_steps['preprocessor'].transform(X))
-            feature_importance = list(zip(feature_columns[1:], shap_values.values[0]))  # Exclude Patient_ID from display
-            feature_importance.sort(key=lambda x: abs(x[1]), reverse=True)
-        except Exception as e:
-            print(f"SHAP explanation failed: {e}")
-            # Fallback feature importance based on common heart disease risk factors
-            feature_importance = [
-                ('Age', 0.15),
-                ('Cholesterol_Level', 0.12), 
-                ('Systolic_BP', 0.10),
-                ('Diabetes', 0.08),
-                ('Smoking', 0.07),
-                ('Family_History', 0.06),
-                ('Stress_Level', 0.05),
-                ('Physical_Activity', -0.04)
-            ]
+        # SHAP explanation: queued for the background pool, or inline when EXPLAIN_ASYNC=0
+        explain_job_id = None
+        feature_importance = DEFAULT_FEATURE_IMPORTANCE
+        if explanation_jobs is not None:
+            try:
+                explain_job_id = explanation_jobs.submit(X_transformed)
+                if explain_job_id is None:
+                    print("SHAP queue full, showing default feature importance")
+            except Exception as e:
+                # e.g. BrokenProcessPool; the pool is rebuilt on the next submit
+                print(f"SHAP job submission failed: {e}")
+        else:
+            try:
+                if explainer is None:
+                    raise RuntimeError("explainer not initialised")
+                feature_importance = explain_row(explainer, shap_aggregation, X_transformed)
+            except Exception as e:
+                print(f"SHAP explanation failed: {e}")
         
         return render_template('result.html',
                                risk_score=int(pred_prob*100),
                                risk_category=risk_category,
-                               feature_importance=feature_importance)
+                               feature_importance=feature_importance,
+                               explain_job_id=explain_job_id)
     
     return render_template('predict.html')
 
+@app.route('/explain/<job_id>', methods=['GET', 'DELETE'])
+def explain_status(job_id):
+    """Poll (GET) or cancel (DELETE) a background SHAP explanation job"""
+    if explanation_jobs is None:
+        return jsonify({'status': 'unavailable'}), 404
+    if request.method == 'DELETE':
+        if not explanation_jobs.cancel(job_id):
+            return jsonify({'status': 'unknown'}), 404
+        return jsonify({'status': 'cancelled'})
+    status = explanation_jobs.status(job_id)
+    if status is None:
+        return jsonify({'status': 'unknown'}), 404
+    return jsonify(status)
+
 if __name__ == '__main__':
     port = int(os.environ.get('PORT', 5000))
     app.run(host='0.0.0.0', port=port, debug=False)
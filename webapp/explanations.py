@@ -0,0 +1,224 @@
+"""
+SHAP explanations for the webapp, computed off the request path.
+
+The explainer is built once per process from a fixed background sample of
+heart.csv. ExplanationJobs runs explanations in a local process pool whose
+workers load the model and explainer once at start-up, so /predict can
+render the risk score immediately and the page polls /explain/<job_id>.
+"""
+import os
+import threading
+import time
+import uuid
+from concurrent.futures import CancelledError, ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+import multiprocessing
+
+import joblib
+import numpy as np
+import pandas as pd
+import shap
+
+# Exact column names from the original dataset, in model input order
+feature_columns = ['Patient_ID', 'State_Name', 'Age', 'Gender', 'Diabetes', 'Hypertension', 'Obesity',
+                   'Smoking', 'Alcohol_Consumption', 'Physical_Activity', 'Diet_Score',
+                   'Cholesterol_Level', 'Triglyceride_Level', 'LDL_Level', 'HDL_Level',
+                   'Systolic_BP', 'Diastolic_BP', 'Air_Pollution_Exposure', 'Family_History',
+                   'Stress_Level', 'Healthcare_Access', 'Heart_Attack_History',
+                   'Emergency_Response_Time', 'Annual_Income', 'Health_Insurance']
+
+# SHAP settings: rows sampled from heart.csv as the fixed background set, and the
+# explainer flavour ('tree' = TreeExplainer fast path, 'auto' = shap.Explainer)
+SHAP_BACKGROUND_SIZE = int(os.environ.get('SHAP_BACKGROUND_SIZE', 100))
+SHAP_EXPLAINER = os.environ.get('SHAP_EXPLAINER', 'auto').lower()
+
+def find_heart_csv():
+    base_dir = os.path.dirname(os.path.abspath(__file__))
+    for path in (os.path.join(base_dir, 'heart.csv'), os.path.join(os.path.dirname(base_dir), 'heart.csv')):
+        if os.path.exists(path):
+            return path
+    return None
+
+def load_shap_background(n_rows):
+    """Sample a fixed background set from heart.csv, encoded the same way as form input"""
+    csv_path = find_heart_csv()
+    if csv_path is None:
+        raise FileNotFoundError("heart.csv not found for SHAP background")
+    df = pd.read_csv(csv_path)
+    background = df.sample(n=min(n_rows, len(df)), random_state=42)[feature_columns].copy()
+    background['Gender'] = (background['Gender'] == 'Male').astype(int)
+    return background
+
+def to_dense(matrix):
+    return matrix.toarray() if hasattr(matrix, 'toarray') else np.asarray(matrix)
+
+def build_shap_explainer(pipeline):
+    """
+    Build the SHAP explainer once at model-load time.
+    Returns (explainer, aggregation matrix mapping transformed columns back to input features).
+    """
+    preprocessor = pipeline.named_steps['preprocessor']
+    clf = pipeline.named_steps['clf']
+
+    if SHAP_EXPLAINER == 'tree' and hasattr(clf, 'estimators_'):
+        # Path-dependent TreeExplainer needs no background data and runs in milliseconds
+        explainer = shap.TreeExplainer(clf, feature_perturbation='tree_path_dependent')
+    else:
+        background = to_dense(preprocessor.transform(load_shap_background(SHAP_BACKGROUND_SIZE)))
+        explainer = shap.Explainer(clf, background)
+
+    # One-hot columns are summed back onto the raw feature they came from; a model
+    # input that is not displayed (Patient_ID) keeps its share out of the list
+    output_names = preprocessor.get_feature_names_out()
+    display_columns = feature_columns[1:]  # Exclude Patient_ID from display
+    aggregation = np.zeros((len(output_names), len(display_columns)))
+    for i, name in enumerate(output_names):
+        raw_name = name.split('__', 1)[-1]
+        for j, col in enumerate(display_columns):
+            if raw_name == col or raw_name.startswith(col + '_'):
+                aggregation[i, j] = 1.0
+                break
+    return explainer, aggregation
+
+def explain_row(explainer, aggregation, X_transformed):
+    """Per-feature SHAP attributions for one transformed row, sorted by magnitude"""
+    # Additivity checks trip on float32 tree thresholds and only cost time here
+    if isinstance(explainer, shap.TreeExplainer):
+        values = explainer.shap_values(X_transformed, check_additivity=False)
+    else:
+        values = explainer(X_transformed).values
+    if isinstance(values, list):
+        values = values[1]  # Older shap returns one array per class
+    values = np.asarray(values)
+    if values.ndim == 3:
+        values = values[..., 1]  # (rows, features, classes) -> positive class
+    contributions = values[0] @ aggregation
+    feature_importance = list(zip(feature_columns[1:], contributions.tolist()))
+    feature_importance.sort(key=lambda x: abs(x[1]), reverse=True)
+    return feature_importance
+
+# Per-process explainer state for pool workers
+_worker_explainer = None
+_worker_aggregation = None
+
+def _init_worker(model_path):
+    global _worker_explainer, _worker_aggregation
+    _worker_explainer, _worker_aggregation = build_shap_explainer(joblib.load(model_path))
+
+def _explain_in_worker(X_transformed):
+    return explain_row(_worker_explainer, _worker_aggregation, X_transformed)
+
+class ExplanationJobs:
+    """
+    Bounded pool of explanation jobs keyed by job id.
+    At most max_pending jobs may be queued or running; submit() returns None
+    when the pool is saturated. A pool broken by a failed worker initializer
+    or a dead worker is discarded, so the next submit() starts a new one. Jobs that exceed timeout are reported as
+    'timeout', and finished jobs are forgotten after ttl seconds.
+
+    A SHAP computation cannot be interrupted inside a worker, so timing out
+    or cancelling a job that is already running recycles the pool: its
+    workers are killed and the next submit() starts a new one. Other jobs
+    of that pool are lost with it; queued ones report 'cancelled' and
+    running ones 'failed'.
+    """
+
+    def __init__(self, model_path, max_workers=2, max_pending=32, timeout=30.0, ttl=300.0):
+        self.model_path = model_path
+        self.max_workers = max_workers
+        self.max_pending = max_pending
+        self.timeout = timeout
+        self.ttl = ttl
+        self._executor = None
+        self._jobs = {}
+        self._lock = threading.Lock()
+
+    def _get_executor(self):
+        if self._executor is None:
+            # spawn keeps workers independent of the web server's threads and locks
+            self._executor = ProcessPoolExecutor(max_workers=self.max_workers,
+                                                 mp_context=multiprocessing.get_context('spawn'),
+                                                 initializer=_init_worker,
+                                                 initargs=(self.model_path,))
+        return self._executor
+
+    def _prune(self, now):
+        expired = [job_id for job_id, job in self._jobs.items()
+                   if job['future'].done() and now - job['submitted'] > self.ttl]
+        for job_id in expired:
+            del self._jobs[job_id]
+
+    def in_flight(self):
+        with self._lock:
+            return sum(1 for job in self._jobs.values() if not job['future'].done())
+
+    def submit(self, X_transformed):
+        now = time.monotonic()
+        with self._lock:
+            self._prune(now)
+            # Jobs of a recycled pool count until its workers are gone
+            if sum(1 for job in self._jobs.values() if not job['future'].done()) >= self.max_pending:
+                return None
+            job_id = uuid.uuid4().hex
+            try:
+                executor = self._get_executor()
+                future = executor.submit(_explain_in_worker, X_transformed)
+            except BrokenProcessPool:
+                self._discard_executor()
+                raise
+            self._jobs[job_id] = {'future': future, 'executor': executor, 'submitted': now, 'state': None}
+            return job_id
+
+    def status(self, job_id):
+        """Return a JSON-ready status dict for job_id, or None if it is unknown"""
+        with self._lock:
+            job = self._jobs.get(job_id)
+            if job is None:
+                return None
+            future = job['future']
+            if job['state'] is not None:
+                return {'status': job['state']}
+            if not future.done():
+                if time.monotonic() - job['submitted'] > self.timeout:
+                    if not future.cancel():
+                        self._recycle_executor(job['executor'])
+                    job['state'] = 'timeout'
+                    return {'status': 'timeout'}
+                return {'status': 'pending'}
+
+        try:
+            feature_importance = future.result()
+        except CancelledError:
+            return {'status': 'cancelled'}
+        except Exception as e:
+            return {'status': 'failed', 'error': str(e)}
+        return {'status': 'done', 'feature_importance': feature_importance}
+
+    def cancel(self, job_id):
+        """Cancel a job; returns False if the job id is unknown"""
+        with self._lock:
+            job = self._jobs.get(job_id)
+            if job is None:
+                return False
+            if not job['future'].cancel() and not job['future'].done():
+                # Already running in a worker
+                self._recycle_executor(job['executor'])
+                job['state'] = 'cancelled'
+            return True
+
+    def _discard_executor(self):
+        executor, self._executor = self._executor, None
+        if executor is not None:
+            executor.shutdown(wait=False, cancel_futures=True)
+
+    def _recycle_executor(self, executor):
+        """Shut down executor and kill its workers, unless it was replaced already"""
+        if executor is not self._executor:
+            return
+        processes = list((getattr(executor, '_processes', None) or {}).values())
+        self._discard_executor()
+        for process in processes:
+            process.terminate()
+
+    def shutdown(self):
+        self._discard_executor()
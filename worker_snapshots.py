@@ -0,0 +1,84 @@
+"""
+Per-process snapshots merged across gunicorn workers.
+
+The metrics histograms (metrics.py) and the drift counts (drift_monitor.py)
+live in each worker's memory. With a shared directory configured, every
+process writes a JSON snapshot of its state to <directory>/<pid><suffix>
+every interval seconds, and a reader loads the snapshots of all processes
+to sum them, so a request that lands on any one worker reports the whole
+server. Snapshots of exited workers are kept so totals never go backwards;
+gunicorn.conf.py clears the directory when the server starts.
+
+The writer thread is started from the request path rather than at import:
+threads do not survive the fork that creates a gunicorn worker, so every
+worker starts its own, and after the first request the pid check is all
+ensure_writer() costs.
+"""
+import glob
+import json
+import os
+import threading
+import time
+
+
+class WorkerSnapshots:
+    """
+    Writes snapshot() of this process to directory and reads back the
+    snapshots of every process. flush() is called every interval seconds by
+    the writer thread (default: write()); an empty directory disables both.
+    """
+
+    def __init__(self, snapshot, directory, suffix, interval, name, flush=None):
+        self.snapshot = snapshot
+        self.directory = directory
+        self.suffix = suffix
+        self.interval = interval
+        self.name = name
+        self._flush = flush or self.write
+        self._writer_pid = None
+        self._lock = threading.Lock()
+
+    def write(self):
+        """Write this process's snapshot to <directory>/<pid><suffix> (atomically)"""
+        if not self.directory:
+            return
+        os.makedirs(self.directory, exist_ok=True)
+        path = os.path.join(self.directory, f'{os.getpid()}{self.suffix}')
+        with open(f'{path}.tmp', 'w') as f:
+            json.dump(self.snapshot(), f)
+        os.replace(f'{path}.tmp', path)
+
+    def ensure_writer(self):
+        """Start this process's writer thread unless it is running"""
+        if not self.directory or self.interval <= 0 or self._writer_pid == os.getpid():
+            return
+        with self._lock:
+            if self._writer_pid == os.getpid():
+                return
+            self._writer_pid = os.getpid()
+            threading.Thread(target=self._run, name=f'{self.name}-flush', daemon=True).start()
+
+    def _run(self):
+        while True:
+            time.sleep(self.interval)
+            try:
+                self._flush()
+            except OSError as e:
+                print(f"❌ {self.name.capitalize()} flush failed: {e}")
+
+    def read_all(self):
+        """
+        The snapshots of every process, this one's rewritten first; without
+        a directory, only this process's own
+        """
+        if not self.directory:
+            return [self.snapshot()]
+        self.write()
+        snapshots = []
+        for path in glob.glob(os.path.join(self.directory, f'*{self.suffix}')):
+            try:
+                with open(path) as f:
+                    snapshots.append(json.load(f))
+            except (OSError, ValueError):
+                continue  # Removed since the glob (server start) or unreadable
+        return snapshots